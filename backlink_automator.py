@@ -2,6 +2,10 @@ import os
 import sys
 import time
 import json
+import threading
+import argparse
+import multiprocessing
+from concurrent.futures import wait as wait_futures, FIRST_COMPLETED
 from dotenv import load_dotenv
 from datetime import datetime
 
@@ -11,13 +15,30 @@ from utils.email_handler import EmailHandler
 from utils.browser_handler import BrowserHandler
 from utils.logger import BacklinkLogger
 from utils.site_handler import SiteHandler
-from config import TARGET_SITES, SITES_CONFIG, CREDENTIALS_FILE
+from utils.browser_pool import BrowserPool
+from utils.browser_daemon import BrowserDaemon
+from utils.work_queue import WorkQueue
+from utils.checkpoint import RunCheckpoint
+from utils.scheduler import DomainScheduler
+from utils.har_archive import HarArchive
+from utils.tracer import tracer, part_path, merge_traces
+from config import (
+    TARGET_SITES, SITES_CONFIG, CREDENTIALS_FILE, CONCURRENT_WORKERS,
+    GLOBAL_RATE_LIMIT, DOMAIN_RATE_LIMIT, BROWSER_DAEMON, BROWSER_DAEMON_PORT, SESSIONS_DIR,
+    IMAP_SERVER, IMAP_PORT, IMAP_SSL, IMAP_STATE_FILE,
+)
 
 
 class BacklinkAutomator:
     """Main automation class"""
     
-    def __init__(self):
+    def __init__(self, run_id=None, har_mode=None, har_dir=None):
+        """
+        Args:
+            run_id: Existing run to resume; a new run id is generated when None
+            har_mode: 'record' or 'replay' to capture / serve site traffic from HARs
+            har_dir: Directory holding the per-domain HAR files
+        """
         # Load environment variables
         load_dotenv()
         
@@ -27,6 +48,7 @@ class BacklinkAutomator:
         self.website_url = os.getenv('WEBSITE_URL', 'https://google.com')
         self.user_password = os.getenv('USER_PASSWORD')
         self.headless = os.getenv('HEADLESS_MODE', 'False').lower() == 'true'
+        self.workers = max(1, CONCURRENT_WORKERS)
         
         # Validate configuration
         if not all([self.email_address, self.email_password, self.user_password]):
@@ -36,70 +58,414 @@ class BacklinkAutomator:
         
         # Initialize utilities
         self.data_gen = DataGenerator()
-        self.email_handler = EmailHandler(self.email_address, self.email_password)
-        self.browser = BrowserHandler(headless=self.headless)
+        self.email_handler = EmailHandler(self.email_address, self.email_password,
+                                          IMAP_SERVER, IMAP_PORT, IMAP_SSL, IMAP_STATE_FILE)
+        self.daemon = BrowserDaemon(port=BROWSER_DAEMON_PORT, headless=self.headless) if BROWSER_DAEMON else None
+        self.har = HarArchive(har_dir, har_mode) if har_mode else None
+        if self.har:
+            self.email_handler = self.har.email_handler(self.email_handler)
+        self.browser = BrowserHandler(headless=self.headless, daemon=self.daemon, har=self.har)
         self.logger = BacklinkLogger()
+        self.checkpoint = RunCheckpoint(run_id)
+        if self.har and not self.har.recording:
+            # Nothing reaches the real sites during replay, so no politeness delays
+            self.scheduler = DomainScheduler({'rate': 0}, {'rate': 0})
+        else:
+            self.scheduler = DomainScheduler(GLOBAL_RATE_LIMIT, DOMAIN_RATE_LIMIT)
         
         self.logger.info("Backlink Automator initialized")
+        self.logger.info(f"Run ID: {self.checkpoint.run_id}")
         self.logger.info(f"Email: {self.email_address}")
         self.logger.info(f"Website URL: {self.website_url}")
         self.logger.info(f"Target sites: {len(TARGET_SITES)}")
+        if self.workers > 1:
+            self.logger.info(f"Concurrent workers: {self.workers}")
+        if self.har:
+            self.logger.info(f"HAR {self.har.mode}: {self.har.directory}")
     
-    def process_site(self, site_key):
+    def _new_site_handler(self, site_key, browser):
+        """Generate fresh user data and build a handler for one site"""
+        site_config = SITES_CONFIG[site_key]
+        
+        # Generate user data
+        user_data = self.data_gen.generate_user_data(
+            self.email_address,
+            self.website_url,
+            self.user_password
+        )
+        
+        if self.har:
+            user_data = self.har.user_data(site_config['domain'], user_data)
+        
+        self.logger.info(f"Generated username: {user_data['username']}")
+        
+        return SiteHandler(
+            config=site_config,
+            browser=browser,
+            email_handler=self.email_handler,
+            user_data=user_data,
+            website_url=self.website_url,
+            logger=self.logger,
+            checkpoint=self.checkpoint.for_site(site_key),
+            # HAR runs must take the same steps every time, so no saved logins
+            session_path=None if self.har else os.path.join(SESSIONS_DIR, f"{site_config['domain']}.json")
+        )
+    
+    def _completed_result(self, site_key):
+        """Result recorded for site_key earlier in this run (when resuming), or None"""
+        result = self.checkpoint.for_site(site_key).result
+        if result:
+            self.logger.info(f"[resume] {site_key} already completed in run {self.checkpoint.run_id}")
+        return result
+    
+    def _domain_of(self, site_key):
+        return SITES_CONFIG.get(site_key, {}).get('domain', site_key)
+    
+    def _rate_limit_of(self, site_key):
+        if self.har and not self.har.recording:
+            return None
+        return SITES_CONFIG.get(site_key, {}).get('special', {}).get('rate_limit')
+    
+    def _claim_next(self, pending, blocked_domains=()):
+        """
+        Take the next site whose domain is allowed to start; see DomainScheduler.claim
+        
+        Args:
+            pending: List of site keys (the claimed key is removed)
+            blocked_domains: Domains that must not start now (e.g. a site is parked on them)
+        """
+        candidates = [k for k in pending if self._domain_of(k) not in blocked_domains]
+        site_key, wait = self.scheduler.claim(candidates, self._domain_of, self._rate_limit_of)
+        if site_key is not None:
+            pending.remove(site_key)
+        return site_key, wait
+    
+    def _log_result(self, site_config, result):
+        """Record a SiteHandler result in the run report"""
+        return self.logger.log_site_result(
+            site_name=site_config['name'],
+            domain=site_config['domain'],
+            status=result['status'],
+            profile_url=result.get('profile_url'),
+            error=result.get('error'),
+            metrics=result.get('metrics'),
+            artifacts=result.get('artifacts')
+        )
+    
+    def process_site(self, site_key, browser=None, parked=None):
         """
         Process a single site: register, verify, login, create listing
         
         Args:
             site_key: Site key from SITES_CONFIG
+            browser: BrowserHandler to use (defaults to the shared one)
+            parked: Optional list; sites waiting on a verification email are
+                appended as (site_key, handler, deadline) instead of blocking
         """
         if site_key not in SITES_CONFIG:
             self.logger.error(f"Site '{site_key}' not found in configuration")
             return
         
         site_config = SITES_CONFIG[site_key]
-        site_name = site_config['name']
-        domain = site_config['domain']
+        
+        completed = self._completed_result(site_key)
+        if completed:
+            return self._log_result(site_config, completed)
         
         try:
-            # Generate user data
-            user_data = self.data_gen.generate_user_data(
-                self.email_address,
-                self.website_url,
-                self.user_password
-            )
-            
-            self.logger.info(f"Generated username: {user_data['username']}")
-            
-            # Create site handler - FIXED: Pass correct parameters
-            site_handler = SiteHandler(
-                config=site_config,
-                browser=self.browser,
-                email_handler=self.email_handler,
-                user_data=user_data,
-                website_url=self.website_url,
-                logger=self.logger
-            )
+            site_handler = self._new_site_handler(site_key, browser or self.browser)
             
             # Process the site
-            result = site_handler.process()
+            result = site_handler.process(defer_verification=parked is not None)
+            if result['status'] == 'pending_verification':
+                # Past this the watcher is stuck or the mail never came: fail the site
+                wait_for_email = site_config['email_verification'].get('wait_for_email', 120)
+                parked.append((site_key, site_handler, time.time() + wait_for_email + EmailHandler.RESULT_MARGIN))
+                return None
             
             # Log result
-            self.logger.log_site_result(
-                site_name=site_name,
-                domain=domain,
-                status=result['status'],
-                profile_url=result.get('profile_url'),
-                error=result.get('error')
-            )
+            return self._log_result(site_config, result)
+            
+        except Exception as e:
+            self.logger.error(f"Error processing {site_config['name']}: {str(e)}")
+            return self._log_result(site_config, {'status': 'failed', 'error': str(e)})
+        
+        finally:
+            # Writes the site's HAR in record mode; a parked site resumes in a new context
+            (browser or self.browser).finish_site()
+    
+    def _resume_parked(self, parked, timeout=0):
+        """
+        Resume parked sites whose verification link has arrived, and fail
+        those whose deadline passed without one
+        
+        Args:
+            parked: List of (site_key, handler, deadline) from process_site
+            timeout: Seconds to wait for at least one to become ready (None =
+                until the earliest deadline)
+        """
+        if not parked:
+            return
+        
+        until_deadline = max(0.0, min(deadline for _, _, deadline in parked) - time.time())
+        timeout = until_deadline if timeout is None else min(timeout, until_deadline)
+        futures = [handler.pending_verification for _, handler, _ in parked]
+        wait_futures(futures, timeout=timeout, return_when=FIRST_COMPLETED)
+        
+        now = time.time()
+        for entry in [p for p in parked if not p[1].pending_verification.done() and p[2] <= now]:
+            # The watcher still owns the future and resolves it on its own
+            parked.remove(entry)
+            site_key, handler, _ = entry
+            self.logger.error(f"{SITES_CONFIG[site_key]['name']}: no verification link in time")
+            self._log_result(SITES_CONFIG[site_key], {
+                'status': 'failed',
+                'profile_url': None,
+                'error': 'Verification email wait timed out',
+            })
+        
+        for entry in [p for p in parked if p[1].pending_verification.done()]:
+            parked.remove(entry)
+            site_key, handler, _ = entry
+            site_config = SITES_CONFIG[site_key]
+            try:
+                result = handler.resume()
+            except Exception as e:
+                self.logger.error(f"Error processing {site_config['name']}: {str(e)}")
+                result = {'status': 'failed', 'error': str(e)}
+            finally:
+                handler.browser.finish_site()
+            self._log_result(site_config, result)
+    
+    def _drive_sites(self, pending, pending_lock, browser, stop_event=None):
+        """
+        Process sites from a shared backlog on one browser page
+        
+        Sites that need email verification are parked while their link is
+        fetched in the background, and the page moves on to other sites.
+        Sites on the same domain as a parked site wait for it, since the
+        mailbox lookup is keyed on the sender domain.
+        
+        Args:
+            pending: List of site keys still to process (shared between workers)
+            pending_lock: Lock guarding pending
+            browser: Started BrowserHandler owned by the calling thread
+            stop_event: Optional threading.Event that stops the loop
+        """
+        parked = []
+        while not (stop_event and stop_event.is_set()):
+            self._resume_parked(parked)
+            
+            blocked = {self._domain_of(k) for k, _, _ in parked}
+            with pending_lock:
+                if not pending and not parked:
+                    break
+                site_key, wait = self._claim_next(pending, blocked)
             
+            if site_key is None:
+                if parked:
+                    # Nothing can start yet: sleep until a link arrives or a domain frees up
+                    self._resume_parked(parked, timeout=wait or None)
+                elif stop_event:
+                    stop_event.wait(wait)
+                else:
+                    self.logger.info(f"\nWaiting {wait:.1f}s before next site (rate limit)...")
+                    time.sleep(wait)
+                continue
+            
+            self.logger.info(f"\nStarting {site_key} ({threading.current_thread().name})...")
+            self.process_site(site_key, browser=browser, parked=parked)
+    
+    def _worker(self, pool, pending, pending_lock, stop_event):
+        """
+        Worker thread: owns one browser context/page and claims sites from the backlog
+        
+        Args:
+            pool: Started BrowserPool to attach to
+            pending: Shared list of site keys still to process
+            pending_lock: Lock guarding pending
+            stop_event: Set when the run is interrupted
+        """
+        browser = pool.new_handler()
+        try:
+            browser.start()
+            self._drive_sites(pending, pending_lock, browser, stop_event)
         except Exception as e:
-            self.logger.error(f"Error processing {site_name}: {str(e)}")
-            self.logger.log_site_result(
-                site_name=site_name,
-                domain=domain,
-                status='failed',
-                error=str(e)
+            self.logger.error(f"Worker {threading.current_thread().name} crashed: {str(e)}")
+        finally:
+            browser.close()
+    
+    def _run_concurrent(self):
+        """Process TARGET_SITES with a pool of worker threads on one shared browser"""
+        pool = BrowserPool(headless=self.headless, timeout=self.browser.timeout, daemon=self.daemon, har=self.har)
+        pending = list(TARGET_SITES)
+        pending_lock = threading.Lock()
+        
+        stop_event = threading.Event()
+        workers = []
+        
+        pool.start()
+        try:
+            for n in range(min(self.workers, len(TARGET_SITES))):
+                t = threading.Thread(
+                    target=self._worker,
+                    args=(pool, pending, pending_lock, stop_event),
+                    name=f"worker-{n + 1}",
+                    daemon=True
+                )
+                t.start()
+                workers.append(t)
+            
+            # Join with a timeout so Ctrl+C still reaches the main thread
+            while any(t.is_alive() for t in workers):
+                for t in workers:
+                    t.join(timeout=0.5)
+        except KeyboardInterrupt:
+            stop_event.set()
+            for t in workers:
+                t.join()
+            raise
+        finally:
+            pool.close()
+    
+    def _run_sequential(self, site_keys):
+        """Process sites one at a time on the main browser"""
+        # Start browser
+        if not self.browser.page:
+            self.browser.start()
+        
+        # Process each site, letting other domains go ahead while one cools
+        # down or waits for its verification email
+        self._drive_sites(list(site_keys), threading.Lock(), self.browser)
+    
+    def run_worker(self, worker_id, work_queue):
+        """
+        Worker process loop: lease sites from the shared queue until it is drained
+        
+        Args:
+            worker_id: Unique name for this worker
+            work_queue: WorkQueue shared with the other workers
+        """
+        site_key = None
+        try:
+            self.browser.start()
+            self.email_handler.connect()
+            
+            while True:
+                site_key = work_queue.lease(worker_id)
+                if site_key is None:
+                    # Other workers may still hold leases that could expire
+                    if work_queue.unfinished() == 0:
+                        break
+                    time.sleep(5)
+                    continue
+                
+                # Politeness is per process here; the lease keeps sites exclusive
+                self.scheduler.acquire(self._domain_of(site_key), self._rate_limit_of(site_key))
+                
+                self.logger.info(f"\n[{worker_id}] Starting {site_key}...")
+                stop_heartbeat = work_queue.keep_alive(site_key, worker_id)
+                try:
+                    result = self.process_site(site_key) or {
+                        'status': 'failed', 'error': f"Site '{site_key}' not found in configuration"
+                    }
+                finally:
+                    stop_heartbeat.set()
+                
+                if not work_queue.complete(site_key, worker_id, dict(result, site_key=site_key)):
+                    self.logger.warning(f"[{worker_id}] Lease on {site_key} expired; result discarded")
+                site_key = None
+        
+        except KeyboardInterrupt:
+            if site_key:
+                work_queue.release(site_key, worker_id)
+        
+        finally:
+            self.email_handler.disconnect()
+            self.browser.close()
+            tracer.save()
+    
+    def run_sharded(self, processes, queue_db='work_queue.db'):
+        """
+        Split TARGET_SITES across worker processes, each with its own Chromium
+        
+        Args:
+            processes: Number of worker processes
+            queue_db: SQLite file backing the shared work queue
+        """
+        self.logger.info("\n🚀 Starting Backlink Automation")
+        self.logger.info(f"Processing {len(TARGET_SITES)} sites with {processes} worker processes...\n")
+        
+        work_queue = WorkQueue(queue_db)
+        work_queue.reset(TARGET_SITES)
+        
+        # Bring the daemon up once here so workers don't race to launch it
+        if self.daemon:
+            self.daemon.ensure_running()
+        
+        # spawn, not fork: Chromium and the logging handlers do not survive fork
+        ctx = multiprocessing.get_context('spawn')
+        restarts_left = processes
+        workers = {}
+        
+        def spawn(n):
+            p = ctx.Process(
+                target=run_shard_worker,
+                args=(
+                    f'worker-{n}', queue_db, self.checkpoint.run_id,
+                    self.har.mode if self.har else None,
+                    self.har.directory if self.har else None,
+                    tracer.path if tracer.enabled else None,
+                ),
+                name=f'worker-{n}'
             )
+            p.start()
+            workers[n] = p
+        
+        try:
+            for n in range(1, min(processes, len(TARGET_SITES)) + 1):
+                spawn(n)
+            
+            while workers:
+                for n, p in list(workers.items()):
+                    p.join(timeout=1)
+                    if p.is_alive():
+                        continue
+                    del workers[n]
+                    # Replace crashed workers while there is still work to do
+                    if p.exitcode != 0 and restarts_left > 0 and work_queue.unfinished():
+                        self.logger.warning(f"worker-{n} exited with code {p.exitcode}; restarting")
+                        restarts_left -= 1
+                        spawn(n)
+        
+        except KeyboardInterrupt:
+            self.logger.warning("\n\n⚠️ Automation interrupted by user")
+            self.logger.info(f"Resume with: --resume {self.checkpoint.run_id}")
+            for p in workers.values():
+                p.join()
+        
+        finally:
+            # Merge per-worker results into one report
+            merged = []
+            for result in work_queue.results():
+                site_config = SITES_CONFIG.get(result.get('site_key'), {})
+                result.setdefault('site_name', site_config.get('name', result.get('site_key')))
+                result.setdefault('domain', site_config.get('domain'))
+                result.setdefault('profile_url', None)
+                result.setdefault('timestamp', datetime.now().isoformat())
+                merged.append(result)
+            self.logger.add_results(merged)
+            
+            if tracer.enabled:
+                tracer.save()
+                events = merge_traces(tracer.path)
+                self.logger.info(f"Trace saved to {tracer.path} ({events} events)")
+            
+            self.logger.info("\n📊 Generating final report...")
+            self.logger.generate_report()
+            self.logger.print_summary()
+            
+            self.logger.info("\n✅ Automation complete!")
     
     def run(self):
         """Run automation for all target sites"""
@@ -107,32 +473,26 @@ class BacklinkAutomator:
         self.logger.info(f"Processing {len(TARGET_SITES)} sites...\n")
         
         try:
-            # Start browser
-            self.browser.start()
-            
             # Connect to email
             self.email_handler.connect()
             
-            # Process each site
-            for i, site_key in enumerate(TARGET_SITES, 1):
-                self.logger.info(f"\n[{i}/{len(TARGET_SITES)}] Starting {site_key}...")
-                
-                self.process_site(site_key)
-                
-                # Delay between sites
-                if i < len(TARGET_SITES):
-                    delay = int(os.getenv('ACTION_DELAY', 5))
-                    self.logger.info(f"\nWaiting {delay}s before next site...")
-                    time.sleep(delay)
+            if self.workers > 1 and len(TARGET_SITES) > 1:
+                self._run_concurrent()
+            else:
+                self._run_sequential(TARGET_SITES)
             
         except KeyboardInterrupt:
             self.logger.warning("\n\n⚠️ Automation interrupted by user")
+            self.logger.info(f"Resume with: --resume {self.checkpoint.run_id}")
         
         finally:
             # Cleanup
             self.email_handler.disconnect()
             self.browser.close()
             
+            if tracer.enabled:
+                self.logger.info(f"Trace saved to {tracer.save()} (open in Perfetto or chrome://tracing)")
+            
             # Generate report
             self.logger.info("\n📊 Generating final report...")
             self.logger.generate_report()
@@ -141,8 +501,43 @@ class BacklinkAutomator:
             self.logger.info("\n✅ Automation complete!")
 
 
+def run_shard_worker(worker_id, queue_db, run_id, har_mode=None, har_dir=None, trace_file=None):
+    """Entry point for a worker process started by run_sharded"""
+    if trace_file:
+        tracer.enable(part_path(trace_file, worker_id))
+    automator = BacklinkAutomator(run_id=run_id, har_mode=har_mode, har_dir=har_dir)
+    automator.run_worker(worker_id, WorkQueue(queue_db))
+
+
 def main():
     """Entry point"""
+    parser = argparse.ArgumentParser(description="Automated listing creation & backlinking")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Number of worker processes, each with its own browser")
+    parser.add_argument('--queue-db', default='work_queue.db',
+                        help="SQLite file for the shared work queue (with --workers)")
+    parser.add_argument('--resume', metavar='RUN_ID',
+                        help="Resume an interrupted run, skipping completed sites and steps")
+    har = parser.add_mutually_exclusive_group()
+    har.add_argument('--record-har', metavar='DIR',
+                     help="Record each site's traffic to DIR/<domain>.har")
+    har.add_argument('--replay-har', metavar='DIR',
+                     help="Serve all site traffic from HARs recorded in DIR, without network")
+    parser.add_argument('--trace', metavar='FILE',
+                        help="Write timed spans of every step and browser action to FILE "
+                             "(Chrome trace-event JSON for Perfetto / chrome://tracing)")
+    args = parser.parse_args()
+    
+    if args.trace:
+        tracer.enable(args.trace)
+    
+    if args.replay_har and not os.path.isdir(args.replay_har):
+        parser.error(f"No HAR recordings in {args.replay_har}")
+    har_mode = 'record' if args.record_har else 'replay' if args.replay_har else None
+    
+    if args.resume and not RunCheckpoint.exists(args.resume):
+        parser.error(f"No checkpoint found for run '{args.resume}'")
+    
     print("""
     ╔══════════════════════════════════════════════════════════╗
     ║         BACKLINK AUTOMATOR v1.0                          ║
@@ -150,8 +545,15 @@ def main():
     ╚══════════════════════════════════════════════════════════╝
     """)
     
-    automator = BacklinkAutomator()
-    automator.run()
+    automator = BacklinkAutomator(
+        run_id=args.resume,
+        har_mode=har_mode,
+        har_dir=args.record_har or args.replay_har
+    )
+    if args.workers > 1:
+        automator.run_sharded(args.workers, args.queue_db)
+    else:
+        automator.run()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,163 @@
+"""
+Micro-benchmark: verification link extraction, old vs new.
+
+The corpus is synthetic but shaped like real verification emails: table
+layout HTML with tracking redirects, social/footer links, images and an
+unsubscribe link, plus plain-text alternatives and long newsletters.
+
+    python benchmarks/bench_link_extractor.py [--messages 300] [--repeat 5]
+
+Two baselines are timed: the old extractor as it ran (BeautifulSoup
+html.parser + regex + list dedup, only when bs4 is installed) and its
+regex-and-dedup half on its own. The "x" column is each variant's time
+relative to the new extractor.
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.link_extractor import extract_links, choose_link  # noqa: E402
+
+try:
+    from bs4 import BeautifulSoup
+except ImportError:
+    BeautifulSoup = None
+
+DOMAINS = ['freelisting.com', 'yplocal.com', 'directorynode.com', 'unolist.in']
+KEYWORDS = ['verify', 'confirm', 'activate', 'validation', 'token', 'validate']
+
+
+# ---- old implementation (EmailHandler._extract_links / choose_link before) ----
+
+def legacy_extract_links(text, use_soup=True):
+    links = []
+    if use_soup:
+        soup = BeautifulSoup(text, 'html.parser')
+        links = [a.get('href') for a in soup.find_all('a', href=True)]
+    url_pattern = r'https?://[^\s<>"{}|\\^`\[\]]+'
+    text_links = re.findall(url_pattern, text)
+    cleaned_links = []
+    for link in links + text_links:
+        link = link.rstrip('.,;:!?)>]').strip()
+        if link and link not in cleaned_links:
+            cleaned_links.append(link)
+    return cleaned_links
+
+
+def legacy_choose_link(links, domain):
+    for link in links:
+        if domain in link and any(keyword in link.lower() for keyword in KEYWORDS):
+            return link
+    for link in links:
+        if domain in link:
+            return link
+    return None
+
+
+# ---- corpus ----
+
+def _html_email(rng, domain, token, filler_links):
+    rows = []
+    for i in range(filler_links):
+        rows.append(
+            f'<tr><td style="padding:8px"><a href="https://click.mailer.example.net/ls/click?upn={rng.getrandbits(64):x}'
+            f'&amp;u={i}" target="_blank"><img src="https://cdn.{domain}/img/banner{i}.png" alt="offer {i}" '
+            f'width="600"></a><p style="font:14px Arial">Featured listing #{i} on https://www.{domain}/'
+            f'listing/{rng.randint(1000, 9999)}.</p></td></tr>'
+        )
+    return f"""<!DOCTYPE html><html><head><meta charset="utf-8"><style>td{{color:#333}}</style></head>
+<body><table width="100%" cellpadding="0" cellspacing="0">
+<tr><td><a href="https://www.{domain}/"><img src="https://www.{domain}/logo.png" alt="logo"></a></td></tr>
+<tr><td><h1>Welcome!</h1><p>Thanks for registering. Please confirm your email address:</p>
+<a href="https://www.{domain}/account/verify?token={token}&amp;utm_source=email" style="background:#06c">Verify email</a>
+<p>Or paste this link into your browser: https://www.{domain}/account/verify?token={token}&amp;utm_source=email</p></td></tr>
+{''.join(rows)}
+<tr><td><a href='https://facebook.com/{domain}'>Facebook</a> | <a href=https://twitter.com/{domain.split('.')[0]}>Twitter</a>
+<p><a href="https://www.{domain}/unsubscribe?u={token[:8]}">Unsubscribe</a> |
+<a href="https://www.{domain}/privacy">Privacy</a></p></td></tr></table></body></html>"""
+
+
+def _text_email(domain, token):
+    return (
+        f"Hello,\n\nThanks for signing up at {domain}.\n"
+        f"To activate your account open the link below:\n\n"
+        f"https://{domain}/activate.php?code={token}.\n\n"
+        f"If you did not sign up, ignore this email (https://{domain}/help).\n"
+    )
+
+
+def build_corpus(count, seed=7):
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(count):
+        domain = rng.choice(DOMAINS)
+        token = f"{rng.getrandbits(128):032x}"
+        kind = i % 4
+        if kind == 0:
+            body = _text_email(domain, token)
+        elif kind == 3:
+            # Newsletter-sized body
+            body = _html_email(rng, domain, token, filler_links=60)
+        else:
+            body = _html_email(rng, domain, token, filler_links=rng.randint(3, 12))
+        corpus.append((domain, body))
+    return corpus
+
+
+# ---- timing ----
+
+def best_of(repeat, func, corpus):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for domain, body in corpus:
+            func(domain, body)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark verification link extraction")
+    parser.add_argument('--messages', type=int, default=300)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.messages)
+    size_kb = sum(len(body) for _, body in corpus) / 1024
+    print(f"Corpus: {len(corpus)} messages, {size_kb:.0f} KB")
+
+    variants = [
+        ('new (single-pass regex)', lambda d, b: choose_link(extract_links(b), d)),
+        ('old regex + list dedup', lambda d, b: legacy_choose_link(legacy_extract_links(b, use_soup=False), d)),
+    ]
+    if BeautifulSoup:
+        variants.append(('old BeautifulSoup + regex', lambda d, b: legacy_choose_link(legacy_extract_links(b), d)))
+    else:
+        print("bs4 not installed; skipping the BeautifulSoup baseline")
+
+    results = {}
+    for name, func in variants:
+        results[name] = best_of(args.repeat, func, corpus)
+
+    baseline = results['new (single-pass regex)']
+    for name, elapsed in results.items():
+        per_message = elapsed / len(corpus) * 1_000_000
+        print(f"  {name:28} {elapsed * 1000:8.1f} ms  {per_message:7.1f} us/msg  x{elapsed / baseline:.1f}")
+
+    # The new scorer should still land on the verification link
+    misses = 0
+    for domain, body in corpus:
+        link = choose_link(extract_links(body), domain)
+        if not link or not any(word in link for word in ('verify', 'activate')):
+            misses += 1
+    print(f"Verification link chosen in {len(corpus) - misses}/{len(corpus)} messages")
+
+
+if __name__ == '__main__':
+    main()
@@ -3,6 +3,24 @@ Configuration for different websites
 Each site config contains detailed selectors and flow for automation
 """
 import os
+from dotenv import load_dotenv
+
+# Run settings below read the environment at import time, so pick up .env first
+load_dotenv()
+
+# Request-blocking profile for ad-heavy directory sites: aborts heavy
+# resource types and known ad/analytics hosts. Captcha providers are always
+# allowed by BrowserHandler regardless of the profile.
+HEAVY_RESOURCE_PROFILE = {
+    'resource_types': ['image', 'media', 'font'],
+    'domains': [
+        'doubleclick.net', 'googlesyndication.com', 'googleadservices.com',
+        'google-analytics.com', 'googletagmanager.com', 'adservice.google.com',
+        'facebook.net', 'connect.facebook.net', 'hotjar.com', 'clarity.ms',
+        'adnxs.com', 'taboola.com', 'outbrain.com', 'criteo.com',
+    ],
+    'allow': [],
+}
 
 SITES_CONFIG = {
     'freelisting': {
@@ -28,6 +46,9 @@ SITES_CONFIG = {
             'required': True,
             'redirects_to_login': True,
             'wait_for_email': 120,
+            # 'subject': 'Verify',  # optional: ignore emails whose subject lacks this
+            # Optional scoring of the links in the email (utils/link_extractor.py):
+            # 'link_rules': {'pattern': r'/verify', 'keywords': ['activation'], 'avoid': ['login']},
         },
         
         'login': {
@@ -38,6 +59,10 @@ SITES_CONFIG = {
             },
             'submit_button': ['input[name="login"]', '#login', 'Login'],
             'wait_after_login': 3,
+            'logged_in_probe': {
+                'url': 'https://www.freelistinguk.com/my-listings',
+                'logged_out_url': 'login',
+            },
         },
         
         'listing': {
@@ -73,6 +98,13 @@ SITES_CONFIG = {
         'special': {
             'has_captcha': True,
             'slow_loading': False,
+            'block_resources': HEAVY_RESOURCE_PROFILE,
+            'readiness': [
+                {'match': '/register', 'wait_until': 'domcontentloaded',
+                 'selector': 'input[name="user_login"], #user_login', 'settle': 1},
+                {'match': '/login', 'wait_until': 'domcontentloaded',
+                 'selector': 'input[name="password"], #password', 'settle': 1},
+            ],
         }
     },
     
@@ -105,6 +137,10 @@ SITES_CONFIG = {
             },
             'submit_button': ['Login', 'button[type="submit"]'],
             'wait_after_login': 3,
+            'logged_in_probe': {
+                'url': 'https://www.yplocal.com/',
+                'expect_text': ['logout', 'log out', 'sign out'],
+            },
         },
         
         'listing': {
@@ -139,6 +175,15 @@ SITES_CONFIG = {
         'special': {
             'has_captcha': True,
             'slow_loading': False,
+            'block_resources': HEAVY_RESOURCE_PROFILE,
+            # Chat/ad widgets long-poll, so networkidle never arrives here
+            'readiness': [
+                {'match': '/checkout/', 'wait_until': 'domcontentloaded',
+                 'selector': 'input[name="email"], #email', 'settle': 1},
+                {'match': '/login', 'wait_until': 'domcontentloaded',
+                 'selector': 'input[type="password"]', 'settle': 1},
+                {'wait_until': 'load', 'settle': 2},
+            ],
         }
     },
     
@@ -172,6 +217,10 @@ SITES_CONFIG = {
             },
             'submit_button': ['Login', 'button[type="submit"]'],
             'wait_after_login': 3,
+            'logged_in_probe': {
+                'url': 'https://directorynode.com/',
+                'expect_text': ['logout', 'log out', 'sign out'],
+            },
         },
         
         'listing': {
@@ -206,6 +255,13 @@ SITES_CONFIG = {
         'special': {
             'has_captcha': True,
             'slow_loading': False,
+            'block_resources': HEAVY_RESOURCE_PROFILE,
+            'readiness': [
+                {'match': '/register', 'wait_until': 'domcontentloaded',
+                 'selector': 'input[name="username"], #username', 'settle': 1},
+                {'match': '/login', 'wait_until': 'domcontentloaded',
+                 'selector': 'input[type="password"]', 'settle': 1},
+            ],
         }
     },
     
@@ -242,6 +298,10 @@ SITES_CONFIG = {
             },
             'submit_button': ['input[name="submit"]', 'input[type="submit"]'],
             'wait_after_login': 3,
+            'logged_in_probe': {
+                'url': 'https://unolist.in/myaccount/myclassifieds.html',
+                'logged_out_url': 'login',
+            },
         },
         
         'listing': {
@@ -279,6 +339,8 @@ SITES_CONFIG = {
         'special': {
             'has_captcha': True,
             'slow_loading': False,
+            # Submit buttons are <input type="image">, so keep images loading
+            'block_resources': dict(HEAVY_RESOURCE_PROFILE, resource_types=['media', 'font']),
         }
     },
 }
@@ -286,6 +348,85 @@ SITES_CONFIG = {
 # Active sites to process
 TARGET_SITES = ['yplocal']
 
+# Number of sites processed at once. Each worker gets its own browser
+# context and page on one shared Chromium; 1 keeps the sequential flow.
+CONCURRENT_WORKERS = int(os.getenv('CONCURRENT_WORKERS', 1))
+
+# Politeness limits, in site starts per second. Each domain gets its own
+# token bucket so other domains never wait on it; a site can override the
+# default with SITES_CONFIG[...]['special']['rate_limit'] = {'rate': .., 'burst': ..}.
+# The global bucket caps starts across all domains (rate 0 = no cap).
+_ACTION_DELAY = float(os.getenv('ACTION_DELAY', 5))
+DOMAIN_RATE_LIMIT = {
+    'rate': 1 / _ACTION_DELAY if _ACTION_DELAY > 0 else 0,
+    'burst': 1,
+}
+GLOBAL_RATE_LIMIT = {
+    'rate': float(os.getenv('GLOBAL_SITE_RATE', 0)),
+    'burst': int(os.getenv('GLOBAL_SITE_BURST', 1)),
+}
+
+# Per-site special['readiness']: rules goto() uses to decide a page is ready.
+# The first rule whose 'match' is a substring of the URL wins (no 'match' =
+# any URL); without a matching rule goto waits for load + networkidle + 2s.
+#   wait_until  - 'commit' / 'domcontentloaded' / 'load' for page.goto
+#   selector    - key element that must be visible
+#   response    - URL substring of an XHR that must complete
+#   networkidle - also wait for network idle (default off in rules)
+#   settle      - seconds of DOM quiet afterwards
+#   timeout     - seconds for the selector/response/networkidle waits
+
+# Upper bounds (seconds) for the condition-based waits in utils/wait_engine.py.
+# A site can override any of them with SITES_CONFIG[...]['special']['wait_caps'].
+DEFAULT_WAIT_CAPS = {
+    'url_change': 15,   # submit -> new URL
+    'selector': 10,     # element appears
+    'response': 15,     # matching XHR/fetch response
+    'dom_quiet': 5,     # no DOM mutations for a short window
+    'load': 15,         # load / networkidle states
+    'submit': 15,       # form submit -> navigation or its POST/XHR response
+}
+
+# Attach to a long-lived local Chromium (utils/browser_daemon.py) over CDP
+# instead of launching a fresh one every run; each run gets its own context.
+BROWSER_DAEMON = os.getenv('BROWSER_DAEMON', 'False').lower() == 'true'
+BROWSER_DAEMON_PORT = int(os.getenv('BROWSER_DAEMON_PORT', 9222))
+
+# Start a fresh browser context (carrying cookies/localStorage over) after
+# max_sites sites, or when the browser's process tree exceeds max_rss_mb.
+# 0 disables either check.
+BROWSER_RECYCLE = {
+    'max_sites': int(os.getenv('RECYCLE_AFTER_SITES', 20)),
+    'max_rss_mb': int(os.getenv('MAX_BROWSER_RSS_MB', 1500)),
+}
+
+# Winning selector/strategy per (domain, form, field), reused across runs
+SELECTOR_CACHE_FILE = os.getenv('SELECTOR_CACHE_FILE', 'selector_cache.json')
+
+# Saved logins (cookies + localStorage) per site domain: sessions/<domain>.json.
+# A site's login['logged_in_probe'] decides whether a saved session still works:
+#   url            - page fetched with the session's cookies
+#   logged_out_url - fragment of the final URL when redirected to log in
+#   expect_text    - any of these in the response body means logged in
+SESSIONS_DIR = os.getenv('SESSIONS_DIR', 'sessions')
+
+# Screenshot, DOM and recent network events captured when a site fails,
+# written in the background to ARTIFACTS_DIR; the oldest captures are
+# dropped once the directory exceeds ARTIFACTS_MAX_MB
+ARTIFACTS_DIR = os.getenv('ARTIFACTS_DIR', 'artifacts')
+ARTIFACTS_MAX_MB = int(os.getenv('ARTIFACTS_MAX_MB', 200))
+NETWORK_EVENTS_KEPT = int(os.getenv('NETWORK_EVENTS_KEPT', 100))
+
+# Mailbox that receives verification emails. IDLE is used when the server
+# supports it; IMAP_SSL=0 allows a plain local stand-in server for testing
+IMAP_SERVER = os.getenv('IMAP_SERVER', 'imap.gmail.com')
+IMAP_PORT = int(os.getenv('IMAP_PORT', 993))
+IMAP_SSL = os.getenv('IMAP_SSL', '1') not in ('0', 'false', 'False')
+
+# Per-account UIDVALIDITY and highest inbox UID already looked at, so each
+# mailbox check (and the next run) only searches mail newer than that
+IMAP_STATE_FILE = os.getenv('IMAP_STATE_FILE', 'imap_state.json')
+
 # Credentials storage file
 CREDENTIALS_FILE = 'credentials.json'
 CREDENTIALS_PATH = os.environ.get("CREDENTIALS_PATH", "credentials.json")
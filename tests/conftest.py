@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Tests import the project modules the way backlink_automator.py does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
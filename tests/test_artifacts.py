@@ -0,0 +1,26 @@
+import os
+import threading
+
+from utils.artifacts import ArtifactWriter
+
+
+def test_submissions_beyond_max_pending_are_dropped(tmp_path, monkeypatch):
+    writer = ArtifactWriter(str(tmp_path), max_pending=2)
+    release = threading.Event()
+    real_write = writer._write
+
+    def slow_write(target, files):
+        release.wait(5)
+        real_write(target, files)
+
+    monkeypatch.setattr(writer, '_write', slow_write)
+
+    targets = [writer.submit(f'site{i}', {'meta.json': '{}'}) for i in range(6)]
+    # One capture is being written, two wait in the queue, the rest are dropped
+    assert targets.count(None) >= 3
+    assert writer.dropped == targets.count(None)
+
+    release.set()
+    assert writer.flush(timeout=5)
+    for target in filter(None, targets):
+        assert os.path.exists(os.path.join(target, 'meta.json.gz'))
@@ -0,0 +1,181 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from utils.async_bridge import Blocking, await_only, greenlet_spawn
+from utils.tracer import Tracer
+from utils.wait_engine import WaitEngine
+
+
+class _Info:
+    # Results are only wrapped when they come from Playwright
+    __module__ = 'playwright.async_api'
+
+    def __init__(self, value):
+        self._value = value
+
+    @property
+    async def value(self):
+        return self._value
+
+
+class _Expect:
+    """Stand-in for async_api's expect_*() context manager"""
+    __module__ = 'playwright.async_api'
+
+    def __init__(self, page):
+        self.page = page
+
+    async def __aenter__(self):
+        return _Info(self.page.url)
+
+    async def __aexit__(self, *exc):
+        self.page.exited = exc[0]
+
+
+class _AsyncPage:
+    """async_api Page stand-in: methods are coroutines, events may be async handlers"""
+
+    def __init__(self):
+        self.url = 'https://example.com/register'
+        self.listeners = {}
+        self.exited = 'not yet'
+
+    def on(self, event, handler):
+        self.listeners.setdefault(event, []).append(handler)
+
+    def remove_listener(self, event, handler):
+        self.listeners[event].remove(handler)
+
+    async def emit(self, event, *args):
+        for handler in list(self.listeners.get(event, [])):
+            result = handler(*args)
+            if asyncio.iscoroutine(result):
+                await result
+
+    async def wait_for_timeout(self, ms):
+        await asyncio.sleep(ms / 1000)
+
+    async def goto(self, url):
+        await asyncio.sleep(0.01)
+        if 'slow' in url:
+            raise TimeoutError(f"Timeout navigating to {url}")
+        self.url = url
+
+    async def evaluate(self, script, arg=None):
+        return True
+
+    async def wait_for_load_state(self, state, timeout=None):
+        pass
+
+    def expect_navigation(self, timeout=None):
+        return _Expect(self)
+
+
+def test_blocking_calls_interleave_on_one_loop():
+    pages = [Blocking(_AsyncPage()) for _ in range(3)]
+
+    def flow(page):
+        page.wait_for_timeout(200)
+        page.goto('https://example.com/done')
+        return page.url
+
+    async def main():
+        return await asyncio.gather(*(greenlet_spawn(flow, page) for page in pages))
+
+    started = time.monotonic()
+    assert asyncio.run(main()) == ['https://example.com/done'] * 3
+    assert time.monotonic() - started < 0.5
+
+
+def test_errors_reach_the_blocking_code():
+    page = Blocking(_AsyncPage())
+
+    def flow():
+        try:
+            page.goto('https://example.com/slow')
+        except TimeoutError as e:
+            return str(e)
+
+    assert asyncio.run(greenlet_spawn(flow)) == "Timeout navigating to https://example.com/slow"
+
+
+def test_handlers_may_use_the_page_and_can_be_removed():
+    target = _AsyncPage()
+    page = Blocking(target)
+    seen = []
+
+    def on_response(response):
+        # Runs in its own greenlet, so it can wait on the page itself
+        page.wait_for_timeout(10)
+        seen.append(response)
+
+    async def main():
+        await greenlet_spawn(page.on, 'response', on_response)
+        await target.emit('response', 'first')
+        await greenlet_spawn(page.remove_listener, 'response', on_response)
+        await target.emit('response', 'second')
+
+    asyncio.run(main())
+    assert seen == ['first']
+    assert target.listeners['response'] == []
+
+
+def test_expect_context_manager_works_in_a_with_block():
+    target = _AsyncPage()
+    page = Blocking(target)
+
+    def flow():
+        with page.expect_navigation(timeout=1000) as info:
+            page.goto('https://example.com/welcome')
+        return info.value
+
+    assert asyncio.run(greenlet_spawn(flow)) == 'https://example.com/register'
+    assert target.exited is None
+
+
+def test_await_only_needs_greenlet_spawn():
+    with pytest.raises(RuntimeError):
+        await_only(object())
+
+
+def test_wait_engine_runs_on_an_async_page():
+    target = _AsyncPage()
+    engine = WaitEngine(SimpleNamespace(page=Blocking(target)), {'submit': 10})
+
+    def submit():
+        with engine.for_submit(timeout=3):
+            pass
+
+    async def main():
+        async def answer():
+            await asyncio.sleep(0.2)
+            request = SimpleNamespace(method='POST', resource_type='xhr',
+                                      is_navigation_request=lambda: False, frame=None)
+            await target.emit('response', SimpleNamespace(url='https://example.com/api', request=request))
+        await asyncio.gather(greenlet_spawn(submit), answer())
+
+    started = time.monotonic()
+    asyncio.run(main())
+    assert time.monotonic() - started < 1
+    assert engine.stats['submit']['timed_out'] == 0
+    assert target.listeners['response'] == []
+
+
+def test_tracer_bindings_stay_with_their_site():
+    tracer = Tracer()
+    tracer.enabled = True
+    page = Blocking(_AsyncPage())
+
+    def site(name, delay):
+        with tracer.bind(site=name):
+            page.wait_for_timeout(delay)
+            tracer.record('fill', time.monotonic())
+
+    async def main():
+        await asyncio.gather(greenlet_spawn(site, 'a.com', 10), greenlet_spawn(site, 'b.com', 100))
+
+    asyncio.run(main())
+    assert sorted(event['args']['site'] for event in tracer.events if event['ph'] == 'X') == ['a.com', 'b.com']
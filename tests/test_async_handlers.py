@@ -0,0 +1,171 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+
+import pytest
+
+pytest.importorskip('playwright')
+pytest.importorskip('dotenv')
+
+import utils.async_browser_handler as async_browser_handler  # noqa: E402
+from utils.async_browser_handler import AsyncBrowserHandler  # noqa: E402
+from utils.async_site_handler import AsyncSiteHandler  # noqa: E402
+from utils.email_handler import EmailHandler  # noqa: E402
+
+
+class _Fake:
+    def on(self, event, handler):
+        pass
+
+    async def close(self):
+        self.closed = True
+
+
+class _Page(_Fake):
+    def __init__(self):
+        self.url = 'about:blank'
+
+    def set_default_timeout(self, timeout):
+        pass
+
+    async def goto(self, url, wait_until=None):
+        await asyncio.sleep(0.2)
+        self.url = url
+
+    async def wait_for_load_state(self, state, timeout=None):
+        pass
+
+    async def wait_for_timeout(self, ms):
+        await asyncio.sleep(ms / 1000)
+
+    async def evaluate(self, script, arg=None):
+        return True
+
+
+class _Context(_Fake):
+    async def expose_binding(self, name, callback):
+        pass
+
+    async def add_init_script(self, script):
+        pass
+
+    async def new_page(self):
+        return _Page()
+
+
+class _Browser(_Fake):
+    async def new_context(self, **options):
+        return _Context()
+
+    async def new_browser_cdp_session(self):
+        raise Exception("no CDP in tests")
+
+
+class _Chromium(_Fake):
+    def __init__(self):
+        self.launched = 0
+
+    async def launch(self, headless=False):
+        self.launched += 1
+        return _Browser()
+
+
+class _Playwright(_Fake):
+    def __init__(self):
+        self.chromium = _Chromium()
+
+    async def stop(self):
+        pass
+
+
+# Only objects from Playwright are wrapped for the sync-style code
+for _cls in (_Page, _Context, _Browser, _Chromium, _Playwright):
+    _cls.__module__ = 'playwright.async_api'
+
+
+class _Starter:
+    def __init__(self, playwright):
+        self.playwright = playwright
+
+    async def start(self):
+        return self.playwright
+
+
+class _Logger:
+    def info(self, message):
+        pass
+
+    error = warning = info
+
+
+def test_sessions_share_one_browser_and_navigate_concurrently(monkeypatch):
+    playwright = _Playwright()
+    monkeypatch.setattr(async_browser_handler, 'async_playwright', lambda: _Starter(playwright))
+
+    async def main():
+        browser = AsyncBrowserHandler(headless=True)
+        await browser.start()
+        sessions = [await browser.new_session() for _ in range(3)]
+        started = time.monotonic()
+        results = await asyncio.gather(*(
+            session.goto(f"https://site{i}.example/", wait_for='load') for i, session in enumerate(sessions)
+        ))
+        elapsed = time.monotonic() - started
+        for session in sessions:
+            await session.close()
+        return sessions, results, elapsed
+
+    sessions, results, elapsed = asyncio.run(main())
+    assert results == [True, True, True]
+    assert elapsed < 0.5
+    assert playwright.chromium.launched == 1
+    # Attributes come back as the async_api objects
+    assert [session.page.url for session in sessions] == [f"https://site{i}.example/" for i in range(3)]
+    assert len({id(session.page) for session in sessions}) == 3
+    assert all(session.page.closed for session in sessions)
+    assert all(session.metrics['navigations'][0]['ready'] for session in sessions)
+
+
+def _site_handler(monkeypatch, wait_for_email, link_after):
+    config = {'name': 'Example', 'domain': 'example.com', 'email_verification': {'wait_for_email': wait_for_email}}
+    site = AsyncSiteHandler(config, AsyncBrowserHandler(), None, {}, 'https://example.org', _Logger())
+    future = Future()
+
+    def process(defer_verification=False):
+        assert defer_verification
+        site.handler.pending_verification = future
+        threading.Timer(link_after, future.set_result, ['https://example.com/verify']).start()
+        return {'status': 'pending_verification', 'profile_url': None, 'error': None}
+
+    monkeypatch.setattr(site.handler, 'process', process)
+    monkeypatch.setattr(site.handler, 'resume', lambda: {'status': 'success', 'profile_url': future.result()})
+    monkeypatch.setattr(EmailHandler, 'RESULT_MARGIN', 0)
+    return site
+
+
+def test_verification_wait_does_not_hold_the_loop(monkeypatch):
+    site = _site_handler(monkeypatch, wait_for_email=5, link_after=0.3)
+    ticks = []
+
+    async def ticker():
+        for _ in range(5):
+            ticks.append(time.monotonic())
+            await asyncio.sleep(0.05)
+
+    async def main():
+        result, _ = await asyncio.gather(site.process(), ticker())
+        return result
+
+    assert asyncio.run(main()) == {'status': 'success', 'profile_url': 'https://example.com/verify'}
+    # The ticker kept its pace while the site waited for its link
+    assert max(b - a for a, b in zip(ticks, ticks[1:])) < 0.2
+
+
+def test_verification_wait_is_bounded(monkeypatch):
+    site = _site_handler(monkeypatch, wait_for_email=0.2, link_after=1)
+    started = time.monotonic()
+    result = asyncio.run(site.process())
+    assert time.monotonic() - started < 0.8
+    assert result['status'] == 'failed'
+    assert result['error'] == 'Verification email wait timed out'
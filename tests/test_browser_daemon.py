@@ -0,0 +1,40 @@
+import json
+import os
+import subprocess
+import sys
+
+from utils.browser_daemon import BrowserDaemon
+
+
+def test_stop_leaves_unrelated_process_alone(tmp_path):
+    """A stale state file whose pid now belongs to another process"""
+    other = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)'])
+    try:
+        daemon = BrowserDaemon(port=1, state_dir=str(tmp_path))
+        daemon._save_state({'pid': other.pid, 'port': 1})
+
+        assert daemon.stop() is False
+        assert other.poll() is None
+        with open(daemon.state_file, encoding='utf-8') as f:
+            assert 'pid' not in json.load(f)
+    finally:
+        other.kill()
+        other.wait()
+
+
+def test_daemon_process_is_recognised_by_port_and_profile(tmp_path):
+    daemon = BrowserDaemon(port=9333, state_dir=str(tmp_path))
+    profile = os.path.abspath(daemon.user_data_dir)
+    # Stand-in for Chromium: only the command line matters
+    proc = subprocess.Popen([
+        sys.executable, '-c', 'import time; print(flush=True); time.sleep(30)',
+        '--remote-debugging-port=9333', f'--user-data-dir={profile}',
+    ], stdout=subprocess.PIPE)
+    try:
+        proc.stdout.readline()  # started, command line in place
+        assert daemon._is_daemon_process(proc.pid)
+        assert not BrowserDaemon(port=9334, state_dir=str(tmp_path))._is_daemon_process(proc.pid)
+    finally:
+        proc.kill()
+        proc.wait()
+        proc.stdout.close()
@@ -0,0 +1,38 @@
+import logging
+
+import pytest
+
+pytest.importorskip('playwright')
+
+from utils.site_handler import SiteHandler  # noqa: E402
+
+
+class _Browser:
+    def __init__(self, interactive):
+        self.interactive = interactive
+        self.captcha_signal = {'vendor': 'recaptcha', 'url': 'https://example.com/'}
+        self.paused = False
+
+    def can_pause_for_captcha(self):
+        return self.interactive
+
+    def handle_captcha_pause(self):
+        self.paused = True
+
+
+def _site(browser):
+    config = {'name': 'Example', 'domain': 'example.com', 'special': {'has_captcha': True}}
+    return SiteHandler(config, browser, None, {}, 'https://mysite.example', logging.getLogger('test'))
+
+
+def test_unattended_run_fails_the_site_instead_of_pausing():
+    browser = _Browser(interactive=False)
+    with pytest.raises(Exception, match='no interactive terminal'):
+        _site(browser)._captcha_gate("login form")
+    assert not browser.paused
+
+
+def test_interactive_run_pauses():
+    browser = _Browser(interactive=True)
+    _site(browser)._captcha_gate("login form")
+    assert browser.paused
@@ -0,0 +1,57 @@
+import io
+import threading
+import time
+
+import pytest
+
+pytest.importorskip('playwright')
+
+from utils.browser_handler import BrowserHandler  # noqa: E402
+
+
+class _Page:
+    def wait_for_timeout(self, ms):
+        time.sleep(ms / 1000)
+
+
+class _Stdin(io.StringIO):
+    def __init__(self, text, tty):
+        super().__init__(text)
+        self.tty = tty
+
+    def isatty(self):
+        return self.tty
+
+
+def _handler():
+    handler = BrowserHandler()
+    handler.page = _Page()
+    return handler
+
+
+def _pause_in_thread(handler):
+    """Run handle_captcha_pause with a deadline; returns the exception raised"""
+    outcome = {}
+
+    def run():
+        try:
+            handler.handle_captcha_pause()
+            outcome['error'] = None
+        except Exception as e:
+            outcome['error'] = e
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(5)
+    assert not thread.is_alive(), "handle_captcha_pause hung"
+    return outcome['error']
+
+
+def test_pause_fails_without_a_terminal(monkeypatch):
+    monkeypatch.setattr('sys.stdin', _Stdin('\n', tty=False))
+    assert 'not interactive' in str(_pause_in_thread(_handler()))
+
+
+def test_pause_fails_when_stdin_closes(monkeypatch):
+    monkeypatch.setattr('sys.stdin', _Stdin('', tty=True))
+    assert 'stdin closed' in str(_pause_in_thread(_handler()))
@@ -0,0 +1,88 @@
+import socket
+import threading
+import time
+import warnings
+
+from utils.email_handler import EmailHandler
+
+
+def _serve(listener, idle_reply, hang_on=None):
+    """
+    Minimal IMAP stand-in: enough for login, CAPABILITY, SELECT and IDLE;
+    commands named hang_on are never answered (a half-open connection)
+    """
+    conn, _ = listener.accept()
+    reader = conn.makefile('rb')
+    conn.sendall(b'* OK stand-in ready\r\n')
+    while True:
+        line = reader.readline()
+        if not line:
+            return
+        tag, command = line.split()[:2]
+        command = command.upper()
+        if command == hang_on:
+            continue
+        if command == b'CAPABILITY':
+            conn.sendall(b'* CAPABILITY IMAP4rev1 IDLE\r\n' + tag + b' OK done\r\n')
+        elif command == b'SELECT':
+            conn.sendall(b'* 2 EXISTS\r\n' + tag + b' OK [READ-WRITE] selected\r\n')
+        elif command == b'IDLE':
+            conn.sendall(idle_reply)
+            assert reader.readline().strip() == b'DONE'
+            conn.sendall(tag + b' OK IDLE terminated\r\n')
+        elif command == b'LOGOUT':
+            conn.sendall(b'* BYE\r\n' + tag + b' OK done\r\n')
+            return
+        else:
+            conn.sendall(tag + b' OK done\r\n')
+
+
+def _handler(idle_reply, hang_on=None, command_timeout=None):
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(1)
+    threading.Thread(target=_serve, args=(listener, idle_reply, hang_on), daemon=True).start()
+    handler = EmailHandler('user', 'secret', '127.0.0.1', listener.getsockname()[1], use_ssl=False)
+    if command_timeout:
+        handler.COMMAND_TIMEOUT = command_timeout
+    assert handler.connect()
+    assert handler.idle_supported
+    handler.mail.select('inbox')
+    return handler
+
+
+def test_idle_sees_exists_sent_with_continuation():
+    # Both lines in one packet: the EXISTS is already buffered when IDLE starts
+    handler = _handler(b'+ idling\r\n* 3 EXISTS\r\n')
+    started = time.time()
+    assert handler._idle(5) is True
+    assert time.time() - started < 1
+    handler.disconnect()
+
+
+def test_idle_times_out_without_new_mail():
+    handler = _handler(b'+ idling\r\n')
+    started = time.time()
+    assert handler._idle(1) is False
+    assert time.time() - started >= 1
+    handler.disconnect()
+
+
+def test_hung_command_does_not_stop_deadlines():
+    # The server stops answering after SELECT; UID SEARCH never completes
+    handler = _handler(b'+ idling\r\n', hang_on=b'UID', command_timeout=1)
+    handler._selected = True
+    started = time.time()
+    future = handler.verification_link_future('example.com', max_wait=1)
+    assert future.result(timeout=10) is None
+    assert time.time() - started < 5
+    handler.watcher.stop()
+
+
+def test_get_verification_link_accepts_deprecated_check_interval():
+    handler = EmailHandler('user', 'secret')
+    handler.wait_for_verification_email = lambda domain, max_wait: (domain, max_wait)
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        assert handler.get_verification_link('example.com', 5, check_interval=10) == ('example.com', 5)
+    assert caught and issubclass(caught[0].category, DeprecationWarning)
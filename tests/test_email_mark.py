@@ -0,0 +1,63 @@
+from utils.email_handler import EmailHandler
+
+
+def _fetch_line(seq, uid):
+    envelope = (
+        f'("Mon, 1 Jan 2024 00:00:00 +0000" "Message {uid}" '
+        f'((NIL NIL "noreply" "example.com")) NIL NIL NIL NIL NIL NIL "<{uid}@example.com>")'
+    )
+    structure = '("text" "plain" ("charset" "utf-8") NIL NIL "7bit" 10 1)'
+    return f'{seq} (UID {uid} ENVELOPE {envelope} BODYSTRUCTURE {structure})'.encode()
+
+
+class _Mailbox:
+    """imaplib stand-in holding UIDs 1..count"""
+
+    def __init__(self, count, fail_fetch_from=None):
+        self.uids = list(range(1, count + 1))
+        self.fail_fetch_from = fail_fetch_from
+        self.fetches = []
+
+    def uid(self, command, *args):
+        if command == 'search':
+            if args[1] == 'UID':
+                low = int(args[2].split(':')[0])
+                found = [u for u in self.uids if u >= low] or self.uids[-1:]
+            else:
+                found = self.uids
+            return 'OK', [b' '.join(str(u).encode() for u in found)]
+        wanted = [int(u) for u in args[0].split(b',')]
+        self.fetches.append(wanted)
+        if self.fail_fetch_from is not None and wanted[0] >= self.fail_fetch_from:
+            raise OSError("connection reset")
+        return 'OK', [_fetch_line(n, u) for n, u in enumerate(wanted, 1)]
+
+
+def _handler(mailbox, last_uid):
+    handler = EmailHandler('user', 'secret')
+    handler.mail = mailbox
+    handler._selected = True
+    handler.uidvalidity, handler.last_uid = 1, last_uid
+    return handler
+
+
+def test_every_new_message_is_fetched_in_batches():
+    mailbox = _Mailbox(120)
+    handler = _handler(mailbox, last_uid=5)
+
+    headers = handler.fetch_new(batch_size=50)
+
+    assert [int(h['uid']) for h in headers] == list(range(6, 121))
+    assert [len(batch) for batch in mailbox.fetches] == [50, 50, 15]
+    assert handler.last_uid == 120
+    assert handler.fetch_new() == []
+
+
+def test_mark_stays_put_when_a_batch_fails():
+    mailbox = _Mailbox(120, fail_fetch_from=56)
+    handler = _handler(mailbox, last_uid=5)
+    try:
+        handler.fetch_new(batch_size=50)
+    except OSError:
+        pass
+    assert handler.last_uid == 5
@@ -0,0 +1,42 @@
+from concurrent.futures import Future
+
+from utils.har_archive import HarArchive
+
+
+class _Inbox:
+    """Email handler stand-in that hands out fixed links"""
+
+    def __init__(self, links):
+        self.links = links
+
+    def wait_for_verification_email(self, domain, max_wait=120, subject=None, link_rules=None):
+        return self.links.get(domain)
+
+    def verification_link_future(self, domain, max_wait=120, subject=None, link_rules=None):
+        future = Future()
+        future.set_result(self.links.get(domain))
+        return future
+
+
+class _NoInbox:
+    """Fails on any use: replay must not reach IMAP"""
+
+    def __getattr__(self, name):
+        raise AssertionError(f"replay used the live inbox ({name})")
+
+
+def test_replay_serves_recorded_links_without_imap(tmp_path):
+    inbox = _Inbox({
+        'a.example': 'https://a.example/verify?t=1',
+        'b.example': 'https://b.example/confirm/2',
+    })
+    recorder = HarArchive(str(tmp_path), 'record').email_handler(inbox)
+    assert recorder.wait_for_verification_email('a.example', max_wait=5) == 'https://a.example/verify?t=1'
+    assert recorder.verification_link_future('b.example', max_wait=5).result() == 'https://b.example/confirm/2'
+
+    replayer = HarArchive(str(tmp_path), 'replay').email_handler(_NoInbox())
+    assert replayer.connect()
+    assert replayer.wait_for_verification_email('a.example') == 'https://a.example/verify?t=1'
+    assert replayer.verification_link_future('b.example').result(timeout=0) == 'https://b.example/confirm/2'
+    assert replayer.wait_for_verification_email('c.example') is None
+    replayer.disconnect()
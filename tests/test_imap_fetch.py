@@ -0,0 +1,109 @@
+from utils.imap_fetch import (
+    decode_part, envelope_sender, fetch_headers, fetch_texts, find_text_part, parse_fetch,
+)
+
+# multipart/mixed( multipart/alternative(text/plain, text/html), application/pdf )
+NESTED_STRUCTURE = (
+    b'((("text" "plain" ("charset" "us-ascii") NIL NIL "7bit" 20 1 NIL NIL NIL)'
+    b'("text" "html" ("charset" "iso-8859-1") NIL NIL "quoted-printable" 40 2 NIL NIL NIL)'
+    b' "alternative" ("boundary" "inner") NIL NIL)'
+    b'("application" "pdf" ("name" "invoice.pdf") NIL NIL "base64" 5000 NIL NIL NIL)'
+    b' "mixed" ("boundary" "outer") NIL NIL)'
+)
+
+
+def _envelope(subject, from_name, mailbox, host):
+    return (
+        b'("Mon, 1 Jan 2024 10:00:00 +0000" ' + subject
+        + b' ((' + from_name + b' NIL "' + mailbox + b'" "' + host + b'")) NIL NIL NIL NIL NIL NIL "<id@x>")'
+    )
+
+
+def test_literal_values_are_read_by_length():
+    # imaplib splits literals into (prefix, literal) tuples; the subject
+    # literal holds quotes and parentheses that must not be parsed
+    subject = b'Confirm "your" (account)'
+    data = [
+        (b'1 (UID 42 ENVELOPE ("Mon, 1 Jan 2024 10:00:00 +0000" {%d}' % len(subject), subject),
+        b' ((NIL NIL "noreply" "example.com")) NIL NIL NIL NIL NIL NIL "<id@x>"))',
+    ]
+    items = parse_fetch(data)[b'42']
+    assert items['ENVELOPE'][1] == subject
+    assert envelope_sender(items['ENVELOPE']) == 'noreply@example.com'
+
+
+def test_body_literal_is_returned_verbatim():
+    body = b'line one\r\n(not a list) "not quoted"\r\n'
+    data = [(b'3 (UID 7 BODY[1.2] {%d}' % len(body), body), b')']
+    assert parse_fetch(data)[b'7']['BODY[1.2]'] == body
+
+
+def test_nested_multipart_prefers_the_html_part():
+    structure = parse_fetch([b'1 (UID 9 BODYSTRUCTURE ' + NESTED_STRUCTURE + b')'])[b'9']['BODYSTRUCTURE']
+    assert find_text_part(structure) == {
+        'section': '1.2', 'subtype': 'html', 'encoding': 'quoted-printable', 'charset': 'iso-8859-1',
+    }
+
+
+def test_single_part_message_is_section_one():
+    structure = parse_fetch([b'1 (UID 9 BODYSTRUCTURE ("text" "plain" NIL NIL NIL "base64" 8 1))'])[b'9']
+    assert find_text_part(structure['BODYSTRUCTURE']) == {
+        'section': '1', 'subtype': 'plain', 'encoding': 'base64', 'charset': 'utf-8',
+    }
+
+
+def test_sender_with_nil_and_encoded_names():
+    envelope = parse_fetch([b'1 (UID 1 ENVELOPE ' + _envelope(b'"Hi"', b'NIL', b'Info', b'Example.COM') + b')'])
+    assert envelope_sender(envelope[b'1']['ENVELOPE']) == 'info@example.com'
+
+    named = parse_fetch([
+        b'1 (UID 1 ENVELOPE ' + _envelope(b'"Hi"', b'"=?utf-8?q?Caf=C3=A9_Team?="', b'hello', b'cafe.example') + b')'
+    ])
+    assert envelope_sender(named[b'1']['ENVELOPE']) == 'café team <hello@cafe.example>'
+
+
+def test_unsolicited_fetch_without_uid_is_skipped():
+    data = [
+        b'4 (FLAGS (\\Seen))',
+        b'5 (UID 12 FLAGS (\\Seen) BODYSTRUCTURE ("text" "html" NIL NIL NIL "7bit" 5 1))',
+    ]
+    assert list(parse_fetch(data)) == [b'12']
+
+
+def test_decode_part_handles_transfer_encodings_and_bad_charsets():
+    assert decode_part(b'Q2xpY2sgaGVyZQ==', 'base64', 'utf-8') == 'Click here'
+    assert decode_part(b'caf=E9 =\r\nlink', 'quoted-printable', 'iso-8859-1') == 'café link'
+    assert decode_part(b'plain', '7bit', 'no-such-charset') == 'plain'
+
+
+class _Mail:
+    """imaplib stand-in answering UID FETCH from canned responses"""
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.commands = []
+
+    def uid(self, command, uids, items):
+        self.commands.append((uids, items))
+        return 'OK', self.responses[items]
+
+
+def test_headers_and_texts_take_one_command_each():
+    mail = _Mail({
+        '(UID ENVELOPE BODYSTRUCTURE)': [
+            b'1 (UID 5 ENVELOPE ' + _envelope(b'"Verify"', b'NIL', b'a', b'x.example')
+            + b' BODYSTRUCTURE ("text" "html" NIL NIL NIL "7bit" 5 1))',
+            b'2 (UID 6 ENVELOPE ' + _envelope(b'"Verify"', b'NIL', b'b', b'y.example')
+            + b' BODYSTRUCTURE ("text" "html" NIL NIL NIL "7bit" 5 1))',
+        ],
+        '(UID BODY.PEEK[1])': [
+            (b'1 (UID 5 BODY[1] {5}', b'<p>Hi'), b')',
+            (b'2 (UID 6 BODY[1] {5}', b'hello'), b')',
+        ],
+    })
+    headers = fetch_headers(mail, [b'5', b'6'])
+    assert [h['sender'] for h in headers] == ['a@x.example', 'b@y.example']
+
+    texts = fetch_texts(mail, headers)
+    assert texts == {b'5': '<p>Hi', b'6': 'hello'}
+    assert mail.commands == [(b'5,6', '(UID ENVELOPE BODYSTRUCTURE)'), (b'5,6', '(UID BODY.PEEK[1])')]
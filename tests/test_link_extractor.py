@@ -0,0 +1,31 @@
+from utils.link_extractor import choose_link, extract_links
+
+
+def test_extract_links_dedups_and_unescapes_in_order():
+    body = (
+        '<a href="https://example.com/verify?u=1&amp;t=2">Verify</a> '
+        'or open https://example.com/verify?u=1&t=2. '
+        "<a href='https://example.com/'>home</a> (see https://other.org/help)."
+    )
+    assert extract_links(body) == [
+        'https://example.com/verify?u=1&t=2',
+        'https://example.com/',
+        'https://other.org/help',
+    ]
+
+
+def test_choose_link_prefers_keywords_and_skips_unsubscribe():
+    links = [
+        'https://example.com/unsubscribe?token=1',
+        'https://example.com/',
+        'https://click.mailer.net/?to=example.com/confirm',
+        'https://www.example.com/confirm?token=2',
+    ]
+    assert choose_link(links, 'example.com') == 'https://www.example.com/confirm?token=2'
+
+
+def test_choose_link_rules():
+    links = ['https://example.com/verify?t=1', 'https://example.com/a/activation/9']
+    assert choose_link(links, 'example.com', {'pattern': r'/a/activation/'}) == links[1]
+    assert choose_link(links, 'example.com', {'avoid': ['verify']}) == links[1]
+    assert choose_link(links, 'other.org') is None
@@ -0,0 +1,30 @@
+import socket
+import time
+
+from utils.email_handler import EmailHandler
+
+
+def _refused_port():
+    """A local port with nothing listening on it"""
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def test_future_times_out_when_mailbox_unreachable():
+    handler = EmailHandler('user', 'secret', '127.0.0.1', _refused_port(), use_ssl=False)
+    assert handler.connect() is False
+
+    started = time.time()
+    future = handler.verification_link_future('example.com', max_wait=1)
+    assert future.result(timeout=5) is None
+    assert time.time() - started < 3
+
+
+def test_wait_for_verification_email_returns_none_when_unreachable():
+    handler = EmailHandler('user', 'secret', '127.0.0.1', _refused_port(), use_ssl=False)
+    started = time.time()
+    assert handler.wait_for_verification_email('example.com', max_wait=1) is None
+    assert time.time() - started < 3
@@ -0,0 +1,26 @@
+import os
+
+import pytest
+
+from utils.memory_monitor import MemoryMonitor, process_tree
+
+
+@pytest.mark.skipif(not process_tree(os.getpid()), reason="needs psutil or /proc")
+def test_one_recycle_per_browser_within_cooldown():
+    # Two handlers attached to the same browser (here: this process)
+    first, second = MemoryMonitor(), MemoryMonitor()
+    first.pid = second.pid = os.getpid()
+
+    assert first.claim_recycle(max_rss_mb=1, cooldown=60)
+    assert second.claim_recycle(max_rss_mb=1, cooldown=60) is None
+    assert first.claim_recycle(max_rss_mb=1, cooldown=60) is None
+    # Below the ceiling nobody recycles
+    assert second.claim_recycle(max_rss_mb=10_000_000, cooldown=0) is None
+
+
+@pytest.mark.skipif(not process_tree(os.getpid()), reason="needs psutil or /proc")
+def test_recycle_allowed_again_after_cooldown():
+    monitor = MemoryMonitor()
+    monitor.pid = os.getppid()
+    assert monitor.claim_recycle(max_rss_mb=0.001, cooldown=0)
+    assert monitor.claim_recycle(max_rss_mb=0.001, cooldown=0)
@@ -0,0 +1,40 @@
+import time
+from concurrent.futures import Future
+
+import pytest
+
+pytest.importorskip('playwright')
+pytest.importorskip('dotenv')
+pytest.importorskip('faker')
+pytest.importorskip('colorlog')
+
+from backlink_automator import BacklinkAutomator, SITES_CONFIG  # noqa: E402
+
+
+class _Logger:
+    def __init__(self):
+        self.results = []
+
+    def error(self, message):
+        pass
+
+    def log_site_result(self, **result):
+        self.results.append(result)
+
+
+class _Handler:
+    def __init__(self):
+        self.pending_verification = Future()  # the watcher never answers
+
+
+def test_stuck_verification_fails_the_site_at_its_deadline():
+    automator = BacklinkAutomator.__new__(BacklinkAutomator)
+    automator.logger = _Logger()
+    site_key = next(iter(SITES_CONFIG))
+    parked = [(site_key, _Handler(), time.time() + 0.5)]
+
+    started = time.time()
+    automator._resume_parked(parked, timeout=None)
+    assert time.time() - started < 3
+    assert parked == []
+    assert automator.logger.results[0]['status'] == 'failed'
@@ -0,0 +1,29 @@
+import pytest
+
+pytest.importorskip('playwright')
+
+from utils.browser_handler import BrowserHandler  # noqa: E402
+
+
+def test_reentering_a_parked_site_keeps_its_counters():
+    browser = BrowserHandler()
+    browser.context = object()  # shared context, never touched without HAR mode
+    site = {'domain': 'a.example', 'special': {'wait_caps': {'settle': 1.5}}}
+    other = {'domain': 'b.example', 'special': {}}
+
+    browser.configure_for_site(site)
+    browser.metrics['blocked_requests'] = 7
+    browser.waits.stats['settle'] = {'count': 2, 'seconds': 0.5, 'timed_out': 0}
+    parked = browser.leave_site()
+
+    browser.configure_for_site(other)
+    assert browser.metrics['blocked_requests'] == 0
+    sites_served = browser.sites_in_context
+
+    browser.reenter_site(parked)
+    assert browser.site_config is site
+    assert browser.metrics['blocked_requests'] == 7
+    assert browser.waits.stats['settle']['count'] == 2
+    assert browser.waits.caps['settle'] == 1.5
+    # Re-entering is not a new site: no recycle check, no extra count
+    assert browser.sites_in_context == sites_served
@@ -0,0 +1,72 @@
+import time
+from types import SimpleNamespace
+
+from utils.wait_engine import WaitEngine
+
+
+class _Page:
+    """Page stand-in: answer_after seconds into a wait, the submit's response arrives"""
+
+    def __init__(self, answer_after=None, method='POST', resource_type='xhr'):
+        self.url = 'https://example.com/register'
+        self.listeners = []
+        self.answer_after = answer_after
+        self.request = SimpleNamespace(
+            method=method, resource_type=resource_type,
+            is_navigation_request=lambda: False, frame=None,
+        )
+        self.started = time.monotonic()
+
+    def on(self, event, handler):
+        self.listeners.append(handler)
+
+    def remove_listener(self, event, handler):
+        self.listeners.remove(handler)
+
+    def wait_for_timeout(self, ms):
+        time.sleep(ms / 1000)
+        if self.answer_after is not None and time.monotonic() - self.started >= self.answer_after:
+            response = SimpleNamespace(url='https://example.com/api/register', request=self.request)
+            for handler in list(self.listeners):
+                handler(response)
+
+    def wait_for_load_state(self, state, timeout=None):
+        pass
+
+    def evaluate(self, script, arg=None):
+        return True
+
+
+def _engine(page):
+    return WaitEngine(SimpleNamespace(page=page), {'submit': 10})
+
+
+def test_submit_returns_when_the_xhr_answers():
+    page = _Page(answer_after=0.3)
+    engine = _engine(page)
+    started = time.monotonic()
+    with engine.for_submit(timeout=3):
+        pass
+    assert time.monotonic() - started < 1
+    assert engine.stats['submit']['timed_out'] == 0
+    assert page.listeners == []
+
+
+def test_submit_ignores_background_gets_and_waits_out_the_cap():
+    page = _Page(answer_after=0.1, method='GET', resource_type='image')
+    engine = _engine(page)
+    started = time.monotonic()
+    with engine.for_submit(timeout=0.5):
+        pass
+    assert time.monotonic() - started >= 0.5
+    assert engine.stats['submit']['timed_out'] == 1
+
+
+def test_submit_returns_when_the_page_navigates():
+    page = _Page()
+    engine = _engine(page)
+    started = time.monotonic()
+    with engine.for_submit(timeout=3):
+        page.url = 'https://example.com/welcome'
+    assert time.monotonic() - started < 0.5
+    assert engine.stats['submit']['count'] == 1
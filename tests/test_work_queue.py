@@ -0,0 +1,78 @@
+import pytest
+
+from utils import work_queue
+from utils.work_queue import WorkQueue
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable time.time() for lease expiry"""
+    now = [1000.0]
+    monkeypatch.setattr(work_queue.time, 'time', lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def queue(tmp_path, clock):
+    q = WorkQueue(str(tmp_path / 'queue.db'), lease_seconds=60, max_attempts=2)
+    q.reset(['a', 'b'])
+    return q
+
+
+def _row(queue, site_key):
+    conn = queue._connect()
+    try:
+        return conn.execute(
+            'SELECT status, worker, attempts FROM tasks WHERE site_key = ?', (site_key,)
+        ).fetchone()
+    finally:
+        conn.close()
+
+
+def test_sites_are_leased_in_order_once_each(queue):
+    assert queue.lease('w1') == 'a'
+    assert queue.lease('w2') == 'b'
+    assert queue.lease('w3') is None
+    assert queue.unfinished() == 2
+
+
+def test_expired_lease_goes_to_another_worker(queue, clock):
+    assert queue.lease('w1') == 'a'
+    clock[0] += 30
+    assert queue.heartbeat('a', 'w1')
+    clock[0] += 61
+    assert queue.lease('w2') == 'a'
+    assert _row(queue, 'a') == ('leased', 'w2', 2)
+    # The old holder can neither renew nor complete any more
+    assert not queue.heartbeat('a', 'w1')
+
+
+def test_complete_rejects_a_stale_holder(queue, clock):
+    queue.lease('w1')
+    clock[0] += 61
+    queue.lease('w2')
+
+    assert not queue.complete('a', 'w1', {'site_key': 'a', 'status': 'success'})
+    assert queue.complete('a', 'w2', {'site_key': 'a', 'status': 'partial'})
+    assert queue.results() == [{'site_key': 'a', 'status': 'partial'}]
+    assert not queue.complete('a', 'w2', {'site_key': 'a', 'status': 'success'})
+
+
+def test_site_fails_after_max_attempts(queue, clock):
+    for worker in ('w1', 'w2'):
+        assert queue.lease(worker) == 'a'
+        clock[0] += 61  # worker died without completing
+    # Third try: 'a' is given up on and the next site is handed out instead
+    assert queue.lease('w3') == 'b'
+    assert _row(queue, 'a')[0] == 'failed'
+    assert queue.results()[0]['error'] == 'Worker lost 2 times'
+
+
+def test_release_does_not_count_as_an_attempt(queue):
+    assert queue.lease('w1') == 'a'
+    queue.release('a', 'w1')
+    assert _row(queue, 'a') == ('pending', None, 0)
+    # Releasing someone else's lease does nothing
+    assert queue.lease('w2') == 'a'
+    queue.release('a', 'w1')
+    assert _row(queue, 'a') == ('leased', 'w2', 1)
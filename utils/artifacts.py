@@ -0,0 +1,127 @@
+import gzip
+import os
+import queue
+import re
+import shutil
+import threading
+from datetime import datetime
+
+
+class ArtifactWriter:
+    """
+    Writes failure artifacts (screenshot, DOM, recent network events) from a
+    background thread into a size-capped ring directory.
+
+    The caller only grabs the raw bytes from the page; compression and disk
+    I/O happen on the writer thread so the next site starts straight away.
+    Once the directory grows past max_bytes the oldest captures are deleted.
+    At most max_pending captures wait in memory (each holds a screenshot
+    and a DOM); further ones are dropped and counted in dropped.
+    """
+
+    def __init__(self, directory='artifacts', max_bytes=200 * 1024 * 1024, max_pending=8):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._queue = queue.Queue(maxsize=max_pending)
+        self.dropped = 0
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='artifact-writer', daemon=True)
+                self._thread.start()
+
+    def submit(self, label, files):
+        """
+        Queue one capture for writing
+
+        Args:
+            label: Short name for the capture (e.g. the site domain)
+            files: {filename: bytes or str}; .html/.json entries are gzipped
+
+        Returns:
+            Directory the capture will be written to, or None if the writer
+            is too far behind and the capture was dropped
+        """
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+        safe_label = re.sub(r'[^\w.-]+', '_', label)[:60]
+        target = os.path.join(self.directory, f"{stamp}-{safe_label}")
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait((target, files))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            print(f"[WARN] Artifact writer backlog full; dropped capture for {label} ({self.dropped} dropped)")
+            return None
+        return target
+
+    def _run(self):
+        while True:
+            target, files = self._queue.get()
+            try:
+                self._write(target, files)
+                self._enforce_cap()
+            except Exception as e:
+                print(f"[WARN] Could not write failure artifacts to {target}: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    def _write(self, target, files):
+        os.makedirs(target, exist_ok=True)
+        for name, data in files.items():
+            if data is None:
+                continue
+            if isinstance(data, str):
+                data = data.encode('utf-8')
+            if name.endswith(('.html', '.json', '.txt')):
+                with gzip.open(os.path.join(target, name + '.gz'), 'wb', compresslevel=6) as f:
+                    f.write(data)
+            else:
+                # Screenshots are already compressed
+                with open(os.path.join(target, name), 'wb') as f:
+                    f.write(data)
+
+    def _enforce_cap(self):
+        """Delete the oldest captures until the directory fits in max_bytes"""
+        captures = []
+        for entry in os.scandir(self.directory):
+            if not entry.is_dir():
+                continue
+            size = sum(f.stat().st_size for f in os.scandir(entry.path) if f.is_file())
+            captures.append((entry.name, entry.path, size))
+
+        # Names start with a timestamp, so name order is age order
+        captures.sort()
+        total = sum(size for _, _, size in captures)
+        while captures and total > self.max_bytes:
+            _, path, size = captures.pop(0)
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+    def flush(self, timeout=None):
+        """Wait (up to timeout seconds) for queued captures to be written"""
+        if self._thread is None:
+            return True
+        done = threading.Event()
+
+        def wait():
+            self._queue.join()
+            done.set()
+
+        threading.Thread(target=wait, daemon=True).start()
+        return done.wait(timeout)
+
+
+_WRITERS = {}
+_WRITERS_LOCK = threading.Lock()
+
+
+def get_artifact_writer(directory='artifacts', max_bytes=200 * 1024 * 1024, max_pending=8):
+    """One shared writer (and thread) per directory"""
+    with _WRITERS_LOCK:
+        if directory not in _WRITERS:
+            _WRITERS[directory] = ArtifactWriter(directory, max_bytes, max_pending)
+        return _WRITERS[directory]
@@ -0,0 +1,169 @@
+import contextvars
+import functools
+import inspect
+import sys
+import weakref
+
+import greenlet
+
+
+class _BridgeGreenlet(greenlet.greenlet):
+    """Greenlet running blocking-style code for greenlet_spawn"""
+
+    def __init__(self, fn, driver):
+        super().__init__(fn, driver)
+        self.driver = driver
+
+
+def in_bridge():
+    """True when called from code running under greenlet_spawn"""
+    return isinstance(greenlet.getcurrent(), _BridgeGreenlet)
+
+
+def await_only(awaitable):
+    """
+    Wait for awaitable from blocking-style code and return its result
+
+    The greenlet is suspended and the coroutine handed to greenlet_spawn,
+    which awaits it on the event loop; other tasks run in the meantime.
+    """
+    current = greenlet.getcurrent()
+    if not isinstance(current, _BridgeGreenlet):
+        raise RuntimeError("await_only() called outside greenlet_spawn(); await the async handler instead")
+    return current.driver.switch(awaitable)
+
+
+async def greenlet_spawn(fn, *args, **kwargs):
+    """
+    Run blocking-style fn(*args, **kwargs) from a coroutine
+
+    Every awaitable fn passes to await_only is awaited here and its result
+    (or exception) sent back into fn, so one event loop can interleave many
+    such calls. The same technique as SQLAlchemy's asyncio support.
+    """
+    child = _BridgeGreenlet(fn, greenlet.getcurrent())
+    # The call sees the context variables of the task that spawned it
+    child.gr_context = contextvars.copy_context()
+    result = child.switch(*args, **kwargs)
+    while not child.dead:
+        try:
+            value = await result
+        except BaseException:
+            result = child.throw(*sys.exc_info())
+        else:
+            result = child.switch(value)
+    return result
+
+
+# Methods whose callable arguments are event/route handlers: these run as
+# their own greenlet_spawn calls, so they may use the page themselves.
+# Any other callable argument is a predicate and is called directly.
+_HANDLER_METHODS = frozenset({
+    'on', 'once', 'remove_listener', 'route', 'unroute',
+    'expose_binding', 'expose_function',
+})
+
+# async_api object -> {handler: wrapper}, so remove_listener/unroute are
+# given the same wrapper that was registered
+_handlers = weakref.WeakKeyDictionary()
+
+
+def _is_api_object(value):
+    return type(value).__module__.startswith('playwright.')
+
+
+def blocking(value):
+    """Wrap an async_api object (or a list/dict of them) in Blocking; other values pass through"""
+    if isinstance(value, list):
+        return [blocking(item) for item in value]
+    if isinstance(value, dict):
+        return {key: blocking(item) for key, item in value.items()}
+    if value is None or isinstance(value, Blocking) or not _is_api_object(value):
+        return value
+    return Blocking(value)
+
+
+def unwrap(value):
+    """The async_api object behind a Blocking (lists/tuples/dicts included)"""
+    if isinstance(value, Blocking):
+        return value._target
+    if isinstance(value, (list, tuple)):
+        return type(value)(unwrap(item) for item in value)
+    if isinstance(value, dict):
+        return {key: unwrap(item) for key, item in value.items()}
+    return value
+
+
+def _as_handler(owner, fn):
+    wrappers = _handlers.setdefault(owner, {})
+    if fn not in wrappers:
+        # wraps() keeps fn's signature, which Playwright uses to decide how
+        # many event arguments to pass
+        @functools.wraps(fn)
+        async def handler(*args):
+            return await greenlet_spawn(fn, *(blocking(arg) for arg in args))
+        wrappers[fn] = handler
+    return wrappers[fn]
+
+
+def _as_predicate(fn):
+    @functools.wraps(fn)
+    def predicate(*args):
+        return fn(*(blocking(arg) for arg in args))
+    return predicate
+
+
+class Blocking:
+    """
+    An async_api object used through Playwright's sync surface
+
+    Lets BrowserHandler and SiteHandler, which are written against the sync
+    API, drive async_api pages when run under greenlet_spawn: coroutines
+    returned by methods (and properties such as EventInfo.value) are waited
+    for with await_only, async_api results are wrapped again, and the async
+    context managers of expect_navigation()/expect_response() work in a
+    plain with block.
+    """
+    __slots__ = ('_target', '__weakref__')
+
+    def __init__(self, target):
+        object.__setattr__(self, '_target', target)
+
+    def __getattr__(self, name):
+        value = getattr(self._target, name)
+        if inspect.ismethod(value):
+            return functools.partial(self._call, name, value)
+        if inspect.isawaitable(value):
+            value = await_only(value)
+        return blocking(value)
+
+    def _call(self, name, method, *args, **kwargs):
+        convert = functools.partial(self._argument, name in _HANDLER_METHODS)
+        result = method(*map(convert, args), **{key: convert(arg) for key, arg in kwargs.items()})
+        if inspect.isawaitable(result):
+            result = await_only(result)
+        return blocking(result)
+
+    def _argument(self, is_handler, value):
+        if callable(value) and not isinstance(value, Blocking) and not _is_api_object(value):
+            return _as_handler(self._target, value) if is_handler else _as_predicate(value)
+        return unwrap(value)
+
+    def __enter__(self):
+        return blocking(await_only(self._target.__aenter__()))
+
+    def __exit__(self, exc_type, exc, tb):
+        await_only(self._target.__aexit__(exc_type, exc, tb))
+        return False
+
+    def __eq__(self, other):
+        return self._target == unwrap(other)
+
+    def __hash__(self):
+        return hash(self._target)
+
+    def __repr__(self):
+        return f"Blocking({self._target!r})"
+
+    def __str__(self):
+        return str(self._target)
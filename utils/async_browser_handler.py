@@ -0,0 +1,105 @@
+import functools
+import inspect
+
+from playwright.async_api import async_playwright
+
+from utils.async_bridge import await_only, blocking, greenlet_spawn, unwrap
+from utils.browser_handler import BrowserHandler
+
+
+class _AsyncEngine(BrowserHandler):
+    """
+    BrowserHandler running on playwright.async_api
+
+    Its methods are the sync handler's own and must run under
+    greenlet_spawn; AsyncBrowserHandler does that for callers.
+    """
+
+    def __init__(self, *args, owner=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Session handlers share the browser of the handler that started it
+        self.owner = owner
+
+    def _start_playwright(self):
+        if self.owner:
+            return self.owner.playwright
+        return blocking(await_only(async_playwright().start()))
+
+    def _connect(self):
+        if not self.owner:
+            return super()._connect()
+        self.owner.ensure_browser()
+        self.browser = self.owner.browser
+        self._browser_lost = False
+        self.browser.on('disconnected', lambda _: setattr(self, '_browser_lost', True))
+        # Same process tree, so memory-based recycling is judged together
+        self.memory.pid = self.owner.memory.pid
+
+    def close(self):
+        if not self.owner:
+            return super().close()
+        # Only the session's own context; the browser belongs to the owner
+        try:
+            if self.page:
+                self.page.close()
+            if self.context:
+                self.context.close()
+        except Exception:
+            pass
+
+
+class AsyncBrowserHandler:
+    """
+    BrowserHandler for asyncio: the same methods, awaited
+
+    Every BrowserHandler method is available as a coroutine (await
+    handler.goto(url), await handler.fill_input(...)) and runs the sync
+    handler's code, so behaviour and metrics are identical. Attributes are
+    passed through, with page/context/browser as async_api objects.
+
+    new_session() opens another context and page on the same browser, one
+    per concurrently processed site:
+
+        browser = AsyncBrowserHandler(headless=True)
+        await browser.start()
+        sessions = [await browser.new_session() for _ in sites]
+        results = await asyncio.gather(*(
+            AsyncSiteHandler(config, session, ...).process()
+            for config, session in zip(sites, sessions)
+        ))
+    """
+
+    def __init__(self, headless=False, timeout=30000, cdp_endpoint=None, daemon=None, har=None, _owner=None):
+        self.core = _AsyncEngine(
+            headless=headless, timeout=timeout, cdp_endpoint=cdp_endpoint,
+            daemon=daemon, har=har, owner=_owner,
+        )
+
+    def __getattr__(self, name):
+        value = getattr(self.core, name)
+        if not inspect.ismethod(value):
+            return unwrap(value)
+
+        @functools.wraps(value)
+        async def call(*args, **kwargs):
+            return unwrap(await greenlet_spawn(value, *args, **kwargs))
+        return call
+
+    async def run(self, fn, *args, **kwargs):
+        """
+        Run blocking-style code that uses the handler (e.g. a custom flow
+        calling handler.core.page or handler.core.waits) without blocking
+        the event loop
+        """
+        return unwrap(await greenlet_spawn(fn, *args, **kwargs))
+
+    async def new_session(self):
+        """Start a handler with its own context and page on this handler's browser"""
+        if not self.core.browser:
+            raise RuntimeError("Browser is not started. Call start() first.")
+        core = self.core
+        session = AsyncBrowserHandler(
+            headless=core.headless, timeout=core.timeout, har=core.har, _owner=core,
+        )
+        await session.start()
+        return session
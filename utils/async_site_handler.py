@@ -0,0 +1,58 @@
+import asyncio
+
+from utils.async_bridge import greenlet_spawn
+from utils.email_handler import EmailHandler
+from utils.site_handler import SiteHandler
+
+
+class AsyncSiteHandler:
+    """
+    SiteHandler for asyncio: await process() to run a site's flow
+
+    The flow is SiteHandler's own (hand-written flows included), run on an
+    AsyncBrowserHandler session. Waiting for the verification email does
+    not hold the event loop: the site is parked as with
+    process(defer_verification=True) and resumed when the link arrives,
+    while other sites keep using the loop.
+    """
+
+    def __init__(self, config, browser, email_handler, user_data, website_url, logger, checkpoint=None,
+                 session_path=None):
+        """
+        Args:
+            browser: Started AsyncBrowserHandler (one session per concurrent site)
+            Others as for SiteHandler
+        """
+        self.handler = SiteHandler(
+            config, browser.core, email_handler, user_data, website_url, logger,
+            checkpoint=checkpoint, session_path=session_path,
+        )
+
+    def __getattr__(self, name):
+        return getattr(self.handler, name)
+
+    async def process(self):
+        """
+        Process the site
+
+        Returns:
+            Result dict as from SiteHandler.process
+        """
+        result = await greenlet_spawn(self.handler.process, defer_verification=True)
+        if result.get('status') != 'pending_verification':
+            return result
+
+        verify_config = self.handler.config['email_verification']
+        limit = verify_config.get('wait_for_email', 120) + EmailHandler.RESULT_MARGIN
+        # asyncio.wait leaves the future alone on timeout; the mailbox
+        # watcher owns it and resolves it itself
+        link = asyncio.wrap_future(self.handler.pending_verification)
+        done, _ = await asyncio.wait({link}, timeout=limit)
+        if not done:
+            self.handler.logger.error(f"{self.handler.config['name']}: no verification link in time")
+            return {
+                'status': 'failed',
+                'profile_url': None,
+                'error': 'Verification email wait timed out',
+            }
+        return await greenlet_spawn(self.handler.resume)
@@ -0,0 +1,193 @@
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+
+
+class BrowserDaemon:
+    """
+    Long-lived local Chromium that runs attach to over CDP.
+
+    Launching the Playwright driver plus a cold Chromium costs several
+    seconds per run; under cron that adds up. The daemon keeps one Chromium
+    alive between runs. BrowserHandler connects with connect_over_cdp and
+    opens a fresh context per run, so runs stay isolated from each other.
+    If the daemon is found dead it is restarted.
+    """
+    
+    def __init__(self, port=9222, state_dir='.browser_daemon', headless=True):
+        self.port = port
+        self.state_dir = state_dir
+        self.headless = headless
+        self.state_file = os.path.join(state_dir, 'state.json')
+        self.user_data_dir = os.path.join(state_dir, 'profile')
+    
+    @property
+    def endpoint(self):
+        return f'http://127.0.0.1:{self.port}'
+    
+    def _load_state(self):
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception:
+            return {}
+    
+    def _save_state(self, state):
+        os.makedirs(self.state_dir, exist_ok=True)
+        with open(self.state_file, 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=2)
+    
+    def _executable(self):
+        """Path of Playwright's Chromium build (cached, since finding it starts the driver)"""
+        state = self._load_state()
+        path = state.get('executable')
+        if path and os.path.exists(path):
+            return path
+        
+        from playwright.sync_api import sync_playwright
+        with sync_playwright() as p:
+            path = p.chromium.executable_path
+        state['executable'] = path
+        self._save_state(state)
+        return path
+    
+    def is_alive(self):
+        """True if a browser answers on the CDP port"""
+        try:
+            with urllib.request.urlopen(f'{self.endpoint}/json/version', timeout=1) as resp:
+                return resp.status == 200
+        except Exception:
+            return False
+    
+    def start(self, wait=15):
+        """Launch the daemon browser and wait until its CDP endpoint is up"""
+        args = [
+            self._executable(),
+            f'--remote-debugging-port={self.port}',
+            f'--user-data-dir={os.path.abspath(self.user_data_dir)}',
+            '--no-first-run',
+            '--no-default-browser-check',
+        ]
+        if self.headless:
+            args.append('--headless=new')
+        args.append('about:blank')
+        
+        # Detach so the browser outlives this run
+        kwargs = {'stdout': subprocess.DEVNULL, 'stderr': subprocess.DEVNULL}
+        if sys.platform == 'win32':
+            kwargs['creationflags'] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+        else:
+            kwargs['start_new_session'] = True
+        proc = subprocess.Popen(args, **kwargs)
+        
+        state = self._load_state()
+        state.update({'pid': proc.pid, 'port': self.port, 'started_at': time.time()})
+        self._save_state(state)
+        
+        deadline = time.time() + wait
+        while time.time() < deadline:
+            if self.is_alive():
+                print(f"[OK] Browser daemon started (pid {proc.pid}, {self.endpoint})")
+                return self.endpoint
+            if proc.poll() is not None:
+                break
+            time.sleep(0.2)
+        raise RuntimeError(f"Browser daemon did not come up on {self.endpoint}")
+    
+    def _command_line(self, pid):
+        """Command line of process pid, or None if it can't be read"""
+        try:
+            if os.path.exists(f'/proc/{pid}/cmdline'):
+                with open(f'/proc/{pid}/cmdline', 'rb') as f:
+                    return f.read().replace(b'\0', b' ').decode('utf-8', errors='replace')
+            if sys.platform == 'win32':
+                args = ['wmic', 'process', 'where', f'ProcessId={pid}', 'get', 'CommandLine']
+            else:
+                args = ['ps', '-o', 'command=', '-p', str(pid)]
+            result = subprocess.run(args, capture_output=True, text=True, timeout=5)
+            return result.stdout if result.returncode == 0 else None
+        except Exception:
+            return None
+    
+    def _is_daemon_process(self, pid):
+        """
+        True if pid is still the browser start() launched. The state file
+        can outlive the daemon (reboot, crash) and the pid be reused by an
+        unrelated process, so only a Chromium with our CDP port and profile
+        counts.
+        """
+        command_line = self._command_line(pid)
+        return bool(command_line) and (
+            f'--remote-debugging-port={self.port}' in command_line
+            and f'--user-data-dir={os.path.abspath(self.user_data_dir)}' in command_line
+        )
+    
+    def stop(self):
+        """Terminate the daemon browser if it is running"""
+        pid = self._load_state().get('pid')
+        if not pid:
+            return False
+        if not self._is_daemon_process(pid):
+            # Stale state file: forget the pid, never signal someone else's process
+            state = self._load_state()
+            state.pop('pid', None)
+            self._save_state(state)
+            print(f"[WARN] Browser daemon pid {pid} is gone; cleared stale state")
+            return False
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except OSError:
+            pass
+        
+        # Give Chromium a moment to release the port and profile lock
+        for _ in range(25):
+            if not self.is_alive():
+                break
+            time.sleep(0.2)
+        
+        state = self._load_state()
+        state.pop('pid', None)
+        self._save_state(state)
+        print("[OK] Browser daemon stopped")
+        return True
+    
+    def restart(self):
+        print("[WARN] Restarting browser daemon")
+        self.stop()
+        return self.start()
+    
+    def ensure_running(self):
+        """Return the CDP endpoint, (re)starting the daemon if it is down"""
+        if self.is_alive():
+            return self.endpoint
+        # A crashed daemon may have left a stale process holding the profile
+        self.stop()
+        return self.start()
+
+
+def main():
+    """python -m utils.browser_daemon start|stop|restart|status"""
+    from config import BROWSER_DAEMON_PORT
+    
+    command = sys.argv[1] if len(sys.argv) > 1 else 'status'
+    daemon = BrowserDaemon(
+        port=BROWSER_DAEMON_PORT,
+        headless=os.getenv('HEADLESS_MODE', 'False').lower() == 'true'
+    )
+    
+    if command == 'start':
+        daemon.ensure_running()
+    elif command == 'stop':
+        daemon.stop()
+    elif command == 'restart':
+        daemon.restart()
+    else:
+        print(f"{daemon.endpoint}: {'running' if daemon.is_alive() else 'not running'}")
+
+
+if __name__ == '__main__':
+    main()
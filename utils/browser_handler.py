@@ -1,23 +1,465 @@
 from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeout
-import time
+import json
 import os
+import re
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from urllib.parse import urlparse
+
+from utils.wait_engine import WaitEngine
+from utils.selector_cache import SelectorCache, get_selector_cache
+from utils.form_snapshot import FormSnapshot, SNAPSHOT_JS, UNKNOWN
+from utils.captcha_detector import DETECT_CAPTCHA_JS, CAPTCHA_WATCH_JS, CAPTCHA_BINDING
+from utils.memory_monitor import MemoryMonitor
+from utils.tracer import traced
+from utils.artifacts import get_artifact_writer
+from config import (
+    DEFAULT_WAIT_CAPS, SELECTOR_CACHE_FILE, BROWSER_RECYCLE,
+    ARTIFACTS_DIR, ARTIFACTS_MAX_MB, NETWORK_EVENTS_KEPT,
+)
+
+# Never blocked by a block_resources profile: captcha widgets must load
+ALWAYS_ALLOWED = (
+    'google.com/recaptcha', 'gstatic.com/recaptcha', 'recaptcha.net',
+    'hcaptcha.com', 'challenges.cloudflare.com', 'turnstile',
+)
+
+# Resource types that carry the page and its forms; never blocked by type
+FORM_CRITICAL_TYPES = ('document', 'script', 'xhr', 'fetch', 'stylesheet')
+
+# File extensions of the blockable resource types. Only URLs with these (or
+# on a blocked host) are routed: route handlers run in Python, and with the
+# sync API they stall while Python is busy elsewhere (e.g. a CAPTCHA pause)
+BLOCKABLE_EXTENSIONS = {
+    'image': ('png', 'jpe?g', 'gif', 'webp', 'avif', 'svg', 'ico', 'bmp'),
+    'media': ('mp4', 'webm', 'ogg', 'ogv', 'mp3', 'wav', 'm4a', 'mov'),
+    'font': ('woff2?', 'ttf', 'otf', 'eot'),
+}
+
+# A snapshot miss is only trusted this many seconds after the snapshot was
+# taken; scripts can add controls without a navigation or click dropping it
+SNAPSHOT_MISS_TTL = 1.0
+
+# Rough median transfer sizes (HTTP Archive) used to estimate bytes saved,
+# since an aborted request never reports its size
+EST_BYTES_BY_TYPE = {
+    'image': 45_000,
+    'media': 500_000,
+    'font': 35_000,
+    'script': 30_000,
+    'stylesheet': 15_000,
+    'other': 5_000,
+}
+
+# Resolves and fills a whole form in one evaluate. Candidates are tried the
+# way fill_input does: CSS, then name, id, placeholder and label text.
+# Values go through the native setter so framework-bound inputs see them.
+FILL_FORM_JS = """
+(fields) => {
+    const visible = (el) => {
+        const style = window.getComputedStyle(el);
+        const rect = el.getBoundingClientRect();
+        return style.visibility !== 'hidden' && style.display !== 'none'
+            && rect.width > 0 && rect.height > 0;
+    };
+    const usable = (el) => el && (el.tagName === 'INPUT' || el.tagName === 'TEXTAREA')
+        && !el.disabled && !el.readOnly && visible(el);
+    const query = (css) => {
+        try { return Array.from(document.querySelectorAll(css)); } catch (e) { return []; }
+    };
+    const byLabel = (text) => {
+        const wanted = text.toLowerCase();
+        const found = [];
+        for (const label of document.querySelectorAll('label')) {
+            if (!label.textContent.toLowerCase().includes(wanted)) continue;
+            const target = label.control || (label.htmlFor && document.getElementById(label.htmlFor));
+            if (target) found.push(target);
+        }
+        return found;
+    };
+    const strategies = [
+        ['css', (s) => query(s)],
+        ['name', (s) => s.startsWith('[') ? [] : query(`[name="${CSS.escape(s)}"]`)],
+        ['id', (s) => s.startsWith('#') ? [] : query(`#${CSS.escape(s)}`)],
+        ['placeholder', (s) => query('input[placeholder], textarea[placeholder]')
+            .filter((el) => el.placeholder.toLowerCase().includes(s.toLowerCase()))],
+        ['label', byLabel],
+    ];
+    const setValue = (el, value) => {
+        const proto = el.tagName === 'TEXTAREA'
+            ? HTMLTextAreaElement.prototype : HTMLInputElement.prototype;
+        const setter = Object.getOwnPropertyDescriptor(proto, 'value').set;
+        el.focus();
+        setter.call(el, value);
+        el.dispatchEvent(new Event('input', { bubbles: true }));
+        el.dispatchEvent(new Event('change', { bubbles: true }));
+        el.blur();
+        return el.value.length > 0;
+    };
+
+    const results = {};
+    for (const [field, selectors, value] of fields) {
+        results[field] = { ok: false, selector: null, strategy: null };
+        search:
+        for (const selector of selectors) {
+            for (const [strategy, find] of strategies) {
+                const el = find(selector).find(usable);
+                if (!el) continue;
+                if (setValue(el, value)) {
+                    results[field] = { ok: true, selector: selector, strategy: strategy };
+                }
+                break search;
+            }
+        }
+    }
+    return results;
+}
+"""
+
+# Lookup order for fill_input candidates; names match FILL_FORM_JS
+INPUT_STRATEGIES = ('css', 'name', 'id', 'placeholder', 'label')
+
+# Lookup order for click_button candidates
+BUTTON_STRATEGIES = ('role', 'text', 'css')
+
+# Counts DOM mutations in the top document so a cached page.content() can
+# be reused until the page actually changes (see get_page_content)
+MUTATION_COUNTER_JS = """
+(() => {
+    if (window.top !== window) return;
+    window.__blMutations = 0;
+    new MutationObserver((records) => { window.__blMutations += records.length; })
+        .observe(document, { subtree: true, childList: true, attributes: true, characterData: true });
+})();
+"""
+
+# How goto decides a page is ready when the site declares no readiness rule
+DEFAULT_READINESS = {'wait_until': 'load', 'networkidle': True, 'settle': 2}
+
+def _route_pattern(profile):
+    """
+    Regex for the URLs a block profile could abort: its hosts, and the
+    extensions of its resource types. CAPTCHA hosts never match.
+    """
+    alternatives = []
+    hosts = [re.escape(domain) for domain in profile.get('domains', ())]
+    if hosts:
+        alternatives.append(r'[a-z]+://(?:[^/?#]*\.)?(?:' + '|'.join(hosts) + r')(?::\d+)?(?:[/?#]|$)')
+    extensions = [ext for kind in profile.get('resource_types', ()) for ext in BLOCKABLE_EXTENSIONS.get(kind, ())]
+    if extensions:
+        alternatives.append(r'[^?#]*\.(?:' + '|'.join(extensions) + r')(?:[?#]|$)')
+    if not alternatives:
+        return None
+    never = '|'.join(re.escape(marker) for marker in ALWAYS_ALLOWED)
+    return re.compile(r'^(?!.*(?:' + never + r'))(?:' + '|'.join(alternatives) + r')', re.IGNORECASE)
+
+
+def _on_domain(host, domain):
+    """True if host is domain or one of its subdomains (not evil-domain.com)"""
+    host = (host or '').lstrip('.').lower()
+    return host == domain or host.endswith('.' + domain)
+
 
 class BrowserHandler:
-    """Handle browser automation with Playwright"""
+    """
+    Handle browser automation with Playwright
+    
+    Written against the sync API. utils.async_browser_handler runs this same
+    code on playwright.async_api, so there is one implementation for both.
+    """
     
-    def __init__(self, headless=False, timeout=30000):
+    def __init__(self, headless=False, timeout=30000, cdp_endpoint=None, daemon=None, har=None):
         self.headless = headless
         self.timeout = timeout
+        # When set, attach to an already running Chromium instead of launching one
+        self.cdp_endpoint = cdp_endpoint
+        # Optional BrowserDaemon: attach to its warm Chromium, restarting it if it died
+        self.daemon = daemon
+        # Optional HarArchive: each site gets its own context recording to /
+        # replaying from a per-domain HAR
+        self.har = har
+        self._har_path = None
+        self._browser_lost = False
         self.playwright = None
         self.browser = None
         self.context = None
         self.page = None
+        # Condition-based waits used instead of fixed sleeps
+        self.waits = WaitEngine(self, DEFAULT_WAIT_CAPS)
+        self.site_config = None
+        # Per-site request blocking (SITES_CONFIG[...]['special']['block_resources'])
+        self._block_profile = None
+        # URL regex the context is routed with (matched by Playwright, not Python)
+        self._route_pattern = None
+        self.metrics = {}
+        self.selector_cache = get_selector_cache(SELECTOR_CACHE_FILE)
+        # Controls of the current page, taken lazily and dropped on navigation
+        self._snapshot = None
+        # {'vendor', 'url'} once the in-page watcher reports a CAPTCHA
+        self.captcha_signal = None
+        # page.content() of the current document and the mutation count it was taken at
+        self._content_cache = None
+        # Browser/renderer RSS, and how many sites the current context has served
+        self.memory = MemoryMonitor()
+        self.recycle = dict(BROWSER_RECYCLE)
+        self.sites_in_context = 0
+        # Last few network events, saved with the failure artifacts
+        self.network_events = deque(maxlen=NETWORK_EVENTS_KEPT)
+        self.artifacts = get_artifact_writer(ARTIFACTS_DIR, ARTIFACTS_MAX_MB * 1024 * 1024)
+    
+    def configure_for_site(self, config):
+        """Apply per-site settings from SITES_CONFIG before working on a site"""
+        self.site_config = config
+        self.ensure_browser()
+        
+        if self.har:
+            # Flush the previous site's HAR and start this site's own context
+            self._open_site_context(config)
+            recycled = False
+        else:
+            recycled = self._maybe_recycle()
+        self.sites_in_context += 1
+        self.memory.reset_peak()
+        self.memory.sample()
+        
+        self.waits.reset_stats()
+        self.metrics = {
+            'blocked_requests': 0,
+            'blocked_by_type': {},
+            'est_bytes_saved': 0,
+            'selector_cache_hits': 0,
+            'selector_cache_misses': 0,
+            'selector_cache_invalidated': 0,
+            'selector_probes': 0,
+            'form_snapshots': 0,
+            'context_recycled': int(recycled),
+        }
+        self._apply_site_settings(config)
+    
+    def leave_site(self):
+        """
+        Step away from a site that will be continued later with reenter_site
+        (e.g. parked until its verification email arrives)
+        
+        Returns:
+            The site's counters and, in HAR mode, its cookies/localStorage,
+            since its context is closed here to write the HAR
+        """
+        state = {
+            'config': self.site_config,
+            'metrics': self.metrics,
+            'wait_stats': self.waits.stats,
+            'storage_state': None,
+        }
+        if self.har and self.context:
+            try:
+                state['storage_state'] = self.context.storage_state()
+            except Exception as e:
+                print(f"[WARN] Could not read storage state of parked site: {str(e)}")
+        self.finish_site()
+        return state
+    
+    def reenter_site(self, state):
+        """
+        Continue a site left with leave_site
+        
+        Unlike configure_for_site this is not a new site: counters carry on
+        from where the site stopped and the shared context is neither
+        recycled nor counted again. In HAR mode the site's next HAR segment
+        opens with the cookies it had when it left.
+        """
+        config = state['config']
+        self.site_config = config
+        self.ensure_browser()
+        if self.har:
+            self._open_site_context(config, state['storage_state'])
+            self.sites_in_context = 1
+        self.metrics = state['metrics']
+        self.waits.stats = state['wait_stats']
+        self._apply_site_settings(config)
+    
+    def _open_site_context(self, config, storage_state=None):
+        """HAR mode: close the current context and open the site's next HAR segment"""
+        self.finish_site()
+        self._har_path = self.har.next_har_path(config['domain'])
+        if not self.har.recording and not os.path.exists(self._har_path):
+            raise Exception(f"No HAR recorded for {config['domain']} ({self._har_path})")
+        self._open_context(storage_state=storage_state)
+    
+    def _apply_site_settings(self, config):
+        """Wait caps and request blocking of one site"""
+        special = config.get('special', {})
+        caps = dict(DEFAULT_WAIT_CAPS)
+        caps.update(special.get('wait_caps', {}))
+        self.waits.set_caps(caps)
+        self.set_block_profile(special.get('block_resources'))
+    
+    def finish_site(self):
+        """
+        Close the site's context when recording/replaying HARs
+        
+        Closing the context is what writes a recorded HAR to disk. Without
+        HAR mode the context is shared between sites and left open.
+        """
+        if not self.har or not self.context:
+            return
+        try:
+            self.context.close()
+        except Exception as e:
+            print(f"[WARN] Could not close site context: {str(e)}")
+        self.context = None
+        self.page = None
+    
+    def _maybe_recycle(self):
+        """
+        Replace the context once it has served enough sites or the browser
+        has grown past the memory ceiling, keeping cookies and localStorage
+        
+        The ceiling applies to the whole browser, which other handlers may
+        share; MemoryMonitor.claim_recycle lets only one of them act on it.
+        
+        Returns:
+            True if the context was recycled
+        """
+        if not self.context:
+            return False
+        
+        max_sites = self.recycle.get('max_sites') or 0
+        max_rss_mb = self.recycle.get('max_rss_mb') or 0
+        reason = None
+        if max_sites and self.sites_in_context >= max_sites:
+            reason = f"{self.sites_in_context} sites"
+        elif max_rss_mb:
+            total_mb = self.memory.claim_recycle(max_rss_mb)
+            if total_mb:
+                reason = f"{total_mb:.0f} MB browser RSS"
+        if not reason:
+            return False
+        
+        print(f"[OK] Recycling browser context after {reason}")
+        try:
+            state = self.context.storage_state()
+        except Exception as e:
+            print(f"[WARN] Could not read storage state, recycling without it: {str(e)}")
+            state = None
+        try:
+            self.context.close()
+        except Exception:
+            pass
+        self._open_context(storage_state=state)
+        return True
+    
+    def site_metrics(self):
+        """Counters collected since the last configure_for_site, for the run report"""
+        self.memory.sample()
+        metrics = dict(self.metrics, waits=self.waits.stats)
+        if self.memory.pid:
+            metrics['peak_rss_mb'] = self.memory.peak['total_mb']
+            metrics['peak_renderer_rss_mb'] = self.memory.peak['renderer_mb']
+        return metrics
+    
+    def set_block_profile(self, profile):
+        """
+        Abort requests matching profile for the rest of this site
+        
+        Args:
+            profile: {'resource_types': [...], 'domains': [...], 'allow': [...]} or None
+        """
+        self._block_profile = profile or None
+        if not self.context:
+            return
+        pattern = _route_pattern(self._block_profile) if self._block_profile else None
+        current = self._route_pattern
+        if current is not None and (pattern is None or pattern.pattern != current.pattern):
+            try:
+                self.context.unroute(current, self._route_request)
+            except Exception:
+                pass
+            self._route_pattern = None
+        if pattern is not None and self._route_pattern is None:
+            self.context.route(pattern, self._route_request)
+            self._route_pattern = pattern
+    
+    def _should_block(self, request, profile):
+        url = request.url
+        if any(marker in url for marker in ALWAYS_ALLOWED):
+            return False
+        if any(marker in url for marker in profile.get('allow', ())):
+            return False
+        
+        host = urlparse(url).hostname or ''
+        for domain in profile.get('domains', ()):
+            if host == domain or host.endswith('.' + domain):
+                return True
+        
+        resource_type = request.resource_type
+        return (
+            resource_type not in FORM_CRITICAL_TYPES
+            and resource_type in profile.get('resource_types', ())
+        )
+    
+    def _route_request(self, route):
+        """Context route handler applying the current block profile"""
+        request = route.request
+        profile = self._block_profile
+        try:
+            if profile and self._should_block(request, profile):
+                resource_type = request.resource_type
+                by_type = self.metrics.setdefault('blocked_by_type', {})
+                by_type[resource_type] = by_type.get(resource_type, 0) + 1
+                self.metrics['blocked_requests'] = self.metrics.get('blocked_requests', 0) + 1
+                self.metrics['est_bytes_saved'] = (
+                    self.metrics.get('est_bytes_saved', 0)
+                    + EST_BYTES_BY_TYPE.get(resource_type, EST_BYTES_BY_TYPE['other'])
+                )
+                route.abort('blockedbyclient')
+            else:
+                # Let HAR replay (or the network) handle it
+                route.fallback()
+        except Exception:
+            # Page closed mid-request; nothing left to route
+            pass
         
     def get_page_content(self) -> str:
-        """Return full HTML of the current page."""
+        """
+        Return full HTML of the current page.
+        
+        The serialised DOM is cached until the main frame navigates or the
+        page's mutation counter moves, so repeated keyword checks on the same
+        page share one page.content() call.
+        """
         if not getattr(self, "page", None):
             raise RuntimeError("Page is not initialized. Call new_page()/goto() first.")
-        return self.page.content()
+        return self._page_content()['html']
+    
+    def get_page_content_lower(self) -> str:
+        """Lowercased view of get_page_content(), for case-insensitive keyword checks"""
+        if not getattr(self, "page", None):
+            raise RuntimeError("Page is not initialized. Call new_page()/goto() first.")
+        cached = self._page_content()
+        if cached.get('lower') is None:
+            cached['lower'] = cached['html'].lower()
+        return cached['lower']
+    
+    def _page_content(self):
+        try:
+            # None when the counter script isn't in this document (page opened
+            # before the context had it); never cache then
+            version = self.page.evaluate("() => window.__blMutations ?? null")
+        except Exception:
+            version = None
+        
+        cached = self._content_cache
+        if cached and version is not None and cached['version'] == version:
+            self._count('content_cache_hits')
+            return cached
+        
+        self._count('content_cache_misses')
+        self._content_cache = {'version': version, 'html': self.page.content(), 'lower': None}
+        return self._content_cache
 
     # (optional helpers used below; safe no-ops if you already have similar)
     def element_exists(self, selector: str) -> bool:
@@ -31,26 +473,101 @@ class BrowserHandler:
         el = self.page.query_selector(selector)
         return (el.inner_text() if el else "") if el else ""
 
-    def goto(self, url: str):
-        self.page.goto(url, wait_until="load")
-
     def wait_for_url_contains(self, fragment: str, timeout_ms: int = 15000):
         self.page.wait_for_url(f"**{fragment}**", timeout=timeout_ms)
 
-    def start(self):
-        """Start browser instance"""
-        self.playwright = sync_playwright().start()
-        self.browser = self.playwright.chromium.launch(headless=self.headless)
-        self.context = self.browser.new_context(
-            viewport={'width': 1920, 'height': 1080},
-            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        )
+    def _connect(self):
+        """Launch Chromium, or attach to the daemon / a CDP endpoint"""
+        chromium = self.playwright.chromium
+        if self.daemon:
+            endpoint = self.daemon.ensure_running()
+            try:
+                self.browser = chromium.connect_over_cdp(endpoint)
+            except Exception as e:
+                # Port answers but the browser is wedged: start over
+                print(f"[WARN] Could not attach to browser daemon: {str(e)}")
+                self.browser = chromium.connect_over_cdp(self.daemon.restart())
+        elif self.cdp_endpoint:
+            self.browser = chromium.connect_over_cdp(self.cdp_endpoint)
+        else:
+            self.browser = chromium.launch(headless=self.headless)
+        
+        self._browser_lost = False
+        self.browser.on('disconnected', lambda _: setattr(self, '_browser_lost', True))
+        
+        self.memory.stop()
+        if self.memory.attach(self.browser):
+            self.memory.start()
+    
+    def _open_context(self, storage_state=None):
+        """
+        Create a fresh context and page on the connected browser
+        
+        Args:
+            storage_state: Cookies/localStorage to start with (from a recycled context)
+        """
+        options = {
+            'viewport': {'width': 1920, 'height': 1080},
+            'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+        }
+        if self.har and self._har_path and self.har.recording:
+            options['record_har_path'] = self._har_path
+        if storage_state:
+            options['storage_state'] = storage_state
+        self.context = self.browser.new_context(**options)
+        self.sites_in_context = 0
+        
+        if self.har and self._har_path and not self.har.recording:
+            # Serve everything from the HAR; anything not recorded fails fast
+            self.context.route_from_har(self._har_path, not_found='abort')
+        # Report CAPTCHAs as soon as they render, not only when checked for
+        self.context.expose_binding(CAPTCHA_BINDING, self._on_captcha_signal)
+        self.context.add_init_script(CAPTCHA_WATCH_JS)
+        self.context.add_init_script(MUTATION_COUNTER_JS)
+        
         self.page = self.context.new_page()
         self.page.set_default_timeout(self.timeout)
+        self.page.on('framenavigated', self._on_frame_navigated)
+        self.page.on('request', lambda request: self._log_network('request', request))
+        self.page.on('response', lambda response: self._log_network('response', response.request, response.status))
+        self.page.on('requestfailed', lambda request: self._log_network('failed', request, error=request.failure))
+        self._snapshot = None
+        self.captcha_signal = None
+        
+        self._route_pattern = None
+        if self._block_profile:
+            self.set_block_profile(self._block_profile)
+    
+    def _start_playwright(self):
+        """Playwright driver this handler runs on (AsyncBrowserHandler plugs in async_api)"""
+        return sync_playwright().start()
+    
+    def start(self):
+        """Start browser instance"""
+        self.playwright = self._start_playwright()
+        self._connect()
+        self._open_context()
         print("[OK] Browser started")
     
+    def ensure_browser(self):
+        """
+        Reconnect if the browser went away (e.g. the daemon crashed)
+        
+        Returns:
+            True if a reconnect happened
+        """
+        if not self._browser_lost:
+            return False
+        print("[WARN] Browser disconnected; reconnecting")
+        self._connect()
+        self._open_context()
+        return True
+    
     def close(self):
         """Close browser instance"""
+        self.memory.stop()
+        # Let queued failure artifacts reach the disk before the process exits
+        self.artifacts.flush(timeout=30)
         try:
             if self.page:
                 self.page.close()
@@ -64,19 +581,252 @@ class BrowserHandler:
         except:
             pass
     
-    def goto(self, url, wait_for='load'):
-        """Navigate to URL"""
+    def _readiness_rule(self, url):
+        """First special['readiness'] rule whose 'match' is in url, else the default"""
+        rules = (self.site_config or {}).get('special', {}).get('readiness', [])
+        for rule in rules:
+            if rule.get('match', '') in url:
+                return rule
+        return DEFAULT_READINESS
+    
+    @traced(args=('url',))
+    def goto(self, url, wait_for=None):
+        """
+        Navigate to URL and wait until the page is ready
+        
+        Readiness comes from the site's special['readiness'] rules (see
+        config.py); without one, waits for load, network idle and 2s of DOM
+        quiet. Each navigation's timing is recorded in self.metrics.
+        
+        Args:
+            url: Page to open
+            wait_for: Override the rule's wait_until load state
+        """
+        rule = self._readiness_rule(url)
+        started = time.monotonic()
+        timing = {'url': url, 'rule': rule.get('match', 'default'), 'ready': True}
         try:
-            self.page.goto(url, wait_until=wait_for)
-            # Wait for network to be idle
-            self.page.wait_for_load_state('networkidle', timeout=15000)
-            time.sleep(2)  # Additional wait for JavaScript
+            pattern = rule.get('response')
+            if pattern:
+                # Listen before navigating so an early XHR isn't missed
+                navigated = False
+                try:
+                    with self.page.expect_response(
+                        lambda response: pattern in response.url,
+                        timeout=self.waits.cap('response', rule.get('timeout')) * 1000
+                    ):
+                        self.page.goto(url, wait_until=wait_for or rule.get('wait_until', 'load'))
+                        navigated = True
+                except PlaywrightTimeout:
+                    if not navigated:
+                        raise
+                    timing['ready'] = False
+            else:
+                self.page.goto(url, wait_until=wait_for or rule.get('wait_until', 'load'))
+            timing['navigate_s'] = round(time.monotonic() - started, 3)
+            
+            if rule.get('selector'):
+                timing['ready'] &= self.waits.for_selector(rule['selector'], timeout=rule.get('timeout'))
+            if rule.get('networkidle'):
+                timing['ready'] &= self.waits.for_load('networkidle', timeout=rule.get('timeout', 15))
+            if rule.get('settle'):
+                self.waits.settle(rule['settle'])  # Let on-load JavaScript finish rendering
             return True
         except Exception as e:
+            timing['ready'] = False
+            timing['error'] = str(e)
             print(f"[FAIL] Navigation failed: {str(e)}")
             return False
+        finally:
+            timing['total_s'] = round(time.monotonic() - started, 3)
+            self.metrics.setdefault('navigations', []).append(timing)
+            self.metrics['navigation_s'] = round(self.metrics.get('navigation_s', 0) + timing['total_s'], 3)
+            if not timing['ready']:
+                self.metrics['navigations_not_ready'] = self.metrics.get('navigations_not_ready', 0) + 1
+    
+    def _count(self, name, amount=1):
+        self.metrics[name] = self.metrics.get(name, 0) + amount
+    
+    def _cache_key(self, kind, field):
+        """Selector cache key: domain, form (page path) and field"""
+        parsed = urlparse(self.page.url)
+        return SelectorCache.key(parsed.hostname or '', parsed.path or '/', f"{kind}:{field}")
+    
+    def _on_frame_navigated(self, frame):
+        if frame.parent_frame is None:
+            self._snapshot = None
+            self._content_cache = None
+            self.captcha_signal = None
+    
+    def _log_network(self, event, request, status=None, error=None):
+        entry = {
+            'time': datetime.now().isoformat(timespec='milliseconds'),
+            'event': event,
+            'method': request.method,
+            'url': request.url[:500],
+            'type': request.resource_type,
+        }
+        if status is not None:
+            entry['status'] = status
+        if error:
+            entry['error'] = error
+        self.network_events.append(entry)
+    
+    def capture_failure(self, label, error):
+        """
+        Save a screenshot, the DOM and recent network events for a failure
+        
+        Only the page reads happen here; compression and writing are done by
+        the background artifact writer.
+        
+        Args:
+            label: Name for the capture (e.g. the site domain)
+            error: Error message stored alongside
+        
+        Returns:
+            Directory the artifacts are written to, or None without a page
+        """
+        if not self.page:
+            return None
+        
+        files = {'network.json': json.dumps(list(self.network_events), indent=1)}
+        meta = {'label': label, 'error': error, 'captured_at': datetime.now().isoformat()}
+        try:
+            meta['url'] = self.page.url
+            files['screenshot.jpg'] = self.page.screenshot(type='jpeg', quality=60, timeout=5000)
+        except Exception as e:
+            meta['screenshot_error'] = str(e)
+        try:
+            files['dom.html'] = self.get_page_content()
+        except Exception as e:
+            meta['dom_error'] = str(e)
+        files['meta.json'] = json.dumps(meta, indent=2)
+        
+        return self.artifacts.submit(label, files)
+    
+    def _on_captcha_signal(self, source, vendor):
+        self.captcha_signal = {'vendor': vendor, 'url': source['frame'].url}
     
-    def fill_input(self, selectors, value, delay=100):
+    @traced(args=('refresh',))
+    def snapshot_form(self, refresh=False):
+        """
+        All inputs, selects, textareas, buttons and links of the page in one evaluate
+        
+        The snapshot is reused until the main frame navigates or an action
+        that may change the form (click, check, select) runs.
+        
+        Args:
+            refresh: Take a new snapshot even if one is cached
+        
+        Returns:
+            FormSnapshot, or None if the page could not be evaluated
+        """
+        if self._snapshot is None or refresh:
+            try:
+                self._snapshot = FormSnapshot(self.page.evaluate(SNAPSHOT_JS))
+                self._count('form_snapshots')
+            except Exception:
+                # Page mid-navigation; callers fall back to live locators
+                self._snapshot = None
+        return self._snapshot
+    
+    def _handle_locator(self, element):
+        """Locator for a snapshot element, or None"""
+        if not element:
+            return None
+        return self.page.locator(f'[data-bl-handle="{element["handle"]}"]').first
+    
+    def _snapshot_lookup(self, find):
+        """
+        Run find against the snapshot: element, None, or UNKNOWN
+        
+        A miss on a snapshot older than SNAPSHOT_MISS_TTL is retried once on
+        a fresh snapshot before it counts.
+        """
+        snapshot = self.snapshot_form()
+        if not snapshot:
+            return UNKNOWN
+        found = find(snapshot)
+        if found is None and time.monotonic() - snapshot.taken_at > SNAPSHOT_MISS_TTL:
+            snapshot = self.snapshot_form(refresh=True)
+            found = find(snapshot) if snapshot else UNKNOWN
+        return found
+    
+    def _locate(self, selector):
+        """First element for a CSS selector, from the snapshot when it can tell"""
+        found = self._snapshot_lookup(lambda snapshot: snapshot.find(selector))
+        if found is not UNKNOWN:
+            return self._handle_locator(found)
+        self._count('selector_probes')
+        element = self.page.locator(selector)
+        return element.first if element.count() > 0 else None
+    
+    @traced('fill_input.resolve', args=('selector', 'strategy'))
+    def _resolve_input(self, selector, strategy):
+        """Locator for selector under one fill_input strategy, or None"""
+        found = self._snapshot_lookup(lambda snapshot: snapshot.find_input(selector, strategy))
+        if found is not UNKNOWN:
+            return self._handle_locator(found)
+        
+        self._count('selector_probes')
+        if strategy == 'css':
+            element = self.page.locator(selector)
+        elif strategy == 'name':
+            if selector.startswith('['):
+                return None
+            element = self.page.locator(f'[name="{selector}"]')
+        elif strategy == 'id':
+            if selector.startswith('#'):
+                return None
+            element = self.page.locator(f'#{selector}')
+        elif strategy == 'placeholder':
+            element = self.page.get_by_placeholder(selector, exact=False)
+        else:
+            element = self.page.get_by_label(selector, exact=False)
+        return element.first if element.count() > 0 else None
+    
+    @traced('fill_input.fill')
+    def _fill_element(self, element, value, delay):
+        """Fill a resolved element; True if it ended up holding a value"""
+        # Wait for element to be visible and enabled
+        element.wait_for(state='visible', timeout=10000)
+        element.wait_for(state='attached', timeout=5000)
+        
+        # Scroll to element
+        element.scroll_into_view_if_needed()
+        self.waits.settle(0.5)
+        
+        # Clear and fill
+        try:
+            element.clear()
+        except:
+            pass  # Some fields don't support clear
+        
+        element.fill(value)
+        self.waits.pause(delay / 1000)
+        
+        # Verify value was filled
+        filled_value = element.input_value()
+        return filled_value == value or len(filled_value) > 0
+    
+    def _try_cached(self, key, resolve, act):
+        """Run act on the cached winner for key; drop the entry if it no longer works"""
+        cached = self.selector_cache.get(key)
+        if not cached:
+            return False
+        try:
+            element = resolve(cached['selector'], cached['strategy'])
+            if element and act(element):
+                self._count('selector_cache_hits')
+                return True
+        except Exception:
+            pass
+        if self.selector_cache.invalidate(key):
+            self._count('selector_cache_invalidated')
+        return False
+    
+    @traced(args=('selectors', 'field'))
+    def fill_input(self, selectors, value, delay=100, field=None):
         """
         Fill input field using multiple selector strategies
         
@@ -84,108 +834,150 @@ class BrowserHandler:
             selectors: List of selectors to try or single selector string
             value: Value to fill
             delay: Typing delay in milliseconds
+            field: Field name for the selector cache (defaults to the first selector)
         """
         if isinstance(selectors, str):
             selectors = [selectors]
         
         # Wait for page to be ready
-        time.sleep(1)
+        self.waits.settle(1)
         
-        for selector in selectors:
-            try:
-                element = None
-                
-                # Strategy 1: Direct selector
-                if self.page.locator(selector).count() > 0:
-                    element = self.page.locator(selector).first
-                
-                # Strategy 2: By placeholder
-                elif selector.lower() in ['username', 'email', 'password', 'name']:
-                    try:
-                        element = self.page.get_by_placeholder(selector, exact=False).first
-                    except:
-                        pass
-                
-                # Strategy 3: By label text
-                if not element:
-                    try:
-                        element = self.page.get_by_label(selector, exact=False).first
-                    except:
-                        pass
-                
-                # Strategy 4: By name attribute (without selector syntax)
-                if not element and not selector.startswith('['):
-                    try:
-                        element = self.page.locator(f'[name="{selector}"]').first
-                        if element.count() == 0:
-                            element = None
-                    except:
-                        pass
-                
-                # Strategy 5: By id (without # symbol)
-                if not element and not selector.startswith('#'):
-                    try:
-                        element = self.page.locator(f'#{selector}').first
-                        if element.count() == 0:
-                            element = None
-                    except:
-                        pass
-                
-                if element:
-                    # Wait for element to be visible and enabled
-                    element.wait_for(state='visible', timeout=10000)
-                    element.wait_for(state='attached', timeout=5000)
-                    
-                    # Scroll to element
-                    element.scroll_into_view_if_needed()
-                    time.sleep(0.5)
-                    
-                    # Clear and fill
-                    try:
-                        element.clear()
-                    except:
-                        pass  # Some fields don't support clear
-                    
-                    element.fill(value)
-                    time.sleep(delay / 1000)
-                    
-                    # Verify value was filled
-                    filled_value = element.input_value()
-                    if filled_value == value or len(filled_value) > 0:
-                        return True
-                    
-            except Exception as e:
-                # Debug: print what went wrong
-                # print(f"  Selector '{selector}' failed: {str(e)}")
-                continue
+        key = self._cache_key('input', field or selectors[0])
+        fill = lambda element: self._fill_element(element, value, delay)
+        if self._try_cached(key, self._resolve_input, fill):
+            return True
+        self._count('selector_cache_misses')
+        
+        # Second pass re-snapshots in case the field appeared since the last one
+        for attempt in range(2):
+            if attempt:
+                self.snapshot_form(refresh=True)
+            for selector in selectors:
+                try:
+                    for strategy in INPUT_STRATEGIES:
+                        element = self._resolve_input(selector, strategy)
+                        if not element:
+                            continue
+                        if fill(element):
+                            self.selector_cache.record(key, selector, strategy)
+                            return True
+                        break
+                        
+                except Exception as e:
+                    # Debug: print what went wrong
+                    # print(f"  Selector '{selector}' failed: {str(e)}")
+                    continue
         
         print(f"[WARN] Could not fill field with selectors: {selectors}")
         return False
     
-    def click_button(self, selectors):
+    @traced(args=('mapping',))
+    def fill_form(self, mapping):
+        """
+        Fill several fields in one page round-trip
+        
+        Every field is resolved and filled by a single evaluate; only the
+        fields it could not fill fall back to fill_input.
+        
+        Args:
+            mapping: {field_name: (selectors, value)}
+        
+        Returns:
+            {field_name: True/False}
+        """
+        fields = []
+        cached = {}
+        for field_name, (selectors, value) in mapping.items():
+            if isinstance(selectors, str):
+                selectors = [selectors]
+            selectors = list(selectors)
+            
+            # Put the last winning selector first so the page tries it first
+            key = self._cache_key('input', field_name)
+            entry = self.selector_cache.get(key)
+            if entry:
+                cached[field_name] = (key, entry)
+                if entry['selector'] in selectors:
+                    selectors.remove(entry['selector'])
+                selectors.insert(0, entry['selector'])
+            fields.append([field_name, selectors, str(value)])
+        
+        if not fields:
+            return {}
+        
+        self.waits.settle(1)
+        try:
+            outcome = self.page.evaluate(FILL_FORM_JS, fields)
+        except Exception as e:
+            print(f"[WARN] Batch fill failed, filling fields one by one: {str(e)}")
+            outcome = {}
+        
+        results = {}
+        for field_name, selectors, value in fields:
+            field_outcome = outcome.get(field_name, {})
+            key, entry = cached.get(field_name, (self._cache_key('input', field_name), None))
+            
+            if field_outcome.get('ok'):
+                won = (field_outcome['selector'], field_outcome['strategy'])
+                if entry and won == (entry['selector'], entry['strategy']):
+                    self._count('selector_cache_hits')
+                else:
+                    self._count('selector_cache_misses')
+                    self.selector_cache.record(key, *won)
+                results[field_name] = True
+                continue
+            
+            # fill_input counts its own miss and records the new winner
+            if entry and self.selector_cache.invalidate(key):
+                self._count('selector_cache_invalidated')
+            results[field_name] = self.fill_input(selectors, value, field=field_name)
+        return results
+    
+    @traced('click_button.resolve', args=('selector', 'strategy'))
+    def _resolve_button(self, selector, strategy):
+        """Locator for selector under one click_button strategy, or None"""
+        found = self._snapshot_lookup(lambda snapshot: snapshot.find_button(selector, strategy))
+        if found is not UNKNOWN:
+            return self._handle_locator(found)
+        
+        self._count('selector_probes')
+        if strategy == 'role':
+            element = self.page.get_by_role("button", name=selector)
+        elif strategy == 'text':
+            element = self.page.get_by_text(selector, exact=False)
+        else:
+            element = self.page.locator(selector)
+        return element.first if element.count() > 0 else None
+    
+    def _click_element(self, element):
+        element.wait_for(state='visible', timeout=5000)
+        element.click()
+        self._snapshot = None
+        self.waits.settle(2)  # Wait for action to complete
+        return True
+    
+    @traced(args=('selectors', 'field'))
+    def click_button(self, selectors, field=None):
         """Click button using multiple selector strategies"""
         if isinstance(selectors, str):
             selectors = [selectors]
         
+        key = self._cache_key('button', field or selectors[0])
+        if self._try_cached(key, self._resolve_button, self._click_element):
+            return True
+        self._count('selector_cache_misses')
+        
         for selector in selectors:
             try:
-                # Try different selector types
-                element = None
-                
-                # Try by text content
-                if self.page.get_by_role("button", name=selector).count() > 0:
-                    element = self.page.get_by_role("button", name=selector).first
-                # Try by text (link or button)
-                elif self.page.get_by_text(selector, exact=False).count() > 0:
-                    element = self.page.get_by_text(selector, exact=False).first
-                # Try as CSS selector
-                elif self.page.locator(selector).count() > 0:
-                    element = self.page.locator(selector).first
+                # Try by role name, then text (link or button), then CSS
+                for strategy in BUTTON_STRATEGIES:
+                    element = self._resolve_button(selector, strategy)
+                    if element:
+                        break
                 
                 if element:
-                    element.wait_for(state='visible', timeout=5000)
-                    element.click()
-                    time.sleep(2)  # Wait for action to complete
+                    self._click_element(element)
+                    self.selector_cache.record(key, selector, strategy)
                     return True
                     
             except Exception as e:
@@ -202,59 +994,176 @@ class BrowserHandler:
         except:
             return False
     
+    @traced()
+    def detect_captcha(self):
+        """
+        Look for a CAPTCHA widget in the page
+        
+        Returns:
+            Vendor name ('recaptcha', 'hcaptcha', 'turnstile', 'funcaptcha',
+            'image' or 'unknown'), or None if there is none
+        """
+        try:
+            vendor = self.page.evaluate(DETECT_CAPTCHA_JS)
+        except Exception:
+            return None
+        if vendor:
+            self.captcha_signal = {'vendor': vendor, 'url': self.page.url}
+        return vendor
+    
     def check_captcha(self):
         """Check if CAPTCHA is present on page"""
-        captcha_indicators = [
-            'recaptcha',
-            'g-recaptcha',
-            'captcha',
-            'hcaptcha',
-            'cf-turnstile'
-        ]
-        
-        page_content = self.page.content().lower()
-        
-        for indicator in captcha_indicators:
-            if indicator in page_content:
-                return True
-        
-        return False
+        return self.detect_captcha() is not None
+    
+    def can_pause_for_captcha(self):
+        """True if someone can answer handle_captcha_pause (stdin is a terminal)"""
+        try:
+            return sys.stdin is not None and sys.stdin.isatty()
+        except (AttributeError, ValueError):
+            return False
     
     def handle_captcha_pause(self):
-        """Pause for manual CAPTCHA solving"""
+        """
+        Pause for manual CAPTCHA solving
+        
+        Raises:
+            Exception: stdin is not a terminal (cron, worker processes) or
+                was closed before ENTER, so nobody can solve it
+        """
+        if not self.can_pause_for_captcha():
+            raise Exception("CAPTCHA needs manual solving, but stdin is not interactive")
+        
         print("\n" + "="*60)
         print("[WARN] CAPTCHA DETECTED!")
         print("="*60)
         print("Please solve the CAPTCHA manually in the browser window.")
         print("After solving, press ENTER to continue...")
         print("="*60)
-        input()
-        time.sleep(2)
+        # Wait on the Playwright thread, not in input(): with the sync API,
+        # routes and events are only dispatched while Python is inside a
+        # Playwright call, so a blocked input() would stall the CAPTCHA itself
+        entered = threading.Event()
+        answer = {}
+        
+        def read_enter():
+            try:
+                input()
+                answer['ok'] = True
+            except (EOFError, OSError, ValueError):
+                answer['ok'] = False
+            finally:
+                entered.set()
+        
+        threading.Thread(target=read_enter, name='captcha-enter', daemon=True).start()
+        while not entered.is_set():
+            self.page.wait_for_timeout(250)
+        if not answer.get('ok'):
+            raise Exception("stdin closed while waiting for the CAPTCHA to be solved")
+        self.captcha_signal = None
+        self.waits.settle(2)
     
-    def save_cookies(self, filepath):
-        """Save cookies to file"""
+    def save_storage_state(self, filepath, domain, extra=None):
+        """
+        Save the session (cookies + localStorage) for one site domain
+        
+        Args:
+            filepath: JSON file to write
+            domain: Only cookies/origins of this domain are kept, since the
+                context may be shared with other sites
+            extra: Additional keys stored alongside (e.g. the account's user data)
+        """
         try:
-            cookies = self.context.cookies()
-            import json
-            with open(filepath, 'w') as f:
-                json.dump(cookies, f)
+            state = self.context.storage_state()
+            data = dict(extra or {})
+            data['cookies'] = [c for c in state.get('cookies', []) if _on_domain(c['domain'], domain)]
+            data['origins'] = [
+                o for o in state.get('origins', [])
+                if _on_domain(urlparse(o['origin']).hostname, domain)
+            ]
+            
+            os.makedirs(os.path.dirname(filepath) or '.', exist_ok=True)
+            tmp_path = filepath + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp_path, filepath)
             return True
         except Exception as e:
-            print(f"[WARN] Failed to save cookies: {str(e)}")
+            print(f"[WARN] Failed to save session: {str(e)}")
             return False
     
-    def load_cookies(self, filepath):
-        """Load cookies from file"""
+    def load_storage_state(self, filepath):
+        """
+        Load a session saved by save_storage_state into the current context
+        
+        Cookies are added in place. localStorage can only be written from the
+        origin itself, so when the session has any, the context is reopened
+        with the merged storage state, the way _maybe_recycle does. Adding an
+        init script per load instead would pile scripts up on a context that
+        serves many sites.
+        
+        Returns:
+            The saved data (including any extra keys), or None
+        """
         try:
-            import json
-            if os.path.exists(filepath):
-                with open(filepath, 'r') as f:
-                    cookies = json.load(f)
-                self.context.add_cookies(cookies)
-                return True
+            if not os.path.exists(filepath):
+                return None
+            with open(filepath, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            
+            if not data.get('origins'):
+                if data.get('cookies'):
+                    self.context.add_cookies(data['cookies'])
+                return data
+            
+            state = self.context.storage_state()
+            # Saved entries replace the context's own for the same cookie/origin
+            cookie_key = lambda c: (c['name'], c['domain'], c.get('path', '/'))
+            saved_cookies = {cookie_key(c) for c in data.get('cookies', [])}
+            state['cookies'] = [
+                c for c in state.get('cookies', []) if cookie_key(c) not in saved_cookies
+            ] + data.get('cookies', [])
+            saved_origins = {o['origin'] for o in data['origins']}
+            state['origins'] = [
+                o for o in state.get('origins', []) if o['origin'] not in saved_origins
+            ] + data['origins']
+            
+            sites_in_context = self.sites_in_context
+            try:
+                self.context.close()
+            except Exception:
+                pass
+            self._open_context(storage_state=state)
+            self.sites_in_context = sites_in_context
+            return data
         except Exception as e:
-            print(f"[WARN] Failed to load cookies: {str(e)}")
-        return False
+            print(f"[WARN] Failed to load session: {str(e)}")
+            return None
+    
+    def probe_logged_in(self, probe):
+        """
+        Check a site session without rendering a page
+        
+        Fetches probe['url'] with the context's cookies (see SESSIONS_DIR in
+        config.py for the probe keys).
+        
+        Returns:
+            True if the session looks logged in
+        """
+        try:
+            response = self.context.request.get(probe['url'], timeout=self.timeout)
+            if not response.ok:
+                return False
+            logged_out_url = probe.get('logged_out_url')
+            if logged_out_url and logged_out_url in response.url.lower():
+                return False
+            expect_text = probe.get('expect_text')
+            if expect_text:
+                body = response.text().lower()
+                return any(text.lower() in body for text in expect_text)
+            return True
+        except Exception as e:
+            print(f"[WARN] Login probe failed: {str(e)}")
+            return False
     
     def get_current_url(self):
         """Get current page URL"""
@@ -305,6 +1214,7 @@ class BrowserHandler:
         except Exception as e:
             print(f"[DEBUG] Error inspecting page: {str(e)}")
     
+    @traced(args=('selectors', 'index'))
     def select_dropdown(self, selectors, value=None, index=None):
         """
         Select option from dropdown
@@ -319,8 +1229,8 @@ class BrowserHandler:
         
         for selector in selectors:
             try:
-                if self.page.locator(selector).count() > 0:
-                    element = self.page.locator(selector).first
+                element = self._locate(selector)
+                if element:
                     element.wait_for(state='visible', timeout=5000)
                     
                     if index is not None:
@@ -341,7 +1251,8 @@ class BrowserHandler:
                                         element.select_option(index=i)
                                         break
                     
-                    time.sleep(0.5)
+                    self._snapshot = None
+                    self.waits.settle(0.5)
                     return True
                     
             except Exception as e:
@@ -350,6 +1261,7 @@ class BrowserHandler:
         print(f"[WARN] Could not select dropdown with selectors: {selectors}")
         return False
     
+    @traced(args=('selectors',))
     def click_checkbox(self, selectors):
         """Click checkbox to check it"""
         if isinstance(selectors, str):
@@ -357,14 +1269,15 @@ class BrowserHandler:
         
         for selector in selectors:
             try:
-                if self.page.locator(selector).count() > 0:
-                    element = self.page.locator(selector).first
+                element = self._locate(selector)
+                if element:
                     element.wait_for(state='visible', timeout=5000)
                     
                     # Check if already checked
                     if not element.is_checked():
                         element.check()
-                        time.sleep(0.5)
+                        self._snapshot = None
+                        self.waits.settle(0.5)
                     
                     return True
                     
@@ -374,6 +1287,7 @@ class BrowserHandler:
         print(f"[WARN] Could not find checkbox with selectors: {selectors}")
         return False
     
+    @traced(args=('selectors',))
     def click_radio(self, selectors):
         """Click radio button"""
         if isinstance(selectors, str):
@@ -381,11 +1295,12 @@ class BrowserHandler:
         
         for selector in selectors:
             try:
-                if self.page.locator(selector).count() > 0:
-                    element = self.page.locator(selector).first
+                element = self._locate(selector)
+                if element:
                     element.wait_for(state='visible', timeout=5000)
                     element.check()
-                    time.sleep(0.5)
+                    self._snapshot = None
+                    self.waits.settle(0.5)
                     return True
                     
             except Exception as e:
@@ -413,7 +1328,7 @@ class BrowserHandler:
                 if element.count() > 0:
                     element.wait_for(state='visible', timeout=5000)
                     element.scroll_into_view_if_needed()
-                    time.sleep(0.5)
+                    self.waits.settle(0.5)
                     
                     # Try click with navigation expectation
                     try:
@@ -424,8 +1339,8 @@ class BrowserHandler:
                         # Navigation didn't happen, but click might have worked
                         pass
                     
-                    # Verify click worked by checking if URL changed
-                    time.sleep(2)
+                    # Give a click that did not navigate time to take effect
+                    self.waits.settle(2)
                     return True
             except:
                 continue
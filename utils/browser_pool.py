@@ -0,0 +1,78 @@
+import socket
+from playwright.sync_api import sync_playwright
+
+from utils.browser_handler import BrowserHandler
+
+
+def _free_port():
+    """Ask the OS for a free local TCP port"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+class BrowserPool:
+    """
+    One shared Chromium process that concurrent workers attach to.
+
+    Playwright's sync API binds every object to the thread that created it,
+    so workers cannot share a Browser object directly. Instead the pool
+    launches Chromium with a remote debugging port and each worker thread
+    connects its own BrowserHandler over CDP, getting an isolated
+    BrowserContext and page on the same browser process.
+    """
+
+    def __init__(self, headless=False, timeout=30000, daemon=None, har=None):
+        self.headless = headless
+        self.timeout = timeout
+        # Optional HarArchive passed on to every handler
+        self.har = har
+        # With a BrowserDaemon the shared browser is the daemon's warm Chromium
+        self.daemon = daemon
+        self.playwright = None
+        self.browser = None
+        self.endpoint = None
+
+    def start(self):
+        """Launch the shared Chromium instance"""
+        if self.daemon:
+            self.endpoint = self.daemon.ensure_running()
+            print(f"[OK] Using browser daemon ({self.endpoint})")
+            return
+        
+        port = _free_port()
+        self.playwright = sync_playwright().start()
+        self.browser = self.playwright.chromium.launch(
+            headless=self.headless,
+            args=[f'--remote-debugging-port={port}']
+        )
+        self.endpoint = f'http://127.0.0.1:{port}'
+        print(f"[OK] Shared browser started ({self.endpoint})")
+
+    def new_handler(self):
+        """
+        Create a BrowserHandler attached to the shared browser.
+
+        The handler must be started (and closed) in the thread that uses it.
+        """
+        if not self.endpoint:
+            raise RuntimeError("Browser pool is not started. Call start() first.")
+        if self.daemon:
+            return BrowserHandler(headless=self.headless, timeout=self.timeout, daemon=self.daemon, har=self.har)
+        return BrowserHandler(
+            headless=self.headless,
+            timeout=self.timeout,
+            cdp_endpoint=self.endpoint,
+            har=self.har
+        )
+
+    def close(self):
+        """Close the shared browser (call from the thread that started it)"""
+        try:
+            if self.browser:
+                self.browser.close()
+            if self.playwright:
+                self.playwright.stop()
+            print("[OK] Shared browser closed")
+        except:
+            pass
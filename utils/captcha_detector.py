@@ -0,0 +1,63 @@
+# In-page CAPTCHA detection used by BrowserHandler (checks and the init-script watcher).
+# Looking for widget iframes, loader scripts and widget containers in the DOM
+# avoids pulling the whole page HTML into Python for a substring scan.
+
+# Body of a function returning the vendor name found, or null
+_DETECT_BODY = """
+    const vendors = [
+        ['recaptcha', /google\\.com\\/recaptcha|gstatic\\.com\\/recaptcha|recaptcha\\.net/i,
+            '.g-recaptcha, #g-recaptcha-response, textarea[name="g-recaptcha-response"]'],
+        ['hcaptcha', /hcaptcha\\.com/i,
+            '.h-captcha, textarea[name="h-captcha-response"]'],
+        ['turnstile', /challenges\\.cloudflare\\.com/i,
+            '.cf-turnstile, input[name="cf-turnstile-response"]'],
+        ['funcaptcha', /arkoselabs\\.com|funcaptcha\\.com/i,
+            '#FunCaptcha, [data-pkey]'],
+    ];
+    const sources = [];
+    for (const el of document.querySelectorAll('iframe[src], script[src]')) sources.push(el.src);
+    for (const [vendor, pattern, widget] of vendors) {
+        if (document.querySelector(widget)) return vendor;
+        if (sources.some((src) => pattern.test(src))) return vendor;
+    }
+    if (document.querySelector('[data-sitekey]')) return 'unknown';
+    // Home-grown image captchas: <img src=".../captcha.php"> plus an answer field
+    if (document.querySelector('img[src*="captcha" i], input[name*="captcha" i], input[id*="captcha" i]')) {
+        return 'image';
+    }
+    return null;
+"""
+
+DETECT_CAPTCHA_JS = "() => {" + _DETECT_BODY + "}"
+
+# Binding the watcher reports through (see BrowserHandler._open_context)
+CAPTCHA_BINDING = '__blCaptchaSignal'
+
+# Init script: watch the top document for a CAPTCHA appearing at any point
+# (including after load, e.g. once a form is submitted) and report it once.
+CAPTCHA_WATCH_JS = """
+(() => {
+    if (window.top !== window) return;
+    const detect = () => {""" + _DETECT_BODY + """};
+    let reported = false;
+    let scheduled = false;
+    const check = () => {
+        scheduled = false;
+        if (reported) return;
+        const vendor = detect();
+        if (vendor && typeof window.""" + CAPTCHA_BINDING + """ === 'function') {
+            reported = true;
+            observer.disconnect();
+            window.""" + CAPTCHA_BINDING + """(vendor);
+        }
+    };
+    const observer = new MutationObserver(() => {
+        if (!scheduled) {
+            scheduled = true;
+            setTimeout(check, 200);
+        }
+    });
+    observer.observe(document, { childList: true, subtree: true });
+    document.addEventListener('DOMContentLoaded', check);
+})();
+"""
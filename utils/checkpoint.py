@@ -0,0 +1,83 @@
+import json
+import os
+import threading
+from datetime import datetime
+
+
+class SiteCheckpoint:
+    """Completed steps (and their results) for one site within a run"""
+    
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.data = {'steps': {}, 'user_data': None, 'result': None}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.data.update(json.load(f))
+            except Exception as e:
+                print(f"[WARN] Ignoring unreadable checkpoint {path}: {str(e)}")
+    
+    def _save(self):
+        # Write-then-rename so an interrupt never leaves a half-written file
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, indent=2)
+        os.replace(tmp_path, self.path)
+    
+    def is_done(self, step):
+        return step in self.data['steps']
+    
+    def get(self, step):
+        entry = self.data['steps'].get(step)
+        return entry['value'] if entry else None
+    
+    def mark(self, step, value=None):
+        """Record a completed step and persist immediately"""
+        with self._lock:
+            self.data['steps'][step] = {
+                'value': value,
+                'completed_at': datetime.now().isoformat()
+            }
+            self._save()
+    
+    @property
+    def user_data(self):
+        return self.data.get('user_data')
+    
+    @user_data.setter
+    def user_data(self, value):
+        with self._lock:
+            self.data['user_data'] = value
+            self._save()
+    
+    @property
+    def result(self):
+        """Final site result once the whole flow has finished, else None"""
+        return self.data.get('result')
+    
+    def finish(self, result):
+        with self._lock:
+            self.data['result'] = result
+            self._save()
+
+
+class RunCheckpoint:
+    """
+    Per-run checkpoint directory (checkpoints/<run_id>/<site_key>.json).
+
+    One file per site keeps concurrent workers and processes from
+    contending on a single file.
+    """
+    
+    def __init__(self, run_id=None, directory='checkpoints'):
+        self.run_id = run_id or datetime.now().strftime('%Y%m%d-%H%M%S')
+        self.path = os.path.join(directory, self.run_id)
+        os.makedirs(self.path, exist_ok=True)
+    
+    @staticmethod
+    def exists(run_id, directory='checkpoints'):
+        return os.path.isdir(os.path.join(directory, run_id))
+    
+    def for_site(self, site_key):
+        return SiteCheckpoint(os.path.join(self.path, f'{site_key}.json'))
@@ -1,24 +1,75 @@
 import imaplib
-import email
+import json
+import os
 import time
-import re
-from email.header import decode_header
-from bs4 import BeautifulSoup
+import select
+import ssl
+import threading
+import warnings
+from concurrent.futures import TimeoutError as FutureTimeout
+from datetime import date, timedelta
+
+from utils.imap_fetch import fetch_headers, fetch_texts
+from utils.link_extractor import extract_links
+from utils.mailbox_watcher import MailboxWatcher
 
 class EmailHandler:
     """Handle email verification and link extraction"""
     
-    def __init__(self, email_address, app_password):
+    # Mail this old is looked at when there is no usable high-water mark yet
+    INITIAL_LOOKBACK_DAYS = 1
+    # Extra seconds wait_for_verification_email allows past max_wait
+    RESULT_MARGIN = 30
+    # Socket timeout while connecting, so a dead server can't hang the watcher
+    CONNECT_TIMEOUT = 15
+    # Socket timeout for every other command; a half-open connection then
+    # fails the command (and the watcher reconnects) instead of blocking
+    COMMAND_TIMEOUT = 60
+    
+    def __init__(self, email_address, app_password, imap_server="imap.gmail.com", imap_port=993,
+                 use_ssl=True, state_file=None):
+        """
+        Args:
+            email_address: Mailbox login
+            app_password: App password for the mailbox
+            imap_server: IMAP host (a local stand-in works for testing)
+            imap_port: IMAP port
+            use_ssl: IMAP over TLS (False for a plain local server)
+            state_file: JSON file keeping each account's UID high-water mark
+                across runs (None keeps it in memory only)
+        """
         self.email_address = email_address
         self.app_password = app_password
-        self.imap_server = "imap.gmail.com"
-        self.imap_port = 993
+        self.imap_server = imap_server
+        self.imap_port = imap_port
+        self.use_ssl = use_ssl
+        # imaplib connections are not thread-safe; serialise mailbox access
+        self._lock = threading.Lock()
+        # Whether the server advertises IDLE (RFC 2177); known after connect()
+        self.idle_supported = False
+        # Only inbox UIDs above last_uid are new; both reset if UIDVALIDITY changes
+        self.state_file = state_file
+        self.account_key = f"{imap_server}/{email_address}"
+        self.uidvalidity, self.last_uid = self._load_mark()
+        self._selected = False
+        # Sole reader of the mailbox while sites wait for verification mail
+        self.watcher = MailboxWatcher(self)
         
     def connect(self):
-        """Connect to Gmail IMAP server"""
+        """Connect to the IMAP server"""
         try:
-            self.mail = imaplib.IMAP4_SSL(self.imap_server, self.imap_port)
+            if self.use_ssl:
+                self.mail = imaplib.IMAP4_SSL(self.imap_server, self.imap_port, timeout=self.CONNECT_TIMEOUT)
+            else:
+                self.mail = imaplib.IMAP4(self.imap_server, self.imap_port, timeout=self.CONNECT_TIMEOUT)
+            self.mail.sock.settimeout(self.COMMAND_TIMEOUT)
             self.mail.login(self.email_address, self.app_password)
+            self._selected = False
+            
+            # Capabilities can change after login, so ask again
+            status, data = self.mail.capability()
+            self.idle_supported = status == 'OK' and b'IDLE' in data[0].upper().split()
+            
             print(f"✓ Connected to email: {self.email_address}")
             return True
         except Exception as e:
@@ -27,137 +78,256 @@ class EmailHandler:
     
     def disconnect(self):
         """Disconnect from IMAP server"""
+        self.watcher.stop()
         try:
             self.mail.logout()
         except:
             pass
     
-    def get_verification_link(self, domain, max_wait=120, check_interval=10):
+    def _idle(self, timeout):
         """
-        Wait for and extract verification link from email
+        Block in IMAP IDLE on the selected mailbox until the server reports
+        new mail or timeout seconds pass (imaplib has no idle() before 3.14)
         
-        Args:
-            domain: Domain to search for (e.g., 'unolist.in')
-            max_wait: Maximum time to wait in seconds
-            check_interval: Time between checks in seconds
+        Must be called with self._lock held and a mailbox selected.
         
         Returns:
-            Verification link or None
+            True if the server announced new messages
         """
-        print(f"⏳ Waiting for verification email from {domain}...")
-        
-        start_time = time.time()
+        tag = self.mail._new_tag()
+        self.mail.send(tag + b' IDLE\r\n')
+        line = self.mail.readline()
+        if not line.startswith(b'+'):
+            # Tagged NO/BAD: the server won't idle after all
+            self.idle_supported = False
+            return False
         
-        while (time.time() - start_time) < max_wait:
+        new_mail = False
+        deadline = time.time() + timeout
+        sock = self.mail.sock
+        # No socket timeout while idling: select() does the waiting, and a
+        # timed-out socket file refuses every later read
+        sock.settimeout(None)
+        try:
+            while not new_mail:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                # Lines already buffered (e.g. EXISTS sent with the
+                # "+ idling") never wake select()
+                if not self._buffered() and not select.select([sock], [], [], min(remaining, 1.0))[0]:
+                    continue
+                line = self.mail.readline()
+                if not line or line.startswith(b'* BYE'):
+                    raise imaplib.IMAP4.abort("server closed the connection during IDLE")
+                if line.rstrip().upper().endswith((b' EXISTS', b' RECENT')):
+                    new_mail = True
+        finally:
+            # End IDLE and drain up to its tagged completion
+            sock.settimeout(self.COMMAND_TIMEOUT)
+            self.mail.send(b'DONE\r\n')
+            while True:
+                line = self.mail.readline()
+                if not line or line.startswith(tag):
+                    break
+        return new_mail
+    
+    def _buffered(self):
+        """Whether imaplib's reader already holds unread response bytes"""
+        sock = self.mail.sock
+        if getattr(sock, 'pending', None) and sock.pending():
+            return True
+        previous = sock.gettimeout()
+        sock.setblocking(False)
+        try:
+            # Returns what is buffered, reading only what is already there
+            return bool(self.mail.file.peek(1))
+        except (BlockingIOError, ssl.SSLWantReadError):
+            return False
+        finally:
+            sock.settimeout(previous)
+    
+    def wait_for_new_mail(self, timeout, check_interval):
+        """
+        Wait for new mail in the selected inbox: IDLE when the server has it,
+        otherwise a plain poll interval
+        """
+        if self.idle_supported:
             try:
-                # Select inbox
-                self.mail.select('inbox')
-                
-                # Search for recent emails from domain
-                search_criteria = f'(FROM "{domain}" UNSEEN)'
-                status, messages = self.mail.search(None, search_criteria)
-                
-                if status == 'OK':
-                    email_ids = messages[0].split()
-                    
-                    # Check latest emails first
-                    for email_id in reversed(email_ids[-5:]):  # Check last 5 emails
-                        link = self._extract_link_from_email(email_id, domain)
-                        if link:
-                            print(f"✓ Found verification link!")
-                            return link
-                
-                # Wait before next check
-                print(f"   Checking again in {check_interval}s... ({int(time.time() - start_time)}s elapsed)")
-                time.sleep(check_interval)
-                
-            except Exception as e:
-                print(f"⚠ Error checking email: {str(e)}")
-                time.sleep(check_interval)
-        
-        print(f"✗ Verification email not received within {max_wait}s")
-        return None
+                with self._lock:
+                    return self._idle(timeout)
+            except (imaplib.IMAP4.abort, OSError) as e:
+                print(f"⚠ IDLE failed, reconnecting: {str(e)}")
+                self.connect()
+                return False
+        time.sleep(min(timeout, check_interval))
+        return False
+    
+    def _load_mark(self):
+        """(UIDVALIDITY, last UID seen) stored for this account, or (None, None)"""
+        if not self.state_file or not os.path.exists(self.state_file):
+            return None, None
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                mark = json.load(f).get(self.account_key, {})
+            return mark.get('uidvalidity'), mark.get('last_uid')
+        except Exception as e:
+            print(f"⚠ Could not read {self.state_file}: {str(e)}")
+            return None, None
     
-    def _extract_link_from_email(self, email_id, domain):
-        """Extract verification link from email body"""
+    def _save_mark(self):
+        """Persist the high-water mark (the highest wins if workers race)"""
+        if not self.state_file:
+            return
         try:
-            # Fetch email
-            status, msg_data = self.mail.fetch(email_id, '(RFC822)')
+            state = {}
+            if os.path.exists(self.state_file):
+                with open(self.state_file, 'r', encoding='utf-8') as f:
+                    state = json.load(f)
+            stored = state.get(self.account_key, {})
+            if stored.get('uidvalidity') == self.uidvalidity and (stored.get('last_uid') or 0) > self.last_uid:
+                return
+            state[self.account_key] = {'uidvalidity': self.uidvalidity, 'last_uid': self.last_uid}
+            tmp_path = f"{self.state_file}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f, indent=2)
+            os.replace(tmp_path, self.state_file)
+        except Exception as e:
+            print(f"⚠ Could not save {self.state_file}: {str(e)}")
+    
+    def _select_inbox(self):
+        """Select the inbox and drop the mark if the server renumbered it"""
+        status, _ = self.mail.select('inbox')
+        if status != 'OK':
+            raise imaplib.IMAP4.error("could not select inbox")
+        _, validity = self.mail.response('UIDVALIDITY')
+        _, uidnext = self.mail.response('UIDNEXT')
+        validity = int(validity[0]) if validity and validity[0] else None
+        if validity != self.uidvalidity:
+            self.uidvalidity, self.last_uid = validity, None
+        self._uidnext = int(uidnext[0]) if uidnext and uidnext[0] else None
+        self._selected = True
+    
+    def fetch_new(self, batch_size=50):
+        """
+        Envelope and body structure of inbox messages that arrived since the
+        last call (or the last run), read or not; no bodies
+        
+        Each call only searches UIDs above the high-water mark, so its cost
+        follows the amount of new mail, not the size of the mailbox. All new
+        UIDs are fetched, batch_size per command, and the mark only moves
+        once every one of them has been.
+        
+        Args:
+            batch_size: UIDs per FETCH command
+        
+        Returns:
+            [{'uid', 'sender', 'subject', 'part', 'links'}]; links stays None
+            until fetch_links()
+        """
+        with self._lock:
+            if not self._selected:
+                self._select_inbox()
             
+            if self.last_uid is None:
+                # No usable mark: look at recent mail only, then start counting
+                since = date.today() - timedelta(days=self.INITIAL_LOOKBACK_DAYS)
+                month = 'Jan Feb Mar Apr May Jun Jul Aug Sep Oct Nov Dec'.split()[since.month - 1]
+                status, data = self.mail.uid('search', None, 'SINCE', f"{since.day}-{month}-{since.year}")
+            else:
+                status, data = self.mail.uid('search', None, 'UID', f"{self.last_uid + 1}:*")
             if status != 'OK':
-                return None
-            
-            # Parse email
-            email_body = msg_data[0][1]
-            email_message = email.message_from_bytes(email_body)
-            
-            # Get email content
-            body = self._get_email_body(email_message)
+                return []
             
-            if not body:
-                return None
+            # "n:*" still matches the newest message when nothing is above n
+            uids = sorted(
+                (uid for uid in data[0].split() if self.last_uid is None or int(uid) > self.last_uid),
+                key=int
+            )
+            if not uids:
+                if self.last_uid is None and self._uidnext:
+                    self.last_uid = self._uidnext - 1
+                    self._save_mark()
+                return []
             
-            # Extract links
-            links = self._extract_links(body)
+            headers = []
+            for start in range(0, len(uids), batch_size):
+                headers.extend(fetch_headers(self.mail, uids[start:start + batch_size]))
+            for header in headers:
+                header['links'] = None
             
-            # Find verification link containing domain
-            for link in links:
-                if domain in link and any(keyword in link.lower() for keyword in 
-                    ['verify', 'confirm', 'activate', 'validation', 'token', 'validate']):
-                    return link
-            
-            # Fallback: return any link with domain
-            for link in links:
-                if domain in link:
-                    return link
-            
-            return None
-            
-        except Exception as e:
-            print(f"⚠ Error extracting link: {str(e)}")
-            return None
+            # Only now: if a batch fails, the next call fetches them all again
+            self.last_uid = int(uids[-1])
+            self._save_mark()
+            return headers
     
-    def _get_email_body(self, email_message):
-        """Extract email body from message"""
-        body = ""
+    def fetch_links(self, headers):
+        """
+        Links in the text part of each message, fetched in one batch
         
-        if email_message.is_multipart():
-            for part in email_message.walk():
-                content_type = part.get_content_type()
-                
-                if content_type == "text/plain" or content_type == "text/html":
-                    try:
-                        payload = part.get_payload(decode=True)
-                        body += payload.decode('utf-8', errors='ignore')
-                    except:
-                        pass
-        else:
-            try:
-                payload = email_message.get_payload(decode=True)
-                body = payload.decode('utf-8', errors='ignore')
-            except:
-                pass
+        Args:
+            headers: Entries from fetch_new
         
-        return body
+        Returns:
+            {uid: [links]}
+        """
+        with self._lock:
+            texts = fetch_texts(self.mail, headers)
+        return {header['uid']: extract_links(texts.get(header['uid'], '')) for header in headers}
+    
+    def mark_seen(self, uids):
+        """Flag messages as read so later runs don't reuse their links"""
+        with self._lock:
+            self.mail.uid('store', b','.join(uids), '+FLAGS', '(\\Seen)')
     
-    def _extract_links(self, text):
-        """Extract all URLs from text"""
-        # HTML links
-        soup = BeautifulSoup(text, 'html.parser')
-        links = [a.get('href') for a in soup.find_all('a', href=True)]
+    def verification_link_future(self, domain, max_wait=120, subject=None, link_rules=None):
+        """
+        Start waiting for a verification link in the background
+        
+        Args:
+            domain: Domain the email comes from
+            max_wait: Maximum time to wait in seconds
+            subject: Only consider emails whose subject contains this text
+            link_rules: Scoring rules for the site's links (see utils.link_extractor)
         
-        # Plain text URLs
-        url_pattern = r'https?://[^\s<>"{}|\\^`\[\]]+'
-        text_links = re.findall(url_pattern, text)
+        Returns:
+            concurrent.futures.Future resolving to the link (or None on timeout)
+        """
+        return self.watcher.register(domain, max_wait, subject, link_rules)
+    
+    def wait_for_verification_email(self, from_domain, max_wait=120, subject=None, link_rules=None):
+        """
+        Wait for and extract verification link from email
         
-        all_links = links + text_links
+        Args:
+            from_domain: Domain the email comes from (e.g., 'unolist.in')
+            max_wait: Maximum time to wait in seconds
+            subject: Only consider emails whose subject contains this text
+            link_rules: Scoring rules for the site's links (see utils.link_extractor)
         
-        # Clean and deduplicate
-        cleaned_links = []
-        for link in all_links:
-            # Remove trailing punctuation and whitespace
-            link = link.rstrip('.,;:!?)>]').strip()
-            if link and link not in cleaned_links:
-                cleaned_links.append(link)
+        Returns:
+            Verification link or None
+        """
+        print(f"⏳ Waiting for verification email from {from_domain}...")
+        future = self.verification_link_future(from_domain, max_wait, subject, link_rules)
+        try:
+            # The watcher resolves the future by max_wait; the margin covers a
+            # check that is still in flight at the deadline
+            link = future.result(timeout=max_wait + self.RESULT_MARGIN)
+        except FutureTimeout:
+            link = None
+        if link:
+            print("✓ Found verification link!")
+        return link
+    
+    def get_verification_link(self, domain, max_wait=120, check_interval=None):
+        """
+        Wait for a verification link from domain (see wait_for_verification_email)
         
-        return cleaned_links
\ No newline at end of file
+        check_interval is accepted for compatibility but no longer used: the
+        mailbox watcher IDLEs, or polls at its own interval.
+        """
+        if check_interval is not None:
+            warnings.warn("get_verification_link(check_interval=...) is deprecated and ignored",
+                          DeprecationWarning, stacklevel=2)
+        return self.wait_for_verification_email(domain, max_wait)
@@ -0,0 +1,265 @@
+import re
+import time
+
+
+# Collects every form control, button and link on the page in one evaluate.
+# Each element gets a data-bl-handle attribute so a snapshot entry can be
+# turned back into a locator without searching again.
+SNAPSHOT_JS = """
+() => {
+    window.__blHandleSeq = window.__blHandleSeq || 0;
+    const visible = (el) => {
+        const style = window.getComputedStyle(el);
+        const rect = el.getBoundingClientRect();
+        return style.visibility !== 'hidden' && style.display !== 'none'
+            && rect.width > 0 && rect.height > 0;
+    };
+    const clean = (text) => (text || '').replace(/\\s+/g, ' ').trim().slice(0, 200);
+    const labelText = (el) => {
+        const parts = [];
+        if (el.labels) for (const label of el.labels) parts.push(label.textContent);
+        const labelledBy = el.getAttribute('aria-labelledby');
+        if (labelledBy) {
+            for (const id of labelledBy.split(/\\s+/)) {
+                const ref = document.getElementById(id);
+                if (ref) parts.push(ref.textContent);
+            }
+        }
+        if (el.getAttribute('aria-label')) parts.push(el.getAttribute('aria-label'));
+        return clean(parts.join(' '));
+    };
+    const buttonTypes = ['submit', 'button', 'reset', 'image'];
+    const roleOf = (el) => {
+        const explicit = el.getAttribute('role');
+        if (explicit) return explicit;
+        const tag = el.tagName.toLowerCase();
+        const type = (el.getAttribute('type') || '').toLowerCase();
+        if (tag === 'button' || (tag === 'input' && buttonTypes.includes(type))) return 'button';
+        if (tag === 'a' && el.hasAttribute('href')) return 'link';
+        if (tag === 'select') return 'combobox';
+        if (tag === 'textarea') return 'textbox';
+        if (tag === 'input') {
+            if (type === 'checkbox' || type === 'radio') return type;
+            return 'textbox';
+        }
+        return '';
+    };
+    const roleName = (el, role, label) => {
+        if (label) return label;
+        const tag = el.tagName.toLowerCase();
+        const type = (el.getAttribute('type') || '').toLowerCase();
+        if (tag === 'input' && type === 'image') return clean(el.alt || el.value || el.title);
+        if (tag === 'input' && buttonTypes.includes(type)) {
+            return clean(el.value || (type === 'submit' ? 'Submit' : type === 'reset' ? 'Reset' : ''));
+        }
+        if (role === 'button' || role === 'link') return clean(el.textContent || el.title);
+        return clean(el.title);
+    };
+
+    const elements = [];
+    const query = 'input, select, textarea, button, a[href], [role="button"], [role="link"]';
+    for (const el of document.querySelectorAll(query)) {
+        if (!el.dataset.blHandle) el.dataset.blHandle = String(++window.__blHandleSeq);
+        const attrs = {};
+        for (const attr of el.attributes) attrs[attr.name] = attr.value;
+        const role = roleOf(el);
+        const label = labelText(el);
+        const tag = el.tagName.toLowerCase();
+        elements.push({
+            handle: el.dataset.blHandle,
+            tag: tag,
+            attrs: attrs,
+            name: el.getAttribute('name') || '',
+            id: el.id || '',
+            type: (el.getAttribute('type') || '').toLowerCase(),
+            placeholder: el.getAttribute('placeholder') || '',
+            label: label,
+            role: role,
+            role_name: roleName(el, role, label),
+            text: tag === 'input' || tag === 'select' || tag === 'textarea'
+                ? '' : clean(el.textContent),
+            visible: visible(el),
+            disabled: !!el.disabled,
+        });
+    }
+    return elements;
+}
+"""
+
+# Tags a snapshot covers completely, so a CSS miss on them is conclusive
+SNAPSHOT_TAGS = ('input', 'select', 'textarea', 'button')
+
+FILLABLE_TAGS = ('input', 'textarea')
+
+# Inputs that can't take typed text
+NON_TEXT_TYPES = ('submit', 'button', 'reset', 'image', 'checkbox', 'radio', 'file', 'hidden')
+
+# Returned when the snapshot can't answer and the caller must ask the page
+UNKNOWN = object()
+
+_SIMPLE_PART = re.compile(
+    r'#(?P<id>[\w-]+)'
+    r'|\.(?P<cls>[\w-]+)'
+    r'|\[\s*(?P<attr>[\w-]+)\s*(?:(?P<op>[*^$~]?=)\s*'
+    r'(?:"(?P<dq>[^"]*)"|\'(?P<sq>[^\']*)\'|(?P<bare>[\w-]+))\s*)?\]'
+)
+_TAG = re.compile(r'^[a-zA-Z][\w-]*')
+
+
+def parse_simple_selector(selector):
+    """
+    Parse a single compound CSS selector (tag, #id, .class, [attr op value])
+
+    Returns:
+        (tag or None, [(kind, name, op, value), ...]), or None for anything
+        with combinators, pseudo-classes or Playwright-specific syntax
+    """
+    selector = selector.strip()
+    tag_match = _TAG.match(selector)
+    tag = tag_match.group(0).lower() if tag_match else None
+    pos = tag_match.end() if tag_match else 0
+
+    parts = []
+    while pos < len(selector):
+        match = _SIMPLE_PART.match(selector, pos)
+        if not match:
+            return None
+        if match.group('id'):
+            parts.append(('attr', 'id', '=', match.group('id')))
+        elif match.group('cls'):
+            parts.append(('attr', 'class', '~=', match.group('cls')))
+        else:
+            value = next(
+                (v for v in (match.group('dq'), match.group('sq'), match.group('bare')) if v is not None),
+                None
+            )
+            parts.append(('attr', match.group('attr').lower(), match.group('op'), value))
+        pos = match.end()
+
+    if tag is None and not parts:
+        return None
+    return tag, parts
+
+
+def _attr_matches(actual, op, expected):
+    if actual is None:
+        return False
+    if op is None:
+        return True
+    if op == '=':
+        return actual == expected
+    if op == '*=':
+        return bool(expected) and expected in actual
+    if op == '^=':
+        return bool(expected) and actual.startswith(expected)
+    if op == '$=':
+        return bool(expected) and actual.endswith(expected)
+    if op == '~=':
+        return expected in actual.split()
+    return False
+
+
+class FormSnapshot:
+    """
+    Form controls of one page state, matched against selector candidates in
+    Python instead of one count() round-trip per candidate and strategy.
+    """
+
+    def __init__(self, elements):
+        self.elements = elements
+        self.taken_at = time.monotonic()
+
+    @staticmethod
+    def _pick(matches):
+        # Same element Playwright's .first would give, but prefer a visible one
+        if not matches:
+            return None
+        return next((el for el in matches if el['visible']), matches[0])
+
+    def match_css(self, selector):
+        """Elements matching a simple CSS selector, or UNKNOWN if it can't be decided here"""
+        parsed = parse_simple_selector(selector)
+        if parsed is None:
+            return UNKNOWN
+        tag, parts = parsed
+        # Only controls are snapshotted; other tags may exist unseen
+        if tag not in SNAPSHOT_TAGS:
+            return UNKNOWN
+
+        matches = []
+        for el in self.elements:
+            if el['tag'] != tag:
+                continue
+            if all(_attr_matches(el['attrs'].get(name), op, value) for _, name, op, value in parts):
+                matches.append(el)
+        return matches
+
+    def _fillable(self, matches):
+        return [
+            el for el in matches
+            if el['tag'] in FILLABLE_TAGS and el['type'] not in NON_TEXT_TYPES and not el['disabled']
+        ]
+
+    def find_input(self, selector, strategy):
+        """
+        Text field for selector under a fill_input strategy
+
+        Returns:
+            snapshot element, None if the page has no such field, or UNKNOWN
+        """
+        wanted = selector.lower()
+        if strategy == 'css':
+            parsed = parse_simple_selector(selector)
+            if parsed is None:
+                return UNKNOWN
+            # Fields are always inputs/textareas, so a tagless #id or
+            # [name=...] can be decided from the snapshot too
+            tag, parts = parsed
+            candidates = self.elements if tag is None else [el for el in self.elements if el['tag'] == tag]
+            matches = [
+                el for el in candidates
+                if all(_attr_matches(el['attrs'].get(name), op, value) for _, name, op, value in parts)
+            ]
+        elif strategy == 'name':
+            if selector.startswith('['):
+                return None
+            matches = [el for el in self.elements if el['name'] == selector]
+        elif strategy == 'id':
+            if selector.startswith('#'):
+                return None
+            matches = [el for el in self.elements if el['id'] == selector]
+        elif strategy == 'placeholder':
+            matches = [el for el in self.elements if wanted in el['placeholder'].lower()]
+        else:
+            matches = [el for el in self.elements if wanted in el['label'].lower()]
+        return self._pick(self._fillable(matches))
+
+    def find_button(self, selector, strategy):
+        """
+        Clickable element for selector under a click_button strategy
+
+        Returns:
+            snapshot element, None if the page has no such element, or UNKNOWN
+        """
+        wanted = selector.lower()
+        if strategy == 'role':
+            matches = [
+                el for el in self.elements
+                if el['role'] == 'button' and wanted in el['role_name'].lower()
+            ]
+            return self._pick(matches)
+        if strategy == 'text':
+            matches = [el for el in self.elements if el['text'] and wanted in el['text'].lower()]
+            # Text can live in any element, not just the snapshotted ones
+            return self._pick(matches) or UNKNOWN
+        matches = self.match_css(selector)
+        if matches is UNKNOWN:
+            return UNKNOWN
+        return self._pick(matches)
+
+    def find(self, selector):
+        """First element for a plain CSS selector (dropdowns, checkboxes)"""
+        matches = self.match_css(selector)
+        if matches is UNKNOWN:
+            return UNKNOWN
+        return self._pick(matches)
@@ -0,0 +1,158 @@
+import json
+import os
+import threading
+from concurrent.futures import Future
+
+
+class HarArchive:
+    """
+    Directory of per-domain HAR files for record/replay runs.
+
+    Every site context gets its own HAR: <domain>.har, then <domain>.2.har,
+    <domain>.3.har ... for later contexts on the same domain in the same run
+    (e.g. resuming a site parked for email verification). A replay run that
+    takes the same steps opens the same files in the same order.
+
+    The user data each site registered with is kept next to the HARs, since
+    replay matches POST bodies exactly and fresh random data would miss.
+    So is each site's verification link: the email is not in any HAR, and
+    the recorded link is what the replayed site expects to be opened.
+    """
+
+    MODES = ('record', 'replay')
+
+    def __init__(self, directory, mode):
+        if mode not in self.MODES:
+            raise ValueError(f"HAR mode must be one of {self.MODES}, got {mode!r}")
+        self.directory = directory
+        self.mode = mode
+        self._segments = {}
+        self._lock = threading.Lock()
+        self.identities_path = os.path.join(directory, 'identities.json')
+        self.links_path = os.path.join(directory, 'verification_links.json')
+
+        if mode == 'record':
+            os.makedirs(directory, exist_ok=True)
+        elif not os.path.isdir(directory):
+            raise FileNotFoundError(f"No HAR recordings in {directory}")
+
+    @property
+    def recording(self):
+        return self.mode == 'record'
+
+    def next_har_path(self, domain):
+        """Path for the next site context on domain"""
+        with self._lock:
+            n = self._segments.get(domain, 0) + 1
+            self._segments[domain] = n
+        name = f"{domain}.har" if n == 1 else f"{domain}.{n}.har"
+        return os.path.join(self.directory, name)
+
+    def _load(self, path):
+        if not os.path.exists(path):
+            return {}
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _store(self, path, domain, value):
+        """Set domain's entry in a JSON file (lock held)"""
+        data = self._load(path)
+        data[domain] = value
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def user_data(self, domain, generated):
+        """
+        User data to run domain with
+
+        Args:
+            domain: Site domain
+            generated: Freshly generated user data
+
+        Returns:
+            The recorded identity when replaying (if any), otherwise generated,
+            which is stored for later replays when recording
+        """
+        with self._lock:
+            if not self.recording:
+                return self._load(self.identities_path).get(domain, generated)
+            self._store(self.identities_path, domain, generated)
+            return generated
+
+    def verification_link(self, domain):
+        """Link recorded for domain, or None"""
+        with self._lock:
+            return self._load(self.links_path).get(domain)
+
+    def save_verification_link(self, domain, link):
+        """Keep domain's verification link for later replays"""
+        if link:
+            with self._lock:
+                self._store(self.links_path, domain, link)
+
+    def email_handler(self, handler):
+        """handler wrapped so verification links are recorded or replayed"""
+        return ArchivedEmailHandler(handler, self)
+
+
+class ArchivedEmailHandler:
+    """
+    EmailHandler stand-in for HAR runs.
+
+    Recording passes everything through to the real handler and stores the
+    link each site receives. Replay answers from those links straight away
+    and never touches IMAP, so a replay run does not wait on a live inbox
+    (the link it would find there is not in the HAR anyway).
+    """
+
+    def __init__(self, handler, har):
+        self.handler = handler
+        self.har = har
+
+    def __getattr__(self, name):
+        return getattr(self.handler, name)
+
+    def connect(self):
+        if self.har.recording:
+            return self.handler.connect()
+        return True
+
+    def disconnect(self):
+        if self.har.recording:
+            self.handler.disconnect()
+
+    def _replayed(self, domain):
+        link = self.har.verification_link(domain)
+        if link:
+            print(f"✓ Replaying recorded verification link for {domain}")
+        else:
+            print(f"✗ No verification link recorded for {domain}")
+        return link
+
+    def verification_link_future(self, domain, max_wait=120, subject=None, link_rules=None):
+        if not self.har.recording:
+            future = Future()
+            future.set_result(self._replayed(domain))
+            return future
+
+        future = self.handler.verification_link_future(domain, max_wait, subject, link_rules)
+        future.add_done_callback(lambda done: self.har.save_verification_link(domain, done.result()))
+        return future
+
+    def wait_for_verification_email(self, domain, max_wait=120, subject=None, link_rules=None):
+        if not self.har.recording:
+            return self._replayed(domain)
+
+        link = self.handler.wait_for_verification_email(domain, max_wait, subject=subject, link_rules=link_rules)
+        self.har.save_verification_link(domain, link)
+        return link
+
+    def get_verification_link(self, domain, max_wait=120, check_interval=None):
+        if not self.har.recording:
+            return self._replayed(domain)
+
+        link = self.handler.get_verification_link(domain, max_wait, check_interval)
+        self.har.save_verification_link(domain, link)
+        return link
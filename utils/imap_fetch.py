@@ -0,0 +1,258 @@
+"""
+Header-first IMAP fetching for verification mail.
+
+Rather than downloading whole messages (RFC822, attachments included),
+ENVELOPE and BODYSTRUCTURE are fetched for a batch of UIDs in one command;
+only the messages that pass the sender/subject filter then have a single
+text part fetched with BODY.PEEK[<section>], again one command per batch.
+"""
+import base64
+import quopri
+import re
+from email.header import decode_header, make_header
+
+_ATOM_END = b' ()'
+_LITERAL = re.compile(rb'\{(\d+)\}\r\n')
+
+
+class _Reader:
+    """Recursive-descent reader for IMAP response data (RFC 3501 section 9)"""
+
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+
+    def skip_space(self):
+        while self.pos < len(self.data) and self.data[self.pos] in b' \r\n':
+            self.pos += 1
+
+    def at_end(self):
+        self.skip_space()
+        return self.pos >= len(self.data)
+
+    def value(self):
+        self.skip_space()
+        c = self.data[self.pos:self.pos + 1]
+        if c == b'(':
+            self.pos += 1
+            items = []
+            while True:
+                self.skip_space()
+                if self.data[self.pos:self.pos + 1] == b')':
+                    self.pos += 1
+                    return items
+                items.append(self.value())
+        if c == b'"':
+            return self._quoted()
+        if c == b'{':
+            match = _LITERAL.match(self.data, self.pos)
+            start = match.end()
+            self.pos = start + int(match.group(1))
+            return self.data[start:self.pos]
+        return self._atom()
+
+    def _quoted(self):
+        out = bytearray()
+        self.pos += 1
+        while True:
+            c = self.data[self.pos]
+            self.pos += 1
+            if c == 0x5C:  # backslash
+                out.append(self.data[self.pos])
+                self.pos += 1
+            elif c == 0x22:  # closing quote
+                return bytes(out)
+            else:
+                out.append(c)
+
+    def _atom(self):
+        start = self.pos
+        depth = 0
+        # Section specs such as BODY[1.2] may contain spaces and parentheses
+        while self.pos < len(self.data):
+            c = self.data[self.pos:self.pos + 1]
+            if c == b'[':
+                depth += 1
+            elif c == b']':
+                depth -= 1
+            elif depth == 0 and c in _ATOM_END:
+                break
+            self.pos += 1
+        atom = self.data[start:self.pos]
+        return None if atom.upper() == b'NIL' else atom
+
+
+def parse_fetch(data):
+    """
+    Parse the data imaplib returns for a (UID) FETCH command
+
+    imaplib splits every literal out into a (prefix, literal) tuple; the
+    pieces are put back together in wire format and read in one go.
+
+    Returns:
+        {uid (bytes): {item name (upper-case str): value}}; values are bytes,
+        None for NIL, or nested lists for parenthesised data
+    """
+    wire = bytearray()
+    for item in data:
+        if isinstance(item, tuple):
+            wire += item[0] + b'\r\n' + item[1]
+        elif item:
+            wire += item
+
+    reader = _Reader(bytes(wire))
+    messages = {}
+    while not reader.at_end():
+        reader.value()  # message sequence number
+        fields = reader.value()
+        items = {fields[i].decode().upper(): fields[i + 1] for i in range(0, len(fields) - 1, 2)}
+        # Unsolicited FETCH responses (flag updates) carry no UID
+        if 'UID' in items:
+            messages[items['UID']] = items
+    return messages
+
+
+def _text(value):
+    return value.decode('utf-8', errors='replace') if isinstance(value, bytes) else ''
+
+
+def envelope_sender(envelope):
+    """'name <mailbox@host>' of the first From address, lower-cased"""
+    addresses = envelope[2] or []
+    if not addresses:
+        return ''
+    name, _, mailbox, host = addresses[0]
+    address = f"{_text(mailbox)}@{_text(host)}"
+    name = decode_mime(name)
+    return (f"{name} <{address}>" if name else address).lower()
+
+
+def decode_mime(value):
+    """Decode an RFC 2047 header value (encoded words) to str"""
+    if not value:
+        return ''
+    try:
+        return str(make_header(decode_header(_text(value))))
+    except Exception:
+        return _text(value)
+
+
+def find_text_part(structure, prefix=''):
+    """
+    Section of the text part to fetch, preferring HTML (it carries the hrefs)
+
+    Args:
+        structure: Parsed BODYSTRUCTURE
+
+    Returns:
+        {'section', 'subtype', 'encoding', 'charset'} or None
+    """
+    parts = _text_parts(structure, prefix)
+    for subtype in ('html', 'plain'):
+        for part in parts:
+            if part['subtype'] == subtype:
+                return part
+    return None
+
+
+def _text_parts(structure, prefix):
+    if not isinstance(structure, list) or not structure:
+        return []
+
+    if isinstance(structure[0], list):
+        # Multipart: child bodies first, then the subtype and extension data
+        parts = []
+        for number, child in enumerate(structure, 1):
+            if not isinstance(child, list):
+                break
+            parts.extend(_text_parts(child, f"{prefix}{number}."))
+        return parts
+
+    body_type, subtype = _text(structure[0]).lower(), _text(structure[1]).lower()
+    if body_type != 'text' or subtype not in ('html', 'plain'):
+        return []
+    params = structure[2] or []
+    charset = 'utf-8'
+    for i in range(0, len(params) - 1, 2):
+        if _text(params[i]).lower() == 'charset':
+            charset = _text(params[i + 1])
+    # A single-part message is section 1
+    return [{
+        'section': prefix.rstrip('.') or '1',
+        'subtype': subtype,
+        'encoding': _text(structure[5]).lower(),
+        'charset': charset,
+    }]
+
+
+def decode_part(data, encoding, charset):
+    """Body part bytes (as sent) to str"""
+    if not data:
+        return ''
+    try:
+        if encoding == 'base64':
+            data = base64.b64decode(data)
+        elif encoding == 'quoted-printable':
+            data = quopri.decodestring(data)
+    except Exception:
+        pass
+    try:
+        return data.decode(charset, errors='replace')
+    except LookupError:
+        return data.decode('utf-8', errors='replace')
+
+
+def fetch_headers(mail, uids):
+    """
+    Envelope summary of each UID, fetched in one command
+
+    Returns:
+        [{'uid', 'sender', 'subject', 'part'}]; part is the text part to
+        fetch (see find_text_part) or None
+    """
+    if not uids:
+        return []
+    status, data = mail.uid('fetch', b','.join(uids), '(UID ENVELOPE BODYSTRUCTURE)')
+    if status != 'OK':
+        return []
+
+    headers = []
+    for uid, items in parse_fetch(data).items():
+        envelope = items.get('ENVELOPE') or []
+        if len(envelope) < 3:
+            continue
+        headers.append({
+            'uid': uid,
+            'sender': envelope_sender(envelope),
+            'subject': decode_mime(envelope[1]),
+            'part': find_text_part(items.get('BODYSTRUCTURE')),
+        })
+    return headers
+
+
+def fetch_texts(mail, headers):
+    """
+    Text of the chosen part of each message, one command per distinct section
+
+    Args:
+        headers: Entries from fetch_headers
+
+    Returns:
+        {uid: text}
+    """
+    by_section = {}
+    for header in headers:
+        if header['part']:
+            by_section.setdefault(header['part']['section'], []).append(header)
+
+    texts = {}
+    for section, group in by_section.items():
+        key = f"BODY[{section}]"
+        status, data = mail.uid('fetch', b','.join(h['uid'] for h in group), f"(UID BODY.PEEK[{section}])")
+        if status != 'OK':
+            continue
+        fetched = parse_fetch(data)
+        for header in group:
+            raw = fetched.get(header['uid'], {}).get(key)
+            texts[header['uid']] = decode_part(raw, header['part']['encoding'], header['part']['charset'])
+    return texts
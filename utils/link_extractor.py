@@ -0,0 +1,117 @@
+"""
+Verification link extraction from email bodies.
+
+One precompiled pattern finds every http(s) URL in a single pass over the
+text; no HTML tree is built, since href values are matched the same way
+as URLs in running text (the pattern stops at the closing quote).
+Duplicates are dropped with an insertion-ordered dict. Candidates are then
+scored with the site's rules from
+SITES_CONFIG[...]['email_verification']['link_rules']:
+
+    'keywords' - extra words marking the verification link
+    'pattern'  - regex the verification link matches (strongest signal)
+    'avoid'    - words that rule a link out (e.g. 'unsubscribe')
+"""
+import html
+import re
+
+# Starts with a literal, so the regex engine can skip ahead to each "http";
+# the last character can't be sentence punctuation, so nothing to strip after
+_URL_RE = re.compile(r'''https?://[^\s<>"'{}|\\^`\[\]]*[^\s<>"'{}|\\^`\[\].,;:!?)]''')
+_HOST_RE = re.compile(r'https?://(?:[^/?#@]*@)?([^/?#:]+)', re.IGNORECASE)
+
+DEFAULT_KEYWORDS = ('verify', 'confirm', 'activate', 'validation', 'token', 'validate')
+DEFAULT_AVOID = ('unsubscribe', 'optout', 'opt-out')
+
+
+def extract_links(text):
+    """
+    All http(s) links in an email body, in order of appearance, without duplicates
+
+    Args:
+        text: Plain-text or HTML body
+
+    Returns:
+        List of URLs (HTML entities such as &amp; decoded)
+    """
+    if not text:
+        return []
+    links = dict.fromkeys(_URL_RE.findall(text))
+    if '&' not in text:
+        return list(links)
+    # Unescape after dedup; "&amp;" and "&" spellings then collapse into one
+    return list(dict.fromkeys(_unescape(link) if '&' in link else link for link in links))
+
+
+def _unescape(link):
+    # &amp; is nearly always the only entity in a URL; skip html.unescape then
+    link = link.replace('&amp;', '&')
+    return html.unescape(link) if '&' in link and ';' in link else link
+
+
+def _words_re(words):
+    return re.compile('|'.join(re.escape(word.lower()) for word in words))
+
+
+def _compile_rules(rules):
+    """(avoid, keywords, pattern) regexes for a site's link_rules"""
+    rules = rules or {}
+    return (
+        _words_re(DEFAULT_AVOID + tuple(rules.get('avoid', ()))),
+        _words_re(DEFAULT_KEYWORDS + tuple(rules.get('keywords', ()))),
+        re.compile(rules['pattern']) if rules.get('pattern') else None,
+    )
+
+
+_DEFAULT_RULES = _compile_rules(None)
+
+
+def score_link(link, domain, rules=None, _compiled=None):
+    """
+    How likely link is domain's verification link
+
+    Returns:
+        Score (higher is better), or None if the link is not a candidate
+    """
+    lowered = link.lower()
+    if domain not in lowered:
+        return None
+    avoid, keywords, pattern = _compiled or (_compile_rules(rules) if rules else _DEFAULT_RULES)
+    if avoid.search(lowered):
+        return None
+
+    score = 0
+    if pattern and pattern.search(link):
+        score += 100
+    if keywords.search(lowered):
+        score += 10
+    # Links on the site itself beat tracking redirects that mention it
+    host = _HOST_RE.match(lowered)
+    if host and (host.group(1) == domain or host.group(1).endswith('.' + domain)):
+        score += 1
+    return score
+
+
+def choose_link(links, domain, rules=None):
+    """
+    Best-scoring verification link for domain (the earliest wins a tie)
+
+    Args:
+        links: Links from extract_links
+        domain: Site domain
+        rules: The site's email_verification['link_rules'], if any
+
+    Returns:
+        Link or None
+    """
+    compiled = _compile_rules(rules) if rules else _DEFAULT_RULES
+    top_score = (100 if compiled[2] else 0) + 10 + 1
+    best, best_score = None, None
+    for link in links:
+        score = score_link(link, domain, _compiled=compiled)
+        if score is not None and (best_score is None or score > best_score):
+            best, best_score = link, score
+            if score == top_score:
+                # Nothing later can beat it, and the earliest wins ties
+                break
+    return best
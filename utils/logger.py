@@ -4,6 +4,7 @@ from datetime import datetime
 import json
 import os
 import sys
+import threading
 
 class BacklinkLogger:
     """Custom logger for backlink automation"""
@@ -11,6 +12,8 @@ class BacklinkLogger:
     def __init__(self, log_file='backlink_automation.log'):
         self.log_file = log_file
         self.results = []
+        # Results can be logged from several worker threads at once
+        self._results_lock = threading.Lock()
         self._setup_logger()
     
     def _setup_logger(self):
@@ -101,7 +104,8 @@ class BacklinkLogger:
         else:
             self.logger.error(f"✗ {message}")
     
-    def log_site_result(self, site_name, domain, status, profile_url=None, error=None):
+    def log_site_result(self, site_name, domain, status, profile_url=None, error=None, metrics=None,
+                        artifacts=None):
         """Log result for a specific site"""
         result = {
             'timestamp': datetime.now().isoformat(),
@@ -109,9 +113,12 @@ class BacklinkLogger:
             'domain': domain,
             'status': status,  # 'success', 'failed', 'skipped'
             'profile_url': profile_url,
-            'error': error
+            'error': error,
+            'artifacts': artifacts,
+            'metrics': metrics or {}
         }
-        self.results.append(result)
+        with self._results_lock:
+            self.results.append(result)
         
         if status == 'success':
             self.success(f"{site_name}: Profile created - {profile_url}")
@@ -119,16 +126,40 @@ class BacklinkLogger:
             self.failure(f"{site_name}: {error}")
         else:
             self.warning(f"{site_name}: Skipped - {error}")
+        
+        return result
+    
+    def add_results(self, results):
+        """Merge results recorded elsewhere (e.g. by worker processes) into this report"""
+        with self._results_lock:
+            self.results.extend(results)
+    
+    @staticmethod
+    def _sum_metrics(results):
+        """Add up the numeric top-level per-site metrics across all results (peaks take the max)"""
+        totals = {}
+        for result in results:
+            for key, value in (result.get('metrics') or {}).items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    if key.startswith('peak_'):
+                        totals[key] = max(totals.get(key, 0), value)
+                    else:
+                        totals[key] = totals.get(key, 0) + value
+        return totals
     
     def generate_report(self, output_file='backlink_report.json'):
         """Generate JSON report of all results"""
+        with self._results_lock:
+            results = list(self.results)
+        
         report = {
             'generated_at': datetime.now().isoformat(),
-            'total_sites': len(self.results),
-            'successful': len([r for r in self.results if r['status'] == 'success']),
-            'failed': len([r for r in self.results if r['status'] == 'failed']),
-            'skipped': len([r for r in self.results if r['status'] == 'skipped']),
-            'results': self.results
+            'total_sites': len(results),
+            'successful': len([r for r in results if r['status'] == 'success']),
+            'failed': len([r for r in results if r['status'] == 'failed']),
+            'skipped': len([r for r in results if r['status'] == 'skipped']),
+            'metrics_totals': self._sum_metrics(results),
+            'results': results
         }
         
         with open(output_file, 'w', encoding='utf-8') as f:
@@ -148,6 +179,32 @@ class BacklinkLogger:
         print("="*60)
         print(f"Total Sites Processed: {len(self.results)}")
         
+        totals = self._sum_metrics(self.results)
+        lookups = totals.get('selector_cache_hits', 0) + totals.get('selector_cache_misses', 0)
+        if lookups:
+            print(
+                f"Selector cache: {totals.get('selector_cache_hits', 0)}/{lookups} hits, "
+                f"{totals.get('selector_cache_invalidated', 0)} invalidated, "
+                f"{totals.get('selector_probes', 0)} probes"
+            )
+        if totals.get('navigation_s'):
+            print(
+                f"Navigation: {totals['navigation_s']:.1f}s total, "
+                f"{totals.get('navigations_not_ready', 0)} page(s) never reached their readiness rule"
+            )
+        if totals.get('blocked_requests'):
+            print(
+                f"Blocked requests: {totals['blocked_requests']} "
+                f"(~{totals.get('est_bytes_saved', 0) / (1024 * 1024):.1f} MB saved, "
+                f"estimated from typical sizes per resource type)"
+            )
+        if totals.get('peak_rss_mb'):
+            print(
+                f"Peak browser memory: {totals['peak_rss_mb']:.0f} MB "
+                f"(renderers {totals.get('peak_renderer_rss_mb', 0):.0f} MB), "
+                f"{totals.get('context_recycled', 0)} context recycle(s)"
+            )
+        
         if sys.platform == 'win32':
             print(f"[OK] Successful: {len(successful)}")
             print(f"[FAIL] Failed: {len(failed)}")
@@ -0,0 +1,176 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from utils.link_extractor import choose_link
+
+
+class MailboxWatcher:
+    """
+    One background reader per mailbox that hands verification links to the
+    sites waiting for them.
+
+    imaplib connections are not safe to share, so instead of every waiting
+    site polling the inbox, a single thread owns the connection: it fetches
+    each new message once, keeps the sender and links, and resolves the
+    future of whichever waiter's domain the message came from. The thread
+    runs only while someone is waiting and blocks in IDLE in between.
+    """
+
+    def __init__(self, email_handler, idle_timeout=25, check_interval=10, keep_messages=200):
+        """
+        Args:
+            email_handler: Connected EmailHandler that owns the IMAP connection
+            idle_timeout: Longest single IDLE (or wait) before re-checking timeouts
+            check_interval: Poll interval for servers without IDLE
+            keep_messages: Fetched messages kept for waiters that register late
+        """
+        self.email_handler = email_handler
+        self.idle_timeout = idle_timeout
+        self.check_interval = check_interval
+        # {'uid', 'sender', 'subject', 'part', 'links'} of fetched, not yet
+        # delivered messages; links is None until the body part is fetched
+        self._inbox = deque(maxlen=keep_messages)
+        # [{'domain', 'subject', 'link_rules', 'deadline', 'future'}]
+        self._waiters = []
+        # UIDs handed out but not yet flagged \Seen on the server
+        self._delivered = []
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopped = False
+
+    def register(self, domain, max_wait=120, subject=None, link_rules=None):
+        """
+        Wait for a verification link from domain
+
+        Args:
+            domain: Sender domain (matched against the From header)
+            max_wait: Seconds before the future resolves to None
+            subject: Only consider emails whose subject contains this text
+            link_rules: Scoring rules for the site's links (see utils.link_extractor)
+
+        Returns:
+            concurrent.futures.Future resolving to the link (or None on timeout)
+        """
+        waiter = {
+            'domain': domain,
+            'subject': subject,
+            'link_rules': link_rules,
+            'deadline': time.time() + max_wait,
+            'future': Future(),
+        }
+        with self._lock:
+            # Mail that already arrived is delivered straight away
+            uid = self._deliver(waiter)
+            if uid:
+                self._delivered.append(uid)
+            else:
+                self._waiters.append(waiter)
+            # The thread also flags delivered mail as seen, then exits if idle
+            if self._thread is None:
+                self._stopped = False
+                self._thread = threading.Thread(target=self._run, name='mailbox-watcher', daemon=True)
+                self._thread.start()
+        return waiter['future']
+
+    def stop(self):
+        """Resolve every waiter with None and let the thread exit"""
+        with self._lock:
+            self._stopped = True
+            waiters, self._waiters = self._waiters, []
+        for waiter in waiters:
+            waiter['future'].set_result(None)
+
+    def _run(self):
+        while True:
+            failed = False
+            try:
+                self._check_inbox()
+            except Exception as e:
+                print(f"⚠ Error checking email: {str(e)}")
+                failed = True
+
+            # Deadlines are enforced even while the mailbox is unreachable
+            with self._lock:
+                self._expire()
+                if self._stopped or not self._waiters:
+                    self._thread = None
+                    return
+                next_deadline = min(waiter['deadline'] for waiter in self._waiters)
+
+            timeout = max(0.0, min(self.idle_timeout, next_deadline - time.time()))
+            if failed:
+                time.sleep(min(timeout, self.check_interval))
+                self.email_handler.connect()
+                continue
+            try:
+                if timeout:
+                    self.email_handler.wait_for_new_mail(timeout, self.check_interval)
+            except Exception as e:
+                print(f"⚠ Error waiting for email: {str(e)}")
+                self.email_handler.connect()
+
+    def _check_inbox(self):
+        """Fetch new messages once, hand out their links and flag them seen"""
+        if self._waiters:
+            headers = self.email_handler.fetch_new()
+            with self._lock:
+                self._inbox.extend(headers)
+                # Bodies only for mail that someone is waiting for
+                wanted = [
+                    message for message in self._inbox
+                    if message['links'] is None
+                    and any(self._matches(message, waiter) for waiter in self._waiters)
+                ]
+            if wanted:
+                links = self.email_handler.fetch_links(wanted)
+                with self._lock:
+                    for message in wanted:
+                        message['links'] = links.get(message['uid'], [])
+
+        with self._lock:
+            for waiter in list(self._waiters):
+                uid = self._deliver(waiter)
+                if uid:
+                    self._waiters.remove(waiter)
+                    self._delivered.append(uid)
+            delivered, self._delivered = self._delivered, []
+
+        if delivered:
+            self.email_handler.mark_seen(delivered)
+
+    def _expire(self):
+        """Resolve waiters past their deadline with None (lock held)"""
+        now = time.time()
+        for waiter in [w for w in self._waiters if w['deadline'] <= now]:
+            self._waiters.remove(waiter)
+            print(f"✗ Verification email from {waiter['domain']} not received in time")
+            waiter['future'].set_result(None)
+
+    @staticmethod
+    def _matches(message, waiter):
+        subject = waiter['subject']
+        return (
+            waiter['domain'] in message['sender']
+            and (not subject or subject.lower() in message['subject'].lower())
+        )
+
+    def _deliver(self, waiter):
+        """
+        Resolve the waiter's future with the newest unclaimed link for its
+        domain (lock held)
+
+        Returns:
+            UID of the message used, or None
+        """
+        for message in reversed(self._inbox):
+            if message['links'] is None or not self._matches(message, waiter):
+                continue
+            link = choose_link(message['links'], waiter['domain'], waiter['link_rules'])
+            if link:
+                # Each email verifies one site
+                self._inbox.remove(message)
+                waiter['future'].set_result(link)
+                return message['uid']
+        return None
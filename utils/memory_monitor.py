@@ -0,0 +1,184 @@
+import os
+import threading
+import time
+
+try:
+    import psutil
+except ImportError:  # optional: fall back to /proc on Linux
+    psutil = None
+
+# Browser PID -> time.monotonic() of the last memory recycle on that browser,
+# shared by every monitor in this process (pool workers attach separately)
+_recycled_at = {}
+_recycled_lock = threading.Lock()
+
+
+def _proc_children():
+    """{ppid: [pid, ...]} for every process, read from /proc"""
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'r') as f:
+                stat = f.read()
+            # Field 4 is the ppid; the command name (field 2) may contain spaces
+            ppid = int(stat.rsplit(')', 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    return children
+
+
+def process_tree(pid):
+    """pid and all of its descendants"""
+    if psutil:
+        try:
+            root = psutil.Process(pid)
+            return [pid] + [child.pid for child in root.children(recursive=True)]
+        except psutil.Error:
+            return []
+
+    if not os.path.isdir('/proc'):
+        return []
+    children = _proc_children()
+    tree, stack = [], [pid]
+    while stack:
+        current = stack.pop()
+        tree.append(current)
+        stack.extend(children.get(current, []))
+    return tree
+
+
+def rss_mb(pid):
+    """Resident memory of one process in MB, or 0 if it is gone"""
+    if psutil:
+        try:
+            return psutil.Process(pid).memory_info().rss / (1024 * 1024)
+        except psutil.Error:
+            return 0.0
+    try:
+        with open(f'/proc/{pid}/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError):
+        pass
+    return 0.0
+
+
+def _is_renderer(pid):
+    try:
+        if psutil:
+            cmdline = psutil.Process(pid).cmdline()
+        else:
+            with open(f'/proc/{pid}/cmdline', 'rb') as f:
+                cmdline = f.read().decode(errors='replace').split('\0')
+    except Exception:
+        return False
+    return '--type=renderer' in cmdline
+
+
+class MemoryMonitor:
+    """
+    RSS of a Chromium process tree (browser + renderers + helpers).
+
+    The browser PID comes from CDP (SystemInfo.getProcessInfo); after that
+    only the OS is queried, so a background thread can keep track of the
+    peak while the Playwright objects stay on their own thread. Needs a
+    local browser and psutil or /proc; otherwise samples are None.
+    """
+
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self.pid = None
+        self.peak = {'total_mb': 0.0, 'renderer_mb': 0.0}
+        self._lock = threading.Lock()
+        self._stop = None
+
+    def attach(self, browser):
+        """Find the browser process behind a Playwright Browser (Chromium only)"""
+        self.pid = None
+        try:
+            session = browser.new_browser_cdp_session()
+            try:
+                info = session.send('SystemInfo.getProcessInfo')
+            finally:
+                session.detach()
+            for process in info.get('processInfo', []):
+                if process.get('type') == 'browser':
+                    self.pid = int(process['id'])
+        except Exception as e:
+            print(f"[WARN] Memory monitoring unavailable: {str(e)}")
+        # A remote browser reports a PID that doesn't exist here
+        if self.pid and not process_tree(self.pid):
+            self.pid = None
+        return self.pid
+
+    def sample(self):
+        """
+        Current memory of the browser tree
+
+        Returns:
+            {'total_mb', 'renderer_mb'}, or None when not attached
+        """
+        if not self.pid:
+            return None
+        total = renderer = 0.0
+        for pid in process_tree(self.pid):
+            mb = rss_mb(pid)
+            total += mb
+            if _is_renderer(pid):
+                renderer += mb
+        current = {'total_mb': round(total, 1), 'renderer_mb': round(renderer, 1)}
+        with self._lock:
+            for key, value in current.items():
+                self.peak[key] = max(self.peak[key], value)
+        return current
+
+    def claim_recycle(self, max_rss_mb, cooldown=30.0):
+        """
+        Whether the caller should recycle its context for memory
+
+        The tree is measured as a whole, so every handler on a shared browser
+        (pool workers, the daemon) sees the same total. Only the first to find
+        it over max_rss_mb recycles; the others skip for cooldown seconds and
+        then judge what that recycle freed, instead of all recycling at once.
+
+        Returns:
+            Total MB that triggered the recycle, or None
+        """
+        current = self.sample()
+        if not current or current['total_mb'] <= max_rss_mb:
+            return None
+        now = time.monotonic()
+        with _recycled_lock:
+            last = _recycled_at.get(self.pid)
+            if last is not None and now - last < cooldown:
+                return None
+            _recycled_at[self.pid] = now
+        return current['total_mb']
+
+    def reset_peak(self):
+        with self._lock:
+            self.peak = {'total_mb': 0.0, 'renderer_mb': 0.0}
+
+    def start(self):
+        """Sample in the background every interval seconds until stop()"""
+        if self._stop or not self.pid:
+            return
+        self._stop = threading.Event()
+
+        def run(stop):
+            while not stop.wait(self.interval):
+                try:
+                    self.sample()
+                except Exception:
+                    pass
+
+        threading.Thread(target=run, args=(self._stop,), name='memory-monitor', daemon=True).start()
+
+    def stop(self):
+        if self._stop:
+            self._stop.set()
+            self._stop = None
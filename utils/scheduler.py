@@ -0,0 +1,118 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, holding at most `burst`"""
+    
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+    
+    def _refill(self, now):
+        elapsed = now - self.updated
+        if elapsed <= 0:
+            return
+        if self.rate > 0:
+            self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+        self.updated = now
+    
+    def delay(self, now=None):
+        """Seconds until a token is available (0 if one is available now)"""
+        if self.rate <= 0:
+            return 0.0  # unlimited
+        now = now if now is not None else time.monotonic()
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+    
+    def consume(self):
+        if self.rate > 0:
+            self.tokens -= 1
+
+
+class DomainScheduler:
+    """
+    Politeness scheduler for site runs.
+
+    Every domain gets its own token bucket, plus one global bucket shared by
+    all domains. Starting a site costs one token from both, so back-to-back
+    sites on the same domain are spaced out while sites on other domains can
+    start immediately. Thread-safe.
+    """
+    
+    def __init__(self, global_limit, domain_limit):
+        """
+        Args:
+            global_limit: {'rate': per-second, 'burst': n} across all domains (rate 0 = unlimited)
+            domain_limit: default {'rate': ..., 'burst': ...} for each domain
+        """
+        self.global_bucket = TokenBucket(global_limit.get('rate', 0), global_limit.get('burst', 1))
+        self.domain_limit = domain_limit
+        self.buckets = {}
+        self._lock = threading.Lock()
+    
+    def _bucket(self, domain, limit=None):
+        if domain not in self.buckets:
+            limit = limit or self.domain_limit
+            self.buckets[domain] = TokenBucket(limit.get('rate', 0), limit.get('burst', 1))
+        return self.buckets[domain]
+    
+    def try_acquire(self, domain, limit=None):
+        """
+        Take a token for domain if possible
+        
+        Args:
+            domain: Domain the next site runs on
+            limit: Per-site override for the domain bucket
+        
+        Returns:
+            0 if acquired, else seconds to wait before trying again
+        """
+        with self._lock:
+            now = time.monotonic()
+            bucket = self._bucket(domain, limit)
+            wait = max(self.global_bucket.delay(now), bucket.delay(now))
+            if wait == 0:
+                self.global_bucket.consume()
+                bucket.consume()
+            return wait
+    
+    def acquire(self, domain, limit=None, stop_event=None):
+        """Block until a token for domain is available; returns seconds waited"""
+        waited = 0.0
+        while True:
+            wait = self.try_acquire(domain, limit)
+            if wait == 0:
+                return waited
+            if stop_event is not None:
+                if stop_event.wait(wait):
+                    return waited
+            else:
+                time.sleep(wait)
+            waited += wait
+    
+    def claim(self, items, domain_of, limit_of=None):
+        """
+        Remove and return the first item whose domain may start now
+        
+        Args:
+            items: List of pending items (mutated; caller serialises access)
+            domain_of: Function mapping an item to its domain
+            limit_of: Optional function mapping an item to its per-site limit
+        
+        Returns:
+            (item, 0) when one was claimed, otherwise (None, seconds until the
+            earliest item becomes ready)
+        """
+        shortest = None
+        for i, item in enumerate(items):
+            limit = limit_of(item) if limit_of else None
+            wait = self.try_acquire(domain_of(item), limit)
+            if wait == 0:
+                return items.pop(i), 0
+            shortest = wait if shortest is None else min(shortest, wait)
+        return None, shortest or 0
@@ -0,0 +1,88 @@
+import json
+import os
+import threading
+from datetime import datetime
+
+
+class SelectorCache:
+    """
+    Winning selector and strategy per (domain, form, field), kept across runs.
+
+    fill_input / fill_form / click_button try the cached winner first and only
+    fall back to probing every candidate when it stops matching, at which
+    point the entry is dropped and the new winner recorded. Hit/miss counts
+    are kept per site by BrowserHandler, not here.
+    """
+
+    def __init__(self, path='selector_cache.json'):
+        self.path = path
+        self._lock = threading.Lock()
+        self.entries = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except Exception as e:
+                print(f"[WARN] Ignoring unreadable selector cache {path}: {str(e)}")
+
+    @staticmethod
+    def key(domain, form, field):
+        return f"{domain}|{form}|{field}"
+
+    def _save(self, dropped=None):
+        # Merge with what other processes wrote since we loaded, then
+        # write-then-rename so an interrupt never leaves a half-written file
+        entries = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    entries = json.load(f)
+            except Exception:
+                entries = {}
+        entries.update(self.entries)
+        if dropped:
+            entries.pop(dropped, None)
+        self.entries = entries
+
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entries, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def get(self, key):
+        """Cached {'selector', 'strategy'} for key, or None"""
+        with self._lock:
+            return self.entries.get(key)
+
+    def record(self, key, selector, strategy):
+        """Store the winner for key (persisted immediately if it changed)"""
+        with self._lock:
+            current = self.entries.get(key)
+            if current and current['selector'] == selector and current['strategy'] == strategy:
+                return
+            self.entries[key] = {
+                'selector': selector,
+                'strategy': strategy,
+                'updated_at': datetime.now().isoformat()
+            }
+            self._save()
+
+    def invalidate(self, key):
+        """Forget a winner that no longer matches"""
+        with self._lock:
+            if self.entries.pop(key, None) is None:
+                return False
+            self._save(dropped=key)
+            return True
+
+
+_CACHES = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def get_selector_cache(path='selector_cache.json'):
+    """One shared SelectorCache per file, so worker threads don't race on it"""
+    with _CACHES_LOCK:
+        if path not in _CACHES:
+            _CACHES[path] = SelectorCache(path)
+        return _CACHES[path]
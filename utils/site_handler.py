@@ -1,8 +1,9 @@
-import time
 import json
 import os
+import threading
 from datetime import datetime
 from utils.credentials import get_site_credentials
+from utils.tracer import tracer, traced
 from typing import Dict, List
 
 # Import default listing data
@@ -26,10 +27,14 @@ UNO_LOGIN_URL = "https://unolist.in/login/login.html"
 UNO_POST_URL = "https://unolist.in/postfreead/"
 UNO_MYCLASSIFIEDS_URL = "https://unolist.in/myaccount/myclassifieds.html"  
 
+# credentials.json is shared by every SiteHandler, including concurrent workers
+_CREDENTIALS_LOCK = threading.Lock()
+
 class SiteHandler:
     """Handles automation for a specific site"""
     
-    def __init__(self, config, browser, email_handler, user_data, website_url, logger):
+    def __init__(self, config, browser, email_handler, user_data, website_url, logger, checkpoint=None,
+                 session_path=None):
         self.config = config
         self.browser = browser
         self.email_handler = email_handler
@@ -37,6 +42,21 @@ class SiteHandler:
         self.website_url = website_url
         self.logger = logger
         self.credentials_file = 'credentials.json'
+        # Future for the verification link while the site is parked, and the
+        # browser state to pick the site up with (BrowserHandler.leave_site)
+        self.pending_verification = None
+        self._parked_state = None
+        # Saved login for this site (sessions/<domain>.json), or None to always log in
+        self.session_path = session_path
+        
+        # Optional SiteCheckpoint: completed steps are skipped on resume
+        self.checkpoint = checkpoint
+        if checkpoint is not None:
+            if checkpoint.user_data:
+                # Resume with the identity the account was registered under
+                self.user_data = checkpoint.user_data
+            else:
+                checkpoint.user_data = user_data
 
     # Add this improved method to your site_handler.py
 
@@ -58,22 +78,22 @@ class SiteHandler:
         self.logger.info("[unolist] Attempting registration")
         self.browser.goto(UNO_REG_URL)
         self.browser.page.wait_for_load_state("domcontentloaded")
-        time.sleep(2)  # Extra wait for page to be fully ready
+        self.browser.waits.settle(2)  # Extra wait for page to be fully ready
 
         # --- Fill registration fields ---
         self.logger.info("[unolist] Filling registration form...")
         self.browser.fill_input(["#email", 'input[name="email"]'], email)
-        time.sleep(0.5)
+        self.browser.waits.settle(0.5)
         self.browser.fill_input(["#pword", 'input[name="pword"]'], password)
-        time.sleep(0.5)
+        self.browser.waits.settle(0.5)
         self.browser.fill_input(["#cpword", 'input[name="cpword"]'], password)
-        time.sleep(0.5)
+        self.browser.waits.settle(0.5)
         self.browser.fill_input(["#fname", 'input[name="fname"]'], fname)
-        time.sleep(0.5)
+        self.browser.waits.settle(0.5)
         self.browser.fill_input(["#lname", 'input[name="lname"]'], lname)
-        time.sleep(0.5)
+        self.browser.waits.settle(0.5)
         self.browser.fill_input(["#phone", 'input[name="phone"]'], phone)
-        time.sleep(0.5)
+        self.browser.waits.settle(0.5)
 
         # Terms checkbox with multiple attempts
         self.logger.info("[unolist] Checking terms agreement...")
@@ -91,7 +111,7 @@ class SiteHandler:
                 except Exception as e:
                     self.logger.warning(f"[unolist] Could not tick 'agriment': {e}")
 
-        time.sleep(1)
+        self.browser.waits.settle(1)
 
         # --- ENHANCED IMAGE BUTTON CLICK ---
         self.logger.info("[unolist] Attempting to click register button...")
@@ -111,7 +131,7 @@ class SiteHandler:
                 
                 # Scroll into view
                 register_btn.scroll_into_view_if_needed(timeout=3000)
-                time.sleep(0.5)
+                self.browser.waits.settle(0.5)
                 
                 # Try normal click
                 try:
@@ -187,7 +207,7 @@ class SiteHandler:
             try:
                 self.logger.info("  [Method 5] Press Enter on phone field")
                 self.browser.page.locator('#phone').first.focus()
-                time.sleep(0.3)
+                self.browser.waits.settle(0.3)
                 self.browser.page.keyboard.press("Enter")
                 clicked = True
                 self.logger.info("  ✓ Pressed Enter")
@@ -206,7 +226,7 @@ class SiteHandler:
         
         # Wait for navigation/response
         self.logger.info("[unolist] Waiting for registration response...")
-        time.sleep(3)
+        self.browser.waits.for_url_change(url_before, timeout=3)
         
         # Try to wait for URL change or page update
         try:
@@ -214,7 +234,7 @@ class SiteHandler:
         except:
             pass
         
-        time.sleep(2)
+        self.browser.waits.settle(2)
         
         # Check if URL changed
         url_after = self.browser.page.url
@@ -222,7 +242,7 @@ class SiteHandler:
             self.logger.info(f"[unolist] Navigation detected: {url_before} → {url_after}")
         
         # Check response
-        html = (self.browser.get_page_content() or "").lower()
+        html = self.browser.get_page_content_lower()
         
         # Duplicate email heuristics → go login
         if any(m in html for m in ("already registered", "already exists", "email exists", "email already")):
@@ -238,7 +258,7 @@ class SiteHandler:
         self.logger.info("[unolist] Attempting post-registration login")
         if not self._unolist_login_with_creds():
             self.logger.warning("[unolist] Post-registration login failed, retrying...")
-            time.sleep(3)
+            self.browser.waits.pause(3)
             if not self._unolist_login_with_creds():
                 return "login_failed"
         
@@ -322,7 +342,7 @@ class SiteHandler:
 
 
         self.browser.wait_for_navigation(20000)
-        html = (self.browser.get_page_content() or "").lower()
+        html = self.browser.get_page_content_lower()
         if any(x in html for x in ("logout", "my account", "my classifieds", "post free ad")):
             self.logger.info("[unolist] Logged in")
             return True
@@ -416,7 +436,7 @@ class SiteHandler:
     
     def _freelistinguk_post_register_or_login(self) -> str:
         """Check registration status and handle accordingly"""
-        html = self.browser.get_page_content().lower()
+        html = self.browser.get_page_content_lower()
 
         duplicate_markers = (
             "already registered",
@@ -478,7 +498,7 @@ class SiteHandler:
         self.browser.wait_for_navigation(15000)
 
         # Verify login success
-        html = self.browser.get_page_content().lower()
+        html = self.browser.get_page_content_lower()
         logged_in = (
             "logout" in html or "my account" in html or
             "/account" in html or "account-profile" in html or 
@@ -502,7 +522,7 @@ class SiteHandler:
         # Navigate to listing form
         self.browser.goto(CREATE_LISTING_URL)
         self.browser.page.wait_for_load_state("domcontentloaded")
-        time.sleep(3)
+        self.browser.waits.settle(3)
 
         # ===== FILL TEXT FIELDS WITH PROPER EVENT TRIGGERING =====
         
@@ -514,17 +534,17 @@ class SiteHandler:
                 
                 if element.count() > 0:
                     element.scroll_into_view_if_needed()
-                    time.sleep(0.3)
+                    self.browser.waits.settle(0.3)
                     
                     # Clear field
                     element.click()
                     self.browser.page.keyboard.press("Control+A")
                     self.browser.page.keyboard.press("Backspace")
-                    time.sleep(0.2)
+                    self.browser.waits.settle(0.2)
                     
                     # Type value slowly
                     element.type(value, delay=50)
-                    time.sleep(0.3)
+                    self.browser.waits.settle(0.3)
                     
                     # Trigger events
                     element.dispatch_event('input')
@@ -558,7 +578,7 @@ class SiteHandler:
         # Optional location hint
         if listing.get("location_hint"):
             fill_with_events("#location-input", listing["location_hint"], "Location Hint")
-            time.sleep(2)
+            self.browser.waits.settle(2)
 
         # ===== CATEGORY SELECTION (CRITICAL) =====
         cats: List[str] = (listing.get("categories") or [])[:5]
@@ -568,32 +588,35 @@ class SiteHandler:
             for cat in cats:
                 try:
                     # Wait for autocomplete to be ready
-                    time.sleep(1)
+                    self.browser.waits.settle(1)
                     
                     # Focus and clear the input
                     cat_input = self.browser.page.locator("#myInput").first
                     if cat_input.count() > 0:
                         cat_input.scroll_into_view_if_needed()
                         cat_input.click()
-                        time.sleep(0.3)
+                        self.browser.waits.settle(0.3)
                         
                         # Clear existing value
                         self.browser.page.keyboard.press("Control+A")
                         self.browser.page.keyboard.press("Backspace")
-                        time.sleep(0.3)
+                        self.browser.waits.settle(0.3)
                         
                         # Type category name slowly
                         cat_input.type(cat, delay=100)
                         self.logger.info(f"  Typed: {cat}")
-                        time.sleep(2)  # Wait for autocomplete dropdown
+                        # Wait for autocomplete dropdown
+                        self.browser.waits.for_selector(
+                            ".ui-menu-item, .autocomplete-suggestion, [role='option']", timeout=2
+                        )
                         
                         # Try to select from dropdown
                         try:
                             # Method 1: Arrow down + Enter
                             self.browser.page.keyboard.press("ArrowDown")
-                            time.sleep(0.5)
+                            self.browser.waits.settle(0.5)
                             self.browser.page.keyboard.press("Enter")
-                            time.sleep(0.5)
+                            self.browser.waits.settle(0.5)
                             self.logger.info(f"  ✓ Selected: {cat}")
                         except:
                             # Method 2: Click first suggestion
@@ -607,7 +630,7 @@ class SiteHandler:
                             except Exception as e:
                                 self.logger.warning(f"  ⚠ Could not select: {cat} - {str(e)}")
                         
-                        time.sleep(1)
+                        self.browser.waits.settle(1)
                         
                 except Exception as e:
                     self.logger.error(f"  ✗ Error with category {cat}: {str(e)}")
@@ -635,11 +658,11 @@ class SiteHandler:
                     if desc_elem.count() > 0:
                         desc_elem.scroll_into_view_if_needed()
                         desc_elem.click()
-                        time.sleep(0.3)
+                        self.browser.waits.settle(0.3)
                         desc_elem.fill(description)
                         desc_elem.dispatch_event('input')
                         desc_elem.dispatch_event('change')
-                        time.sleep(0.5)
+                        self.browser.waits.settle(0.5)
                         
                         if desc_elem.input_value() == description:
                             self.logger.info(f"  ✓ Description filled ({len(description)} chars)")
@@ -656,21 +679,21 @@ class SiteHandler:
 
         # ===== TERMS CHECKBOX (CRITICAL) =====
         self.logger.info("[freelistinguk] Agreeing to terms")
-        time.sleep(1)
+        self.browser.waits.settle(1)
         
         try:
             terms_checkbox = self.browser.page.locator("input[name='agree_terms']").first
             
             if terms_checkbox.count() > 0:
                 terms_checkbox.scroll_into_view_if_needed()
-                time.sleep(0.5)
+                self.browser.waits.settle(0.5)
                 
                 # Check if already checked
                 if not terms_checkbox.is_checked():
                     # Try normal check first
                     try:
                         terms_checkbox.check()
-                        time.sleep(0.3)
+                        self.browser.waits.settle(0.3)
                     except:
                         # Fallback: click the label or surrounding div
                         try:
@@ -683,7 +706,7 @@ class SiteHandler:
                         except:
                             terms_checkbox.click(force=True)
                     
-                    time.sleep(0.5)
+                    self.browser.waits.settle(0.5)
                     
                     # Verify it's checked
                     if terms_checkbox.is_checked():
@@ -699,7 +722,7 @@ class SiteHandler:
             self.logger.error(f"  ✗ Terms error: {str(e)}")
 
         # ===== PRE-SUBMISSION DIAGNOSTICS =====
-        time.sleep(2)
+        self.browser.waits.settle(2)
         self.logger.info("[freelistinguk] Running pre-submit diagnostics...")
         
         try:
@@ -741,7 +764,7 @@ class SiteHandler:
 
         # ===== FORM SUBMISSION (IMPROVED) =====
         self.logger.info("[freelistinguk] Submitting form...")
-        time.sleep(1)
+        self.browser.waits.settle(1)
         
         url_before = self.browser.page.url
         submit_success = False
@@ -764,13 +787,13 @@ class SiteHandler:
             submit_btn = self.browser.page.locator("#submit").first
             if submit_btn.count() > 0:
                 submit_btn.scroll_into_view_if_needed()
-                time.sleep(0.5)
+                self.browser.waits.settle(0.5)
                 
                 # Click with navigation expectation
                 with self.browser.page.expect_navigation(timeout=30000, wait_until="load"):
                     submit_btn.click()
                 
-                time.sleep(3)
+                self.browser.waits.settle(3)
                 
                 if self.browser.page.url != url_before:
                     self.logger.info(f"  ✓ Navigated to: {self.browser.page.url}")
@@ -830,7 +853,7 @@ class SiteHandler:
                 """)
                 
                 self.logger.info(f"  Result: {result}")
-                time.sleep(5)
+                self.browser.waits.for_url_change(url_before, timeout=5)
                 
                 if self.browser.page.url != url_before:
                     self.logger.info(f"  ✓ Navigated to: {self.browser.page.url}")
@@ -842,17 +865,20 @@ class SiteHandler:
         # METHOD 3: Check for AJAX/in-page success
         if not submit_success:
             self.logger.info("  [Method 3] Checking for AJAX success")
-            time.sleep(3)
-            
-            page_text = self.browser.page.content().lower()
             success_indicators = ['thank you', 'success', 'submitted', 'pending review', 'listing created']
+            # The AJAX answer may still be in flight: wait for its text to show up
+            self.browser.waits.for_selector(
+                f"text=/{'|'.join(success_indicators)}/i", state='attached', timeout=3
+            )
+            
+            page_text = self.browser.get_page_content_lower()
             
             if any(indicator in page_text for indicator in success_indicators):
                 self.logger.info("  ✓ Found success indicator in page")
                 submit_success = True
 
         # ===== FINAL STATUS CHECK =====
-        time.sleep(2)
+        self.browser.waits.settle(2)
         
         try:
             self.browser.page.wait_for_load_state("load", timeout=15000)
@@ -878,12 +904,12 @@ class SiteHandler:
             self.logger.warning(f"  Status check error: {str(e)}")
 
         # ===== GET PUBLIC URL =====
-        time.sleep(3)
+        self.browser.waits.settle(3)
         self.logger.info("[freelistinguk] Navigating to My Listings")
         
         self.browser.goto(MY_LISTINGS_URL)
         self.browser.page.wait_for_load_state("domcontentloaded")
-        time.sleep(3)
+        self.browser.waits.settle(3)
 
         # Get the listing URL
         try:
@@ -902,7 +928,7 @@ class SiteHandler:
                     if link.count() > 0:
                         link.wait_for(state="visible", timeout=5000)
                         link.click()
-                        time.sleep(3)
+                        self.browser.waits.settle(3)
                         
                         public_url = self.browser.page.url
                         self.logger.info(f"[freelistinguk] ✓ Public URL: {public_url}")
@@ -951,11 +977,12 @@ class SiteHandler:
     def load_existing_credentials(self):
         """Load credentials for this site from credentials.json"""
         try:
-            if not os.path.exists(self.credentials_file):
-                return None
+            with _CREDENTIALS_LOCK:
+                if not os.path.exists(self.credentials_file):
+                    return None
 
-            with open(self.credentials_file, 'r', encoding='utf-8') as f:
-                all_creds = json.load(f)
+                with open(self.credentials_file, 'r', encoding='utf-8') as f:
+                    all_creds = json.load(f)
 
             # Normalize site name for matching
             want = self.config['name']
@@ -985,34 +1012,81 @@ class SiteHandler:
     def save_credentials(self, profile_url=None, overwrite=False):
         """Save credentials to credentials.json"""
         try:
-            all_creds = {}
-            if os.path.exists(self.credentials_file):
-                with open(self.credentials_file, 'r', encoding='utf-8') as f:
-                    all_creds = json.load(f)
-
             site_name = self.config['name']
-            exists = site_name in all_creds
-
-            if exists and not overwrite:
-                self.logger.info(f"Credentials already exist for {site_name}; not overwriting.")
-                return
-
-            all_creds[site_name] = {
-                'username': self.user_data.get('username', ''),
-                'email': self.user_data.get('email', ''),
-                'password': self.user_data.get('password', ''),
-                'profile_url': profile_url or self.user_data.get('profile_url', ''),
-                'created_at': datetime.now().isoformat()
-            }
+            
+            with _CREDENTIALS_LOCK:
+                all_creds = {}
+                if os.path.exists(self.credentials_file):
+                    with open(self.credentials_file, 'r', encoding='utf-8') as f:
+                        all_creds = json.load(f)
+
+                exists = site_name in all_creds
+
+                if exists and not overwrite:
+                    self.logger.info(f"Credentials already exist for {site_name}; not overwriting.")
+                    return
+
+                all_creds[site_name] = {
+                    'username': self.user_data.get('username', ''),
+                    'email': self.user_data.get('email', ''),
+                    'password': self.user_data.get('password', ''),
+                    'profile_url': profile_url or self.user_data.get('profile_url', ''),
+                    'created_at': datetime.now().isoformat()
+                }
 
-            with open(self.credentials_file, 'w', encoding='utf-8') as f:
-                json.dump(all_creds, f, indent=2)
+                with open(self.credentials_file, 'w', encoding='utf-8') as f:
+                    json.dump(all_creds, f, indent=2)
 
             self.logger.info(f"Credentials saved to {self.credentials_file}")
 
         except Exception as e:
             self.logger.error(f"Failed to save credentials: {str(e)}")
     
+    def _registration_value(self, field_name):
+        """Value to type into a registration form field"""
+        if field_name in ('email', 'confirm_email'):
+            return self.user_data['email']
+        if field_name in ('username', 'nickname'):
+            return self.user_data['username']
+        if field_name in ('password', 'confirm_password'):
+            return self.user_data['password']
+        if field_name == 'first_name':
+            return self.user_data['first_name']
+        if field_name == 'last_name':
+            return self.user_data['last_name']
+        if field_name == 'name':
+            return self.user_data['full_name']
+        if field_name == 'phone':
+            return DEFAULT_LISTING_DATA['phone']
+        return None
+    
+    def _login_credentials(self):
+        """Return (username, email, password), preferring saved credentials"""
+        existing_creds = self.load_existing_credentials()
+        
+        if existing_creds:
+            self.logger.info(f"Using saved credentials for {self.config['name']}")
+            return (
+                existing_creds.get('username', self.user_data.get('username')),
+                existing_creds.get('email', self.user_data.get('email')),
+                existing_creds.get('password', self.user_data.get('password')),
+            )
+        return (
+            self.user_data.get('username'),
+            self.user_data.get('email'),
+            self.user_data.get('password'),
+        )
+    
+    def _listing_value(self, field_name):
+        """Value to type into a generic listing form field"""
+        if field_name == 'title':
+            return DEFAULT_LISTING_DATA['title']
+        if field_name == 'description':
+            return DEFAULT_LISTING_DATA['description']
+        if field_name == 'website':
+            return self.website_url
+        return DEFAULT_LISTING_DATA.get(field_name)
+    
     def register(self):
         """Handle registration process"""
         self.logger.info(f"Step 1: Registration on {self.config['name']}")
@@ -1023,43 +1097,25 @@ class SiteHandler:
         if not self.browser.goto(reg_config['url']):
             raise Exception("Failed to load registration page")
         
-        time.sleep(2)
+        self.browser.waits.settle(2)
         
         # Check for CAPTCHA
         if self.config['special']['has_captcha']:
-            if self.browser.check_captcha():
-                self.logger.warning("CAPTCHA detected on registration page")
-                self.browser.handle_captcha_pause()
+            vendor = self.browser.detect_captcha()
+            if vendor:
+                self._solve_captcha(vendor, "registration page")
         
         # Fill registration form
         self.logger.info("Filling registration form...")
-        filled_count = 0
-        
+        form = {}
         for field_name, selectors in reg_config['fields'].items():
-            value = None
-            
-            if field_name == 'email':
-                value = self.user_data['email']
-            elif field_name == 'confirm_email':
-                value = self.user_data['email']
-            elif field_name == 'username':
-                value = self.user_data['username']
-            elif field_name == 'password':
-                value = self.user_data['password']
-            elif field_name == 'confirm_password':
-                value = self.user_data['password']
-            elif field_name == 'first_name':
-                value = self.user_data['first_name']
-            elif field_name == 'last_name':
-                value = self.user_data['last_name']
-            elif field_name == 'name':
-                value = self.user_data['full_name']
-            elif field_name == 'nickname':
-                value = self.user_data['username']
-            elif field_name == 'phone':
-                value = DEFAULT_LISTING_DATA['phone']
-            
-            if value and self.browser.fill_input(selectors, value):
+            value = self._registration_value(field_name)
+            if value:
+                form[field_name] = (selectors, value)
+        
+        filled_count = 0
+        for field_name, filled in self.browser.fill_form(form).items():
+            if filled:
                 self.logger.info(f"  [OK] Filled {field_name}")
                 filled_count += 1
         
@@ -1067,14 +1123,14 @@ class SiteHandler:
             self.logger.warning("No fields were filled! Check selectors")
         
         # Submit registration
+        self._captcha_gate("registration form")
         self.logger.info("Submitting registration...")
-        if not self.browser.click_button(reg_config['submit_button']):
-            raise Exception("Failed to click submit button")
-        
-        time.sleep(reg_config.get('wait_after_submit', 3))
+        with self.browser.waits.for_submit(timeout=reg_config.get('wait_after_submit', 3)):
+            if not self.browser.click_button(reg_config['submit_button']):
+                raise Exception("Failed to click submit button")
         
         # Check registration result
-        page_content = self.browser.get_page_content().lower()
+        page_content = self.browser.get_page_content_lower()
         
         error_keywords = ['already exists', 'already registered', 'already taken', 'already in use']
         if any(keyword in page_content for keyword in error_keywords):
@@ -1084,6 +1140,29 @@ class SiteHandler:
         self.logger.info("[OK] Registration form submitted")
         return 'success'
     
+    def _captcha_gate(self, where):
+        """Before submitting, pause for a CAPTCHA the in-page watcher reported"""
+        signal = self.browser.captcha_signal
+        if not signal:
+            return
+        
+        if self.config['special'].get('has_captcha'):
+            self._solve_captcha(signal['vendor'], where)
+        else:
+            self.logger.warning(
+                f"CAPTCHA ({signal['vendor']}) appeared on {where}, but "
+                f"{self.config['name']} is not marked has_captcha; submitting anyway"
+            )
+    
+    def _solve_captcha(self, vendor, where):
+        """Pause for a person to solve the CAPTCHA; fail the site if nobody can"""
+        if not self.browser.can_pause_for_captcha():
+            # Unattended (cron, worker processes): waiting would never end
+            raise Exception(f"CAPTCHA ({vendor}) on {where} needs manual solving; no interactive terminal")
+        self.logger.warning(f"CAPTCHA ({vendor}) detected on {where}")
+        self.browser.handle_captcha_pause()
+    
+    @traced('step.login', 'step', args=('force_login',))
     def login(self, force_login=False):
         """Handle login process"""
         login_config = self.config.get('login')
@@ -1093,23 +1172,13 @@ class SiteHandler:
             return True
         
         # Load existing credentials
-        existing_creds = self.load_existing_credentials()
-        
-        if existing_creds:
-            self.logger.info(f"Using saved credentials for {self.config['name']}")
-            username = existing_creds.get('username', self.user_data.get('username'))
-            email = existing_creds.get('email', self.user_data.get('email'))
-            password = existing_creds.get('password', self.user_data.get('password'))
-        else:
-            username = self.user_data.get('username')
-            email = self.user_data.get('email')
-            password = self.user_data.get('password')
+        username, email, password = self._login_credentials()
         
         if force_login:
             self.logger.info(f"Step 2: Navigating to login page...")
             if not self.browser.goto(login_config['url']):
                 raise Exception("Failed to load login page")
-            time.sleep(2)
+            self.browser.waits.settle(2)
         else:
             current_url = self.browser.get_current_url()
             if 'login' not in current_url.lower():
@@ -1121,10 +1190,11 @@ class SiteHandler:
             if login_config['url'] not in current_url:
                 if not self.browser.goto(login_config['url']):
                     raise Exception("Failed to load login page")
-                time.sleep(2)
+                self.browser.waits.settle(2)
         
         # Fill login form
         self.logger.info("Filling login form...")
+        form = {}
         for field_name, selectors in login_config['fields'].items():
             value = None
             
@@ -1136,15 +1206,69 @@ class SiteHandler:
             elif field_name == 'password':
                 value = password
             
-            if value and self.browser.fill_input(selectors, value):
+            if value:
+                form[field_name] = (selectors, value)
+        
+        for field_name, filled in self.browser.fill_form(form).items():
+            if filled:
                 self.logger.info(f"  [OK] Filled {field_name}")
         
         # Submit login
-        if not self.browser.click_button(login_config['submit_button']):
-            raise Exception("Failed to click login button")
-        
-        time.sleep(login_config.get('wait_after_login', 3))
+        self._captcha_gate("login form")
+        with self.browser.waits.for_submit(timeout=login_config.get('wait_after_login', 3)):
+            if not self.browser.click_button(login_config['submit_button']):
+                raise Exception("Failed to click login button")
         self.logger.info("Login completed")
+        self._save_session()
+        return True
+    
+    def _save_session(self):
+        """Persist the logged-in session so the next run can skip login"""
+        probe = (self.config.get('login') or {}).get('logged_in_probe')
+        if not self.session_path or not probe:
+            return
+        
+        if not self.browser.probe_logged_in(probe):
+            self.logger.warning("Login probe failed after login; session not saved")
+            return
+        
+        self.browser.save_storage_state(
+            self.session_path,
+            self.config['domain'],
+            extra={'user_data': self.user_data, 'saved_at': datetime.now().isoformat()}
+        )
+        self.logger.info(f"  [OK] Session saved to {self.session_path}")
+    
+    def _restore_session(self):
+        """
+        Load the saved session for this site and check it is still logged in
+        
+        Returns:
+            True if registration and login can be skipped
+        """
+        probe = (self.config.get('login') or {}).get('logged_in_probe')
+        if not self.session_path or not probe or not os.path.exists(self.session_path):
+            return False
+        
+        saved = self.browser.load_storage_state(self.session_path)
+        if not saved:
+            return False
+        
+        # A resumed run must stay on the account it already registered
+        saved_user = saved.get('user_data')
+        if self.checkpoint is not None and self.checkpoint.is_done('register'):
+            if not saved_user or saved_user.get('username') != self.user_data.get('username'):
+                return False
+        
+        if not self.browser.probe_logged_in(probe):
+            self.logger.info("Saved session has expired; logging in again")
+            return False
+        
+        if saved_user:
+            self.user_data = saved_user
+            if self.checkpoint is not None:
+                self.checkpoint.user_data = saved_user
+        self.logger.info(f"[OK] Reusing saved session for {self.config['name']}; skipping registration and login")
         return True
    
     def verify_email(self):
@@ -1167,15 +1291,23 @@ class SiteHandler:
         verification_link = self.email_handler.wait_for_verification_email(
             from_domain=self.config['domain'],
             max_wait=verify_config.get('wait_for_email', 120),
+            subject=verify_config.get('subject'),
+            link_rules=verify_config.get('link_rules'),
         )
 
+        return self._open_verification_link(verification_link)
+
+    def _open_verification_link(self, verification_link):
+        """Visit the link from the verification email"""
+        verify_config = self.config.get('email_verification', {})
+
         if not verification_link:
             raise Exception("Verification email not received")
 
         if not self.browser.goto(verification_link):
             raise Exception("Failed to open verification link")
 
-        time.sleep(verify_config.get('wait_after_verify', 3))
+        self.browser.waits.settle(verify_config.get('wait_after_verify', 3))
         self.logger.info("[OK] Email verified")
         return True
 
@@ -1198,7 +1330,7 @@ class SiteHandler:
                 if self.browser.click_link(link_text):
                     break
         
-        time.sleep(2)
+        self.browser.waits.settle(2)
         
         # Fill website field
         if 'website_field' in profile_config:
@@ -1225,7 +1357,7 @@ class SiteHandler:
             if self.browser.click_button(profile_config['save_button']):
                 self.logger.info("[OK] Profile saved")
         
-        time.sleep(2)
+        self.browser.waits.settle(2)
         
         # Get profile URL
         profile_url = self.browser.get_current_url()
@@ -1244,32 +1376,27 @@ class SiteHandler:
         if 'create_url' in listing_config and listing_config['create_url']:
             if not self.browser.goto(listing_config['create_url']):
                 raise Exception("Failed to load create listing page")
-            time.sleep(3)
+            self.browser.waits.settle(3)
         
         # Click through navigation if needed
         if 'navigation' in listing_config:
             for button_text in listing_config['navigation']:
                 if self.browser.click_button([button_text, button_text.lower()]):
                     self.logger.info(f"  [OK] Clicked: {button_text}")
-                    time.sleep(2)
+                    self.browser.waits.settle(2)
         
         # Fill listing form
         self.logger.info("Filling listing form...")
-        filled_count = 0
-        
+        form = {}
         for field_name, selectors in listing_config.get('fields', {}).items():
-            value = None
-            
-            if field_name == 'title':
-                value = DEFAULT_LISTING_DATA['title']
-            elif field_name == 'description':
-                value = DEFAULT_LISTING_DATA['description']
-            elif field_name == 'website':
-                value = self.website_url
-            elif field_name in DEFAULT_LISTING_DATA:
-                value = DEFAULT_LISTING_DATA[field_name]
-            
-            if value and self.browser.fill_input(selectors, value):
+            value = self._listing_value(field_name)
+            if value:
+                form[field_name] = (selectors, value)
+        
+        filled_count = 0
+        for field_name, filled in self.browser.fill_form(form).items():
+            if filled:
+                value = form[field_name][1]
                 self.logger.info(f"  [OK] Filled {field_name}: {value if field_name != 'description' else value[:50]+'...'}")
                 filled_count += 1
         
@@ -1289,11 +1416,13 @@ class SiteHandler:
                 self.logger.info("  [OK] Agreed to terms")
         
         # Submit listing
+        self._captcha_gate("listing form")
         self.logger.info("Submitting listing...")
         if 'submit_button' in listing_config:
-            if self.browser.click_button(listing_config['submit_button']):
+            with self.browser.waits.for_submit(timeout=listing_config.get('wait_after_submit', 5)):
+                submitted = self.browser.click_button(listing_config['submit_button'])
+            if submitted:
                 self.logger.info("[OK] Listing submitted")
-                time.sleep(listing_config.get('wait_after_submit', 5))
         
         # Get listing URL
         listing_url = self.get_public_listing_url()
@@ -1311,13 +1440,13 @@ class SiteHandler:
         # Navigate to "My Listings" page
         if 'my_listings_url' in url_config and url_config['my_listings_url']:
             if self.browser.goto(url_config['my_listings_url']):
-                time.sleep(2)
+                self.browser.waits.settle(2)
         
         # Click on the most recent listing
         if url_config.get('click_recent'):
             if 'preview_button' in url_config:
                 if self.browser.click_button(url_config['preview_button']):
-                    time.sleep(2)
+                    self.browser.waits.settle(2)
         
         # Get current URL
         public_url = self.browser.get_current_url()
@@ -1330,17 +1459,27 @@ class SiteHandler:
         
         return public_url
     
-    def create_profile_or_listing(self):
+    def _custom_flow(self):
+        """Name of the hand-written flow this site needs, or None for config-driven sites"""
         name = (self.config.get('name') or "").strip().lower()
-
         if name in ("unolist", "uno list"):
+            return 'unolist'
+        if name in ('freelisting uk',):
+            return 'freelistinguk'
+        return None
+    
+    def create_profile_or_listing(self):
+        """Create profile or listing with website backlink"""
+        custom_flow = self._custom_flow()
+        
+        if custom_flow == 'unolist':
             self.logger.info("[unolist] Starting register/login → post ad flow")
             status = self._unolist_register_or_login()
             return self._unolist_after_auth() if status in ("registered_new", "logged_in_existing") else ""
-        """Create profile or listing with website backlink"""
+        
         # Special handling for FreeListing UK - MUST use custom flow
         site_name = self.config.get('name', '')
-        if site_name in ['FreeListing UK', 'Freelisting UK', 'freelisting uk']:
+        if custom_flow == 'freelistinguk':
             self.logger.info("[freelistinguk] Executing custom listing creation flow")
             url = self._freelistinguk_after_auth()
             return url
@@ -1359,56 +1498,171 @@ class SiteHandler:
         self.logger.warning(f"No listing or profile configuration found for {site_name}")
         return None
     
-    def process(self):
-        """Main processing flow for a site"""
+    def _step(self, name, func, *args, **kwargs):
+        """Run a flow step once per run; on resume return its recorded result instead"""
+        if self.checkpoint is not None and self.checkpoint.is_done(name):
+            self.logger.info(f"[resume] Skipping completed step: {name}")
+            return self.checkpoint.get(name)
+        
+        with tracer.span(f"step.{name}", 'step', step=name):
+            value = func(*args, **kwargs)
+        
+        if self.checkpoint is not None:
+            self.checkpoint.mark(name, value)
+        return value
+    
+    def _authenticate(self, registration_result, resuming):
+        """Verification/login step"""
+        if registration_result == 'already_exists':
+            self.logger.info("Account exists, proceeding to login...")
+            self.login(force_login=True)
+        elif self.config.get('email_verification', {}).get('required'):
+            self._step('verify_email', self.verify_email)
+            self.login(force_login=resuming)
+        else:
+            self.login(force_login=resuming)
+    
+    def _should_park(self, registration_result):
+        """Whether to hand email verification to the background instead of blocking"""
+        return (
+            registration_result != 'already_exists'
+            and self.config.get('email_verification', {}).get('required')
+            and not (self.checkpoint is not None and self.checkpoint.is_done('verify_email'))
+            and hasattr(self.email_handler, 'verification_link_future')
+        )
+    
+    def process(self, defer_verification=False):
+        """Process the site, tracing every browser action under its name"""
+        with tracer.bind(site=self.config['domain']), tracer.span('site', 'site', phase='process') as span:
+            result = self._process(defer_verification)
+            span['status'] = result.get('status')
+            return result
+    
+    def _process(self, defer_verification=False):
+        """
+        Main processing flow for a site
+        
+        Args:
+            defer_verification: Instead of blocking on the verification email,
+                return status 'pending_verification' with self.pending_verification
+                set to a future for the link; call resume() once it is done.
+        """
         try:
             self.logger.info("="*60)
             self.logger.info(f"Processing: {self.config['name']} ({self.config['domain']})")
             self.logger.info("="*60)
             
-            # Step 1: Register
-            registration_result = self.register()
+            self.browser.configure_for_site(self.config)
             
-            # Step 2: Handle verification/login
-            if registration_result == 'already_exists':
-                self.logger.info("Account exists, proceeding to login...")
-                self.login(force_login=True)
-            elif self.config.get('email_verification', {}).get('required'):
-                self.verify_email()
-                self.login()
-            else:
-                self.login()
+            # A saved session that still works makes registration and login unnecessary
+            if self._restore_session():
+                return self._with_metrics(self._create_and_save())
             
-            # Step 3: Create profile/listing
-            profile_url = self.create_profile_or_listing()
+            # Login lives in the browser session, which does not survive a
+            # restart, so it is re-run on resume rather than checkpointed
+            resuming = self.checkpoint is not None and self.checkpoint.is_done('register')
             
-            # Step 4: Save credentials
-            self.save_credentials(profile_url)
+            # Step 1: Register
+            registration_result = self._step('register', self.register)
             
-            if profile_url:
-                self.logger.info(f"[OK] {self.config['name']}: Profile created!")
-                self.logger.info(f"Profile URL: {profile_url}")
-                return {
-                    'status': 'success',
-                    'profile_url': profile_url,
-                    'error': None
-                }
-            else:
+            # Park until the verification email arrives; the browser is free meanwhile
+            if defer_verification and self._should_park(registration_result):
+                verify_config = self.config['email_verification']
+                self.pending_verification = self.email_handler.verification_link_future(
+                    self.config['domain'],
+                    max_wait=verify_config.get('wait_for_email', 120),
+                    subject=verify_config.get('subject'),
+                    link_rules=verify_config.get('link_rules'),
+                )
+                self.logger.info(f"{self.config['name']}: waiting for verification email in the background")
+                self._parked_state = self.browser.leave_site()
                 return {
-                    'status': 'partial',
+                    'status': 'pending_verification',
                     'profile_url': None,
-                    'error': 'Could not retrieve profile URL'
+                    'error': None
                 }
             
+            # Step 2: Handle verification/login (not needed once the listing exists)
+            if not (self.checkpoint is not None and self.checkpoint.is_done('create_listing')):
+                self._authenticate(registration_result, resuming)
+            
+            return self._with_metrics(self._create_and_save())
+            
         except Exception as e:
-            error_msg = str(e)
-            self.logger.error(f"[ERROR] {self.config['name']}: {error_msg}")
+            return self._with_metrics(self._failure_result(e))
+    
+    def resume(self):
+        """Continue a site parked by process(defer_verification=True) once its link arrived"""
+        with tracer.bind(site=self.config['domain']), tracer.span('site', 'site', phase='resume') as span:
+            result = self._resume()
+            span['status'] = result.get('status')
+            return result
+    
+    def _resume(self):
+        try:
+            self.logger.info(f"Resuming {self.config['name']} after email verification")
+            self.browser.reenter_site(self._parked_state)
+            
+            verification_link = self.pending_verification.result()
+            self._step('verify_email', self._open_verification_link, verification_link)
+            self.login()
             
+            return self._with_metrics(self._create_and_save())
+            
+        except Exception as e:
+            return self._with_metrics(self._failure_result(e))
+    
+    def _with_metrics(self, result):
+        """Attach the browser's per-site counters to a result"""
+        result['metrics'] = self.browser.site_metrics()
+        return result
+    
+    def _create_and_save(self):
+        """Steps 3-4: create profile/listing, save credentials, build the result"""
+        # Step 3: Create profile/listing
+        profile_url = self._step('create_listing', self.create_profile_or_listing)
+        
+        # Step 4: Save credentials
+        self._step('save_credentials', self.save_credentials, profile_url)
+        
+        result = self._build_result(profile_url)
+        if self.checkpoint is not None:
+            self.checkpoint.finish(result)
+        return result
+    
+    def _build_result(self, profile_url):
+        """Result dict for a completed flow"""
+        if profile_url:
+            self.logger.info(f"[OK] {self.config['name']}: Profile created!")
+            self.logger.info(f"Profile URL: {profile_url}")
             return {
-                'status': 'failed',
-                'profile_url': None,
-                'error': error_msg
+                'status': 'success',
+                'profile_url': profile_url,
+                'error': None
             }
+        return {
+            'status': 'partial',
+            'profile_url': None,
+            'error': 'Could not retrieve profile URL'
+        }
+    
+    def _failure_result(self, exc):
+        """Result dict for a flow that raised"""
+        error_msg = str(exc)
+        self.logger.error(f"[ERROR] {self.config['name']}: {error_msg}")
+        
+        result = {
+            'status': 'failed',
+            'profile_url': None,
+            'error': error_msg
+        }
+        try:
+            result['artifacts'] = self.browser.capture_failure(self.config['domain'], error_msg)
+            self.logger.info(f"Failure artifacts: {result['artifacts']}")
+        except Exception as e:
+            self.logger.warning(f"Could not capture failure artifacts: {str(e)}")
+        return result
+
     def _click_image_button(self, alt_keywords: list[str]) -> bool:
         """Click an <input type='image'> whose alt/src contains any keyword."""
         page = self.browser.page
@@ -0,0 +1,197 @@
+import contextvars
+import functools
+import glob
+import inspect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+class Tracer:
+    """
+    Timed spans written as Chrome trace-event JSON (Perfetto / chrome://tracing).
+
+    Disabled by default, in which case span() costs one attribute check.
+    Attributes bound with bind() (e.g. the site being processed) are added to
+    every span recorded in the same thread (or asyncio task / greenlet, see
+    utils.async_bridge), so browser actions are attributed to the site and
+    step that caused them.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.path = None
+        self.events = []
+        self._lock = threading.Lock()
+        self._attrs = contextvars.ContextVar('tracer_attrs', default={})
+        self._named_threads = set()
+        # Map the monotonic clock onto wall time so traces from several
+        # processes line up when merged
+        self._wall_us = time.time_ns() // 1000
+        self._mono = time.monotonic()
+
+    def enable(self, path):
+        """Start collecting spans, to be written to path by save()"""
+        self.enabled = True
+        self.path = path
+        self._emit_meta('process_name', os.getpid(), 0, {'name': f"backlink-automator ({os.getpid()})"})
+
+    def _ts(self, monotonic):
+        return self._wall_us + int((monotonic - self._mono) * 1_000_000)
+
+    def _emit_meta(self, name, pid, tid, args):
+        with self._lock:
+            self.events.append({'name': name, 'ph': 'M', 'pid': pid, 'tid': tid, 'args': args})
+
+    def _thread(self):
+        tid = threading.get_native_id()
+        if tid not in self._named_threads:
+            self._named_threads.add(tid)
+            self._emit_meta('thread_name', os.getpid(), tid, {'name': threading.current_thread().name})
+        return tid
+
+    @contextmanager
+    def bind(self, **attrs):
+        """Add attrs to every span this thread (or task) records inside the block"""
+        if not self.enabled:
+            yield
+            return
+        token = self._attrs.set(dict(self._attrs.get(), **attrs))
+        try:
+            yield
+        finally:
+            self._attrs.reset(token)
+
+    def record(self, name, started, cat='action', **args):
+        """
+        Record a span that began at time.monotonic() == started and ends now
+
+        Args:
+            name: Span name
+            started: time.monotonic() at the start of the span
+            cat: Trace category (action, wait, step, site)
+            **args: Attributes shown for the span
+        """
+        if not self.enabled:
+            return
+        ended = time.monotonic()
+        event = {
+            'name': name,
+            'cat': cat,
+            'ph': 'X',
+            'ts': self._ts(started),
+            'dur': max(0, int((ended - started) * 1_000_000)),
+            'pid': os.getpid(),
+            'tid': self._thread(),
+            'args': dict(self._attrs.get(), **{k: v for k, v in args.items() if v is not None}),
+        }
+        with self._lock:
+            self.events.append(event)
+
+    @contextmanager
+    def span(self, name, cat='action', **args):
+        """Time the enclosed block; an exception is recorded on the span and re-raised"""
+        if not self.enabled:
+            yield args
+            return
+        started = time.monotonic()
+        try:
+            yield args
+        except Exception as e:
+            args['error'] = str(e)
+            raise
+        finally:
+            self.record(name, started, cat, **args)
+
+    def save(self, path=None):
+        """Write the collected events as a trace file"""
+        path = path or self.path
+        if not self.enabled or not path:
+            return None
+        with self._lock:
+            events = list(self.events)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+        os.replace(tmp_path, path)
+        return path
+
+
+def part_path(path, worker_id):
+    """Trace file for one worker process, merged into path by merge_traces"""
+    return f"{path}.{worker_id}.part"
+
+
+def merge_traces(path):
+    """
+    Fold the worker parts of path (and path itself, if present) into one trace
+
+    Returns:
+        Number of events in the merged trace
+    """
+    events = []
+    sources = sorted(glob.glob(glob.escape(path) + '.*.part'))
+    if os.path.exists(path):
+        sources.insert(0, path)
+    for source in sources:
+        try:
+            with open(source, 'r', encoding='utf-8') as f:
+                events.extend(json.load(f).get('traceEvents', []))
+        except Exception as e:
+            print(f"[WARN] Skipping unreadable trace {source}: {str(e)}")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+    for source in sources:
+        if source != path:
+            os.remove(source)
+    return len(events)
+
+
+# Process-wide tracer; enabled with --trace FILE
+tracer = Tracer()
+
+
+def _attr(value):
+    # Keep span attributes small and JSON-friendly
+    if isinstance(value, dict):
+        return list(value.keys())
+    if isinstance(value, (list, tuple)):
+        return [str(v) for v in value]
+    return value if isinstance(value, (bool, int, float, str, type(None))) else str(value)
+
+
+def traced(name=None, cat='action', args=()):
+    """
+    Record each call of the decorated function as a span
+
+    Args:
+        name: Span name (defaults to the function name)
+        cat: Trace category
+        args: Parameter names whose values are attached to the span (never
+            pass ones holding secrets such as typed values)
+    """
+    def decorate(func):
+        signature = inspect.signature(func)
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*call_args, **call_kwargs):
+            if not tracer.enabled:
+                return func(*call_args, **call_kwargs)
+            bound = signature.bind_partial(*call_args, **call_kwargs).arguments
+            attrs = {arg: _attr(bound[arg]) for arg in args if arg in bound}
+            started = time.monotonic()
+            try:
+                result = func(*call_args, **call_kwargs)
+                if isinstance(result, bool):
+                    attrs['result'] = result
+                return result
+            except Exception as e:
+                attrs['error'] = str(e)
+                raise
+            finally:
+                tracer.record(span_name, started, cat, **attrs)
+        return wrapper
+    return decorate
@@ -0,0 +1,232 @@
+import time
+from contextlib import contextmanager
+
+from utils.tracer import tracer
+
+
+# Resolves once no DOM mutation has happened for quietMs, or after capMs
+_DOM_QUIET_JS = """
+([quietMs, capMs]) => new Promise(resolve => {
+    let quietTimer = null;
+    let capTimer = null;
+    const observer = new MutationObserver(() => {
+        clearTimeout(quietTimer);
+        quietTimer = setTimeout(() => done(true), quietMs);
+    });
+    const done = (quiet) => {
+        observer.disconnect();
+        clearTimeout(quietTimer);
+        clearTimeout(capTimer);
+        resolve(quiet);
+    };
+    observer.observe(document, {
+        subtree: true, childList: true, attributes: true, characterData: true
+    });
+    quietTimer = setTimeout(() => done(true), quietMs);
+    capTimer = setTimeout(() => done(false), capMs);
+})
+"""
+
+
+class WaitEngine:
+    """
+    Condition-based waits for a BrowserHandler page.
+
+    Each wait returns as soon as its condition holds: the URL changes, a
+    selector appears, a matching response arrives, or the DOM goes quiet.
+    Every condition is capped (seconds) per site via
+    SITES_CONFIG[...]['special']['wait_caps']. settle(seconds) is the drop-in
+    replacement for the old fixed time.sleep(seconds) calls: it waits for the
+    DOM to go quiet and never longer than the old sleep.
+    """
+    
+    def __init__(self, browser, caps=None, quiet_ms=250):
+        """
+        Args:
+            browser: BrowserHandler whose current page is waited on
+            caps: Per-condition caps in seconds, e.g. config.DEFAULT_WAIT_CAPS
+            quiet_ms: How long the DOM must be unchanged to count as quiet
+        """
+        self.browser = browser
+        self.quiet_ms = quiet_ms
+        self.caps = dict(caps or {})
+        self.stats = {}
+    
+    @property
+    def page(self):
+        return self.browser.page
+    
+    def set_caps(self, caps):
+        """Replace the caps, e.g. when the browser moves to another site"""
+        self.caps = dict(caps)
+    
+    def cap(self, kind, timeout=None):
+        """Effective timeout in seconds: the requested one, bounded by the site cap"""
+        cap = self.caps.get(kind, 10)
+        return min(timeout, cap) if timeout is not None else cap
+    
+    def _record(self, kind, started, met, **detail):
+        tracer.record(f"wait.{kind}", started, 'wait', met=met, **detail)
+        entry = self.stats.setdefault(kind, {'count': 0, 'seconds': 0.0, 'timed_out': 0})
+        entry['count'] += 1
+        entry['seconds'] += time.monotonic() - started
+        if not met:
+            entry['timed_out'] += 1
+        return met
+    
+    def reset_stats(self):
+        self.stats = {}
+    
+    def for_url_change(self, url_before, timeout=None):
+        """Wait until the page URL differs from url_before"""
+        started = time.monotonic()
+        try:
+            self.page.wait_for_url(
+                lambda url: url != url_before,
+                timeout=self.cap('url_change', timeout) * 1000,
+                wait_until='commit'
+            )
+            return self._record('url_change', started, True, url=url_before)
+        except Exception:
+            return self._record('url_change', started, False, url=url_before)
+    
+    def for_selector(self, selector, state='visible', timeout=None):
+        """Wait until selector reaches state ('visible', 'attached', 'hidden', 'detached')"""
+        started = time.monotonic()
+        try:
+            self.page.wait_for_selector(
+                selector, state=state, timeout=self.cap('selector', timeout) * 1000
+            )
+            return self._record('selector', started, True, selector=selector, state=state)
+        except Exception:
+            return self._record('selector', started, False, selector=selector, state=state)
+    
+    def for_response(self, pattern, timeout=None):
+        """
+        Wait for a network response whose URL matches pattern
+        
+        Args:
+            pattern: Substring or compiled regex matched against the response URL
+        """
+        started = time.monotonic()
+        if isinstance(pattern, str):
+            matches = lambda response: pattern in response.url
+        else:
+            matches = lambda response: bool(pattern.search(response.url))
+        try:
+            self.page.wait_for_event(
+                'response', predicate=matches, timeout=self.cap('response', timeout) * 1000
+            )
+            return self._record('response', started, True, pattern=str(pattern))
+        except Exception:
+            return self._record('response', started, False, pattern=str(pattern))
+    
+    @contextmanager
+    def for_submit(self, pattern=None, timeout=None):
+        """
+        Wrap a form submit; on leaving the block, wait until the page has
+        the submit's answer: it navigated away, or the submit's response
+        (a POST/XHR) came back, and the page then settled
+        
+        The DOM stays quiet while an AJAX submit is in flight, so settle()
+        alone would return before the answer is on the page.
+        
+        Args:
+            pattern: Substring or compiled regex of the submit's response URL;
+                by default any navigation or non-GET XHR/fetch/form response
+            timeout: Seconds, counted from entering the block (the old fixed sleep)
+        """
+        page = self.page
+        started = time.monotonic()
+        cap_s = self.cap('submit', timeout)
+        url_before = page.url
+        answered = []
+        
+        def on_response(response):
+            try:
+                if self._answers_submit(response, pattern):
+                    answered.append(response.url)
+            except Exception:
+                pass  # e.g. a service worker response without a frame
+        
+        page.on('response', on_response)
+        try:
+            yield
+            # Responses and navigations are dispatched while Playwright waits
+            while not answered and page.url == url_before:
+                remaining = cap_s - (time.monotonic() - started)
+                if remaining <= 0:
+                    break
+                page.wait_for_timeout(min(100, remaining * 1000))
+        finally:
+            page.remove_listener('response', on_response)
+        
+        met = bool(answered) or page.url != url_before
+        if met:
+            # Let the new document load, or the XHR handler update the page
+            remaining = max(0.0, cap_s - (time.monotonic() - started))
+            try:
+                page.wait_for_load_state('domcontentloaded', timeout=remaining * 1000)
+                page.evaluate(_DOM_QUIET_JS, [min(self.quiet_ms, int(remaining * 1000)), int(remaining * 1000)])
+            except Exception:
+                pass
+        self._record('submit', started, met, url=url_before)
+    
+    @staticmethod
+    def _answers_submit(response, pattern):
+        request = response.request
+        if pattern is not None:
+            return pattern in response.url if isinstance(pattern, str) else bool(pattern.search(response.url))
+        if request.is_navigation_request():
+            return request.frame.parent_frame is None
+        return request.method != 'GET' and request.resource_type in ('document', 'xhr', 'fetch')
+    
+    def for_load(self, state='load', timeout=None):
+        """Wait for a page load state ('load', 'domcontentloaded', 'networkidle')"""
+        started = time.monotonic()
+        try:
+            self.page.wait_for_load_state(state, timeout=self.cap('load', timeout) * 1000)
+            return self._record('load', started, True, state=state)
+        except Exception:
+            return self._record('load', started, False, state=state)
+    
+    def for_dom_quiet(self, quiet_ms=None, timeout=None):
+        """Wait until the DOM has not changed for quiet_ms milliseconds"""
+        started = time.monotonic()
+        cap_s = self.cap('dom_quiet', timeout)
+        cap_ms = int(cap_s * 1000)
+        quiet_ms = min(quiet_ms or self.quiet_ms, cap_ms)
+        if cap_ms <= 0:
+            return True
+        try:
+            quiet = self.page.evaluate(_DOM_QUIET_JS, [quiet_ms, cap_ms])
+            return self._record('dom_quiet', started, quiet)
+        except Exception:
+            # The page navigated mid-wait (execution context destroyed):
+            # wait for the new document instead, within what is left of the cap
+            remaining = max(0.0, cap_s - (time.monotonic() - started))
+            try:
+                self.page.wait_for_load_state('domcontentloaded', timeout=remaining * 1000)
+            except Exception:
+                pass
+            return self._record('dom_quiet', started, False)
+    
+    def settle(self, seconds):
+        """Condition-based replacement for time.sleep(seconds) after a page action"""
+        return self.for_dom_quiet(timeout=seconds)
+    
+    def pause(self, seconds):
+        """
+        Plain delay for waits that are not about page state (retry backoff,
+        human-like pacing). Recorded so it shows up in the stats.
+        
+        Waits inside Playwright (page.wait_for_timeout) so route handlers and
+        page events keep being dispatched; time.sleep would stall them.
+        """
+        started = time.monotonic()
+        page = self.page
+        if page is not None and not page.is_closed():
+            page.wait_for_timeout(seconds * 1000)
+        else:
+            time.sleep(seconds)
+        return self._record('pause', started, True)
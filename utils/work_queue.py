@@ -0,0 +1,181 @@
+import json
+import sqlite3
+import threading
+import time
+
+
+class WorkQueue:
+    """
+    Durable SQLite-backed queue of SITES_CONFIG keys shared by worker processes.
+
+    A worker leases one site at a time. While it works it renews the lease
+    with heartbeats; if the worker dies the lease expires and another worker
+    picks the site up again (up to max_attempts). Completion is only
+    accepted from the current lease holder, so a site is never recorded twice.
+    """
+    
+    def __init__(self, db_path='work_queue.db', lease_seconds=120, max_attempts=3):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._init_db()
+    
+    def _connect(self):
+        """Open a connection (sqlite3 connections must not cross threads)"""
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+    
+    def _init_db(self):
+        conn = self._connect()
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS tasks (
+                    site_key TEXT PRIMARY KEY,
+                    position INTEGER NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    worker TEXT,
+                    lease_expires REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    result TEXT
+                )
+            """)
+        finally:
+            conn.close()
+    
+    def reset(self, site_keys):
+        """Replace the queue contents with site_keys, in order"""
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('DELETE FROM tasks')
+            conn.executemany(
+                'INSERT INTO tasks (site_key, position) VALUES (?, ?)',
+                [(key, i) for i, key in enumerate(site_keys)]
+            )
+            conn.execute('COMMIT')
+        finally:
+            conn.close()
+    
+    def lease(self, worker_id):
+        """
+        Lease the next available site
+        
+        Returns:
+            Site key, or None if nothing is currently available
+        """
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            while True:
+                now = time.time()
+                row = conn.execute("""
+                    SELECT site_key, attempts FROM tasks
+                    WHERE status = 'pending'
+                       OR (status = 'leased' AND lease_expires < ?)
+                    ORDER BY position LIMIT 1
+                """, (now,)).fetchone()
+                
+                if row is None:
+                    conn.execute('COMMIT')
+                    return None
+                
+                site_key, attempts = row
+                if attempts >= self.max_attempts:
+                    # Workers keep dying on this site; stop handing it out
+                    conn.execute(
+                        "UPDATE tasks SET status = 'failed', worker = NULL, result = ? WHERE site_key = ?",
+                        (json.dumps({'site_key': site_key, 'status': 'failed',
+                                    'error': f'Worker lost {attempts} times'}), site_key)
+                    )
+                    continue
+                
+                conn.execute("""
+                    UPDATE tasks SET status = 'leased', worker = ?, lease_expires = ?,
+                                     attempts = attempts + 1
+                    WHERE site_key = ?
+                """, (worker_id, now + self.lease_seconds, site_key))
+                conn.execute('COMMIT')
+                return site_key
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+    
+    def heartbeat(self, site_key, worker_id):
+        """Extend a lease; returns False if the lease was lost"""
+        conn = self._connect()
+        try:
+            cur = conn.execute("""
+                UPDATE tasks SET lease_expires = ?
+                WHERE site_key = ? AND worker = ? AND status = 'leased'
+            """, (time.time() + self.lease_seconds, site_key, worker_id))
+            return cur.rowcount == 1
+        finally:
+            conn.close()
+    
+    def complete(self, site_key, worker_id, result):
+        """Record the result for a leased site; returns False if the lease was lost"""
+        conn = self._connect()
+        try:
+            cur = conn.execute("""
+                UPDATE tasks SET status = 'done', result = ?, lease_expires = NULL
+                WHERE site_key = ? AND worker = ? AND status = 'leased'
+            """, (json.dumps(result), site_key, worker_id))
+            return cur.rowcount == 1
+        finally:
+            conn.close()
+    
+    def release(self, site_key, worker_id):
+        """Give a lease back without counting it as an attempt (e.g. on Ctrl+C)"""
+        conn = self._connect()
+        try:
+            conn.execute("""
+                UPDATE tasks SET status = 'pending', worker = NULL, lease_expires = NULL,
+                                 attempts = MAX(attempts - 1, 0)
+                WHERE site_key = ? AND worker = ? AND status = 'leased'
+            """, (site_key, worker_id))
+        finally:
+            conn.close()
+    
+    def unfinished(self):
+        """Number of sites that are pending or leased"""
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT COUNT(*) FROM tasks WHERE status IN ('pending', 'leased')"
+            ).fetchone()
+            return row[0]
+        finally:
+            conn.close()
+    
+    def results(self):
+        """Recorded results in queue order"""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                'SELECT result FROM tasks WHERE result IS NOT NULL ORDER BY position'
+            ).fetchall()
+            return [json.loads(r[0]) for r in rows]
+        finally:
+            conn.close()
+    
+    def keep_alive(self, site_key, worker_id):
+        """
+        Start a background thread that heartbeats the lease until stopped
+        
+        Returns:
+            threading.Event; set it when the site is finished
+        """
+        stop = threading.Event()
+        interval = max(1, self.lease_seconds / 3)
+        
+        def beat():
+            while not stop.wait(interval):
+                if not self.heartbeat(site_key, worker_id):
+                    print(f"[WARN] Lost lease on {site_key}")
+                    return
+        
+        threading.Thread(target=beat, name=f'heartbeat-{site_key}', daemon=True).start()
+        return stop